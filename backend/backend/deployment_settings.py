@@ -66,6 +66,11 @@ STORAGES = {
     },
 }
 
+# Gunicorn workers must see each other's cache invalidations
+CACHES["catalogue"] = CATALOGUE_CACHE_BACKENDS[
+    os.environ.get("CATALOGUE_CACHE_BACKEND", "file")
+]
+
 DATABASES = {
     "default": dj_database_url.config(
         default=os.environ["DATABASE_URL"], conn_max_age=600
@@ -0,0 +1,43 @@
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.template.loader import get_template
+
+EMAIL_TEMPLATE_DIR = "email"
+
+
+@lru_cache(maxsize=None)
+def get_email_template(name):
+    """
+    Return the compiled ``templates/email/<name>``, loaded and parsed once
+    per process.
+    """
+    return get_template(f"{EMAIL_TEMPLATE_DIR}/{name}")
+
+
+@lru_cache(maxsize=None)
+def static_context():
+    """
+    The parts every email shares: logo and help links.
+    """
+    return {
+        "logo_url": f"{settings.SITE_URL}/static/logo.png",
+        "help_url": f"{settings.FRONTEND_SITE_URL}/help",
+    }
+
+
+def render_email(name, context=None):
+    """
+    Render an email template with the shared context and ``context``.
+    """
+    return get_email_template(name).render({**static_context(), **(context or {})})
+
+
+@receiver(setting_changed)
+def clear_email_caches(setting, **kwargs):
+    if setting in ("SITE_URL", "FRONTEND_SITE_URL"):
+        static_context.cache_clear()
+    elif setting == "TEMPLATES":
+        get_email_template.cache_clear()
@@ -34,6 +34,7 @@ INSTALLED_APPS = [
     "products",
     "orders",
     "newsletter",
+    "jobs",
     # libs,
     "rest_framework",
     "drf_spectacular",
@@ -84,6 +85,33 @@ DATABASES = {
     )
 }
 
+# Catalogue responses are cached in "catalogue", see products/cache.py.
+# Use the file-based backend when several processes serve the API so they
+# share invalidations; no Redis needed.
+CATALOGUE_CACHE_BACKENDS = {
+    "locmem": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "catalogue",
+        "TIMEOUT": 300,
+        "OPTIONS": {"MAX_ENTRIES": 5000},
+    },
+    "file": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": BASE_DIR / ".cache" / "catalogue",
+        "TIMEOUT": 300,
+        "OPTIONS": {"MAX_ENTRIES": 5000},
+    },
+}
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "catalogue": CATALOGUE_CACHE_BACKENDS[
+        os.environ.get("CATALOGUE_CACHE_BACKEND", "locmem")
+    ],
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
@@ -127,6 +155,16 @@ SIMPLE_JWT = {
 }
 USE_HTTPS = False
 
+# Background jobs (see jobs.queue), run by `manage.py run_worker`. With
+# JOBS_EAGER they run inline once the enqueuing transaction commits.
+JOBS_EAGER = os.environ.get("JOBS_EAGER", "False") == "True"
+JOBS_POLL_INTERVAL = float(os.environ.get("JOBS_POLL_INTERVAL", 1))
+JOBS_MAX_ATTEMPTS = int(os.environ.get("JOBS_MAX_ATTEMPTS", 5))
+# Seconds before the first retry, doubled on every further attempt
+JOBS_RETRY_BACKOFF = int(os.environ.get("JOBS_RETRY_BACKOFF", 30))
+# Seconds after which a running job is considered lost with its worker
+JOBS_LOCK_TIMEOUT = int(os.environ.get("JOBS_LOCK_TIMEOUT", 600))
+
 EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
 EMAIL_HOST = "smtp.gmail.com"
 EMAIL_USE_TLS = True
@@ -134,6 +172,11 @@ EMAIL_PORT = 587
 EMAIL_HOST_USER = os.environ.get("EMAIL_HOST_USER")
 EMAIL_HOST_PASSWORD = os.environ.get("EMAIL_HOST_PASSWORD")
 DEFAULT_FROM_EMAIL = f"Ride Future {os.environ.get('EMAIL_HOST_USER')}"
+# Newsletter recipients handled per batch: read from the database, sent and
+# recorded before the next batch
+NEWSLETTER_BATCH_SIZE = int(os.environ.get("NEWSLETTER_BATCH_SIZE", 100))
+# Seconds after which a batch claimed by a send is considered lost with it
+NEWSLETTER_CLAIM_TIMEOUT = int(os.environ.get("NEWSLETTER_CLAIM_TIMEOUT", 600))
 
 CORS_ALLOW_CREDENTIALS = True
 CORS_ALLOWED_ORIGINS = [
@@ -240,8 +283,33 @@ LANGUAGES = (
 )
 MODELTRANSLATION_DEFAULT_LANGUAGE = "en"
 MODELTRANSLATION_FALLBACK_LANGUAGES = ("en", "cs")
+# PostgreSQL text search configuration per language, see products/search.py.
+# PostgreSQL ships no Czech stemmer; once a "czech" configuration (e.g. built
+# from the hunspell dictionary) is installed, point "cs" at it.
+PRODUCT_SEARCH_CONFIGS = {
+    "en": "english",
+    "cs": os.environ.get("CZECH_SEARCH_CONFIG", "simple"),
+}
 # Payment
 STRIPE_PUBLISHABLE_KEY = os.environ.get("STRIPE_PUBLISHABLE_KEY")
 STRIPE_SECRET_KEY = os.environ.get("STRIPE_SECRET_KEY")
+# How checkout describes order lines to Stripe: "catalogue" reuses Stripe
+# Products/Prices mapped in orders.StripePriceMap, "inline" sends price_data
+# so the Checkout Session is the only Stripe call
+STRIPE_CHECKOUT_LINE_ITEMS = os.environ.get("STRIPE_CHECKOUT_LINE_ITEMS", "catalogue")
+# Stripe calls of a checkout run concurrently on a bounded thread pool. Each
+# request times out after STRIPE_REQUEST_TIMEOUT seconds and is retried up to
+# STRIPE_MAX_RETRIES times; a checkout waits STRIPE_CHECKOUT_TIMEOUT at most.
+STRIPE_MAX_WORKERS = int(os.environ.get("STRIPE_MAX_WORKERS", 8))
+STRIPE_REQUEST_TIMEOUT = int(os.environ.get("STRIPE_REQUEST_TIMEOUT", 10))
+STRIPE_MAX_RETRIES = int(os.environ.get("STRIPE_MAX_RETRIES", 2))
+STRIPE_CHECKOUT_TIMEOUT = int(os.environ.get("STRIPE_CHECKOUT_TIMEOUT", 30))
+# Signing secret of the checkout.session.* webhook endpoint, see orders/webhooks.py
+STRIPE_WEBHOOK_SECRET = os.environ.get("STRIPE_WEBHOOK_SECRET")
+# Dotted path to an object used instead of the stripe module, e.g. a fake in tests
+STRIPE_CLIENT = None
+# Minutes an unpaid order holds its stock, also the lifetime of its Stripe
+# Checkout Session (Stripe accepts 30 minutes to 24 hours)
+STOCK_RESERVATION_MINUTES = int(os.environ.get("STOCK_RESERVATION_MINUTES", 60))
 
 RECAPTCHA_SECRET_KEY = os.environ.get("RECAPTCHA_SECRET_KEY")
@@ -6,3 +6,5 @@ python manage.py collectstatic
 
 python manage.py migrate
 
+# Emails and other background jobs are run by a separate process started
+# with `python manage.py run_worker`, see the README
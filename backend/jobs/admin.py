@@ -0,0 +1,46 @@
+from django.contrib import admin
+from django.utils import timezone
+from unfold.admin import ModelAdmin
+
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(ModelAdmin):
+    """
+    Admin view of queued background jobs, to inspect and retry failures.
+    """
+
+    list_display = [
+        "id",
+        "name",
+        "status",
+        "attempts",
+        "max_attempts",
+        "run_at",
+        "locked_by",
+        "finished_at",
+    ]
+    list_filter = ["status", "name"]
+    search_fields = ["name", "last_error"]
+    readonly_fields = [
+        "attempts",
+        "locked_at",
+        "locked_by",
+        "last_error",
+        "created_at",
+        "finished_at",
+    ]
+    ordering = ["-created_at"]
+    actions = ["retry_jobs"]
+
+    @admin.action(description="Retry selected jobs")
+    def retry_jobs(self, request, queryset):
+        retried = queryset.exclude(status="running").update(
+            status="queued",
+            attempts=0,
+            run_at=timezone.now(),
+            finished_at=None,
+            last_error="",
+        )
+        self.message_user(request, f"{retried} jobs queued again.")
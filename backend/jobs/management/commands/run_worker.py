@@ -0,0 +1,107 @@
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, close_old_connections, connections
+
+from jobs.queue import requeue_stale_jobs, work
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs: emails and post-order work."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--threads",
+            type=int,
+            default=1,
+            help="Number of jobs to run at the same time.",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=None,
+            help="Seconds to wait when the queue is empty "
+            "(default: settings.JOBS_POLL_INTERVAL).",
+        )
+        parser.add_argument(
+            "--burst",
+            action="store_true",
+            help="Exit once no due jobs are left instead of waiting for more.",
+        )
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        poll_interval = options["poll_interval"] or settings.JOBS_POLL_INTERVAL
+        prefix = f"{socket.gethostname()}:{os.getpid()}"
+        processed = []
+        crashed = []
+
+        def run(worker_id):
+            try:
+                processed.append(
+                    work(
+                        worker_id,
+                        stop=stop,
+                        poll_interval=poll_interval,
+                        burst=options["burst"],
+                    )
+                )
+            except Exception:
+                logger.exception("Worker %s crashed", worker_id)
+                crashed.append(worker_id)
+                # Don't keep running with fewer threads than asked for
+                stop.set()
+            finally:
+                # Every thread opens its own connection, don't leak them
+                connections.close_all()
+
+        def shutdown(signum, frame):
+            self.stdout.write("Stopping after the running jobs finish...")
+            stop.set()
+
+        handlers = {
+            signum: signal.signal(signum, shutdown)
+            for signum in (signal.SIGTERM, signal.SIGINT)
+        }
+
+        recovered = requeue_stale_jobs()
+        if recovered:
+            self.stdout.write(f"Recovered {recovered} jobs of stopped workers.")
+
+        threads = [
+            threading.Thread(target=run, args=(f"{prefix}:{number}",), daemon=True)
+            for number in range(options["threads"])
+        ]
+        for thread in threads:
+            thread.start()
+
+        # Look for jobs of dead workers while the threads run
+        last_recovery = time.monotonic()
+        alive = threads
+        while alive:
+            alive[0].join(poll_interval)
+            alive = [thread for thread in threads if thread.is_alive()]
+            if time.monotonic() - last_recovery >= settings.JOBS_LOCK_TIMEOUT / 2:
+                try:
+                    close_old_connections()
+                    requeue_stale_jobs()
+                except DatabaseError:
+                    logger.exception("Could not requeue the jobs of stopped workers")
+                last_recovery = time.monotonic()
+
+        for signum, handler in handlers.items():
+            signal.signal(signum, handler)
+        if crashed:
+            raise CommandError(
+                f"{', '.join(crashed)} crashed after {sum(processed)} jobs, "
+                "see the log."
+            )
+        self.stdout.write(self.style.SUCCESS(f"Ran {sum(processed)} jobs."))
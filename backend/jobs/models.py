@@ -0,0 +1,38 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """
+    A queued call of a function decorated with ``jobs.queue.task``.
+
+    Workers (``manage.py run_worker``) claim due jobs, run them and retry
+    failures with exponential backoff until ``max_attempts`` is reached.
+    """
+
+    STATUS_CHOICES = [
+        ("queued", "Queued"),  # Waiting for run_at
+        ("running", "Running"),  # Claimed by a worker
+        ("done", "Done"),  # Finished successfully
+        ("failed", "Failed"),  # Gave up after max_attempts
+    ]
+    name = models.CharField(max_length=255, help_text="Dotted path of the task.")
+    args = models.JSONField(default=list, blank=True)
+    kwargs = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="queued")
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(blank=True, null=True)
+    locked_by = models.CharField(max_length=255, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "run_at"], name="job_claim_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
@@ -0,0 +1,265 @@
+import logging
+import random
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import (
+    DatabaseError,
+    close_old_connections,
+    connections,
+    router,
+    transaction,
+)
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# Longest wait between two attempts of a job, in seconds
+MAX_RETRY_DELAY = 60 * 60
+# How many due jobs a worker tries before giving up on a claim without
+# SKIP LOCKED, when others keep winning the race
+CLAIM_CANDIDATES = 10
+
+_registry = {}
+# The job each worker thread is running, for heartbeat()
+_running = threading.local()
+
+
+class JobLost(Exception):
+    """
+    The running job was requeued as stale, or taken by another worker.
+    """
+
+
+class Task:
+    """
+    A function that can be queued as a Job and run by a worker.
+    """
+
+    def __init__(self, func, max_attempts=None):
+        self.func = func
+        self.name = f"{func.__module__}.{func.__qualname__}"
+        self.max_attempts = max_attempts
+        self.__doc__ = func.__doc__
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def enqueue(self, *args, **kwargs):
+        """
+        Queue a call of the task. The job is written in the caller's
+        transaction, so it only exists, and only runs, if that commits.
+        Arguments must be JSON serializable, pass ids rather than instances.
+        """
+        job = Job.objects.create(
+            name=self.name,
+            args=list(args),
+            kwargs=kwargs,
+            max_attempts=self.max_attempts or settings.JOBS_MAX_ATTEMPTS,
+        )
+        if settings.JOBS_EAGER:
+            transaction.on_commit(lambda: run_claimed(job.pk, "eager"))
+        return job
+
+
+def task(func=None, *, max_attempts=None):
+    """
+    Register a function as a task: ``@task`` or ``@task(max_attempts=3)``.
+    """
+
+    def register(func):
+        registered = Task(func, max_attempts=max_attempts)
+        _registry[registered.name] = registered
+        return registered
+
+    return register(func) if func else register
+
+
+def get_task(name):
+    # Workers may not have imported the task's module yet
+    if name not in _registry:
+        import_string(name)
+    return _registry[name]
+
+
+def retry_delay(attempts):
+    """
+    Seconds to wait before the next attempt: exponential backoff from
+    ``settings.JOBS_RETRY_BACKOFF``, with jitter so failed jobs do not all
+    come back at once.
+    """
+    delay = min(settings.JOBS_RETRY_BACKOFF * 2 ** (attempts - 1), MAX_RETRY_DELAY)
+    return delay + random.uniform(0, delay / 2)
+
+
+def claim_job(worker_id, pk=None):
+    """
+    Mark the next due job (or job ``pk``, if due) as running for
+    ``worker_id`` and return it, or None when there is nothing to do.
+
+    Uses ``SELECT ... FOR UPDATE SKIP LOCKED`` where the database supports
+    it, so workers never wait on each other's rows. Elsewhere the claim is a
+    conditional UPDATE on the job's status, which only one worker can win.
+    """
+    now = timezone.now()
+    due = Job.objects.filter(status="queued", run_at__lte=now).order_by("run_at", "pk")
+    if pk is not None:
+        due = due.filter(pk=pk)
+    claim = {
+        "status": "running",
+        "attempts": F("attempts") + 1,
+        "locked_at": now,
+        "locked_by": worker_id,
+    }
+
+    if connections[due.db].features.has_select_for_update_skip_locked:
+        with transaction.atomic(using=due.db):
+            claimed = (
+                due.select_for_update(skip_locked=True)
+                .values_list("pk", flat=True)
+                .first()
+            )
+            if claimed is None:
+                return None
+            Job.objects.filter(pk=claimed).update(**claim)
+    else:
+        candidates = list(due.values_list("pk", flat=True)[:CLAIM_CANDIDATES])
+        for claimed in candidates:
+            if Job.objects.filter(pk=claimed, status="queued").update(**claim):
+                break
+        else:
+            return None
+    return Job.objects.get(pk=claimed)
+
+
+def _owned(job):
+    """
+    Return ``job``'s row while it is still the run this worker claimed.
+    """
+    return Job.objects.filter(
+        pk=job.pk, status="running", locked_by=job.locked_by, attempts=job.attempts
+    )
+
+
+def heartbeat():
+    """
+    Tell the queue the job running in this thread is alive, so it is not
+    requeued as stale. Tasks that can outlast ``settings.JOBS_LOCK_TIMEOUT``
+    call it as they progress, e.g. once per batch. Does nothing outside a
+    job, and raises JobLost if the job was taken away meanwhile.
+    """
+    job = getattr(_running, "job", None)
+    if job is None:
+        return
+    if not _owned(job).update(locked_at=timezone.now()):
+        raise JobLost(f"{job} is no longer running on {job.locked_by}.")
+
+
+def run_job(job):
+    """
+    Run a claimed job and record the outcome. A failed job is queued again
+    after ``retry_delay`` until it has used ``max_attempts``. Nothing is
+    recorded for a job that was requeued as stale while it ran, the run
+    that has it now will.
+    """
+    previous, _running.job = getattr(_running, "job", None), job
+    try:
+        get_task(job.name)(*job.args, **job.kwargs)
+    except JobLost:
+        logger.warning("Job %s was taken away from %s", job, job.locked_by)
+        return False
+    except Exception:
+        logger.exception("Job %s failed on attempt %s", job, job.attempts)
+        error = traceback.format_exc()
+        if job.attempts >= job.max_attempts:
+            changes = {"status": "failed", "finished_at": timezone.now()}
+        else:
+            changes = {
+                "status": "queued",
+                "run_at": timezone.now() + timedelta(seconds=retry_delay(job.attempts)),
+            }
+        _owned(job).update(locked_at=None, locked_by="", last_error=error, **changes)
+        return False
+    finally:
+        # Eager jobs can run inside another job
+        _running.job = previous
+
+    _owned(job).update(
+        status="done", locked_at=None, locked_by="", finished_at=timezone.now()
+    )
+    return True
+
+
+def run_claimed(pk, worker_id):
+    job = claim_job(worker_id, pk=pk)
+    if job is not None:
+        run_job(job)
+
+
+def requeue_stale_jobs():
+    """
+    Queue again the jobs whose worker died mid-run: those that have not been
+    claimed or sent a heartbeat() for ``settings.JOBS_LOCK_TIMEOUT`` seconds.
+    Jobs without attempts left fail instead. Returns how many jobs were
+    recovered.
+    """
+    stale = Job.objects.filter(
+        status="running",
+        locked_at__lt=timezone.now() - timedelta(seconds=settings.JOBS_LOCK_TIMEOUT),
+    )
+    failed = stale.filter(attempts__gte=F("max_attempts")).update(
+        status="failed",
+        locked_at=None,
+        locked_by="",
+        finished_at=timezone.now(),
+        last_error="The worker running this job stopped responding.",
+    )
+    requeued = stale.filter(attempts__lt=F("max_attempts")).update(
+        status="queued", locked_at=None, locked_by="", run_at=timezone.now()
+    )
+    return failed + requeued
+
+
+def _refresh_connection():
+    """
+    Drop the job database connection if it broke or outlived CONN_MAX_AGE,
+    as Django does between requests, unless a caller's transaction runs.
+    """
+    if not connections[router.db_for_write(Job)].in_atomic_block:
+        close_old_connections()
+
+
+def work(worker_id, stop=None, poll_interval=None, burst=False):
+    """
+    Claim and run jobs until ``stop`` is set, or, with ``burst``, until the
+    queue has no due jobs left. Returns how many jobs were run.
+
+    Database errors, such as a connection the server dropped, are logged
+    and the worker carries on after ``poll_interval``. A job whose outcome
+    could not be recorded is left running and requeued as stale.
+    """
+    stop = stop or threading.Event()
+    poll_interval = poll_interval or settings.JOBS_POLL_INTERVAL
+    processed = 0
+    while not stop.is_set():
+        try:
+            _refresh_connection()
+            job = claim_job(worker_id)
+            if job is None:
+                if burst:
+                    break
+                stop.wait(poll_interval)
+                continue
+            run_job(job)
+        except DatabaseError:
+            logger.exception("Worker %s lost its database connection", worker_id)
+            stop.wait(poll_interval)
+            continue
+        processed += 1
+    return processed
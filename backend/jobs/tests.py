@@ -0,0 +1,157 @@
+import threading
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core import mail
+from django.core.management import call_command
+from django.db import OperationalError
+from django.test import (
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+    skipUnlessDBFeature,
+)
+from django.utils import timezone
+
+from newsletter.models import Newsletter, Subscriber
+from .models import Job
+from . import queue
+from .queue import claim_job, heartbeat, requeue_stale_jobs, run_job, task, work
+
+calls = []
+calls_lock = threading.Lock()
+
+
+@task
+def record(value):
+    with calls_lock:
+        calls.append(value)
+
+
+@task(max_attempts=2)
+def explode():
+    raise RuntimeError("boom")
+
+
+@task
+def outlive_lock(requeued):
+    Job.objects.update(locked_at=timezone.now() - timedelta(hours=1))
+    if requeued:
+        requeue_stale_jobs()
+    heartbeat()
+    calls.append(requeue_stale_jobs())
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_jobs_run_once_in_order(self):
+        record.enqueue("first")
+        record.enqueue("second")
+        Job.objects.create(
+            name=record.name,
+            args=["later"],
+            run_at=timezone.now() + timedelta(hours=1),
+        )
+
+        self.assertEqual(work("test", burst=True), 2)
+        self.assertEqual(calls, ["first", "second"])
+        self.assertEqual(Job.objects.filter(status="done").count(), 2)
+        self.assertIsNone(claim_job("test"))
+
+    def test_failures_back_off_then_fail(self):
+        job = explode.enqueue()
+
+        with self.assertLogs("jobs.queue", "ERROR"):
+            self.assertFalse(run_job(claim_job("test")))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ("queued", 1))
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIn("RuntimeError: boom", job.last_error)
+        # Not due yet
+        self.assertIsNone(claim_job("test"))
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        with self.assertLogs("jobs.queue", "ERROR"):
+            run_job(claim_job("test"))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ("failed", 2))
+        self.assertIsNotNone(job.finished_at)
+
+    def test_database_errors_do_not_stop_the_worker(self):
+        record.enqueue("after the outage")
+        outage = [OperationalError("server closed the connection")]
+
+        def claim(worker_id):
+            if outage:
+                raise outage.pop()
+            return claim_job(worker_id)
+
+        with mock.patch.object(queue, "claim_job", claim), self.assertLogs(
+            "jobs.queue", "ERROR"
+        ):
+            self.assertEqual(work("test", poll_interval=0.01, burst=True), 1)
+        self.assertEqual(calls, ["after the outage"])
+
+    def test_stale_jobs_are_requeued(self):
+        job = record.enqueue("lost")
+        claim_job("dead-worker")
+        Job.objects.filter(pk=job.pk).update(
+            locked_at=timezone.now() - timedelta(hours=1)
+        )
+
+        self.assertEqual(requeue_stale_jobs(), 1)
+        run_job(claim_job("test"))
+        self.assertEqual(calls, ["lost"])
+
+    def test_heartbeats_keep_long_jobs_running(self):
+        outlive_lock.enqueue(False)
+        self.assertTrue(run_job(claim_job("test")))
+        # Nothing was stale after the heartbeat
+        self.assertEqual(calls, [0])
+
+    def test_requeued_jobs_stop_at_their_next_heartbeat(self):
+        job = outlive_lock.enqueue(True)
+        with self.assertLogs("jobs.queue", "WARNING"):
+            self.assertFalse(run_job(claim_job("test")))
+        self.assertEqual(calls, [])
+        job.refresh_from_db()
+        # Left for the next worker to claim, as the requeue put it
+        self.assertEqual((job.status, job.attempts, job.last_error), ("queued", 1, ""))
+
+    @override_settings(JOBS_EAGER=True)
+    def test_eager_jobs_run_after_commit(self):
+        Subscriber.objects.create(email="rider@example.com")
+        with self.captureOnCommitCallbacks(execute=True):
+            newsletter = Newsletter.objects.create(subject="News", message="<p>Hi</p>")
+            self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(len(mail.outbox), 1)
+
+        # Edits don't send the newsletter again
+        with self.captureOnCommitCallbacks(execute=True):
+            newsletter.save()
+        self.assertEqual(len(mail.outbox), 1)
+
+
+class RunWorkerTests(TransactionTestCase):
+    def run_worker(self, jobs, threads):
+        calls.clear()
+        for value in range(jobs):
+            record.enqueue(value)
+
+        out = StringIO()
+        call_command("run_worker", threads=threads, burst=True, stdout=out)
+
+        self.assertIn(f"Ran {jobs} jobs.", out.getvalue())
+        self.assertEqual(sorted(calls), list(range(jobs)))
+        self.assertFalse(Job.objects.exclude(status="done").exists())
+
+    def test_burst_runs_the_queue(self):
+        self.run_worker(jobs=5, threads=1)
+
+    # SQLite test databases lock whole tables under concurrent writers
+    @skipUnlessDBFeature("has_select_for_update_skip_locked")
+    def test_threads_share_the_queue(self):
+        self.run_worker(jobs=20, threads=4)
@@ -1,8 +1,9 @@
 from django.contrib import admin
 from unfold.admin import ModelAdmin
-from .models import Subscriber, Newsletter
+from .models import Newsletter, NewsletterDelivery, Subscriber
 from tinymce.widgets import TinyMCE
 from django.db import models
+from django.db.models import Count, Q
 
 
 @admin.register(Subscriber)
@@ -13,7 +14,7 @@ class SubscriberAdmin(ModelAdmin):
 
 @admin.register(Newsletter)
 class NewsletterAdmin(admin.ModelAdmin):
-    list_display = ("subject", "created_at")
+    list_display = ("subject", "created_at", "sent_count", "failed_count")
     search_fields = ("subject",)
     readonly_fields = ("created_at",)
     compressed_fields = ["message"]
@@ -21,3 +22,29 @@ class NewsletterAdmin(admin.ModelAdmin):
     formfield_overrides = {
         models.TextField: {"widget": TinyMCE()},
     }
+
+    def get_queryset(self, request):
+        return (
+            super()
+            .get_queryset(request)
+            .annotate(
+                sent_count=Count("deliveries", filter=Q(deliveries__status="sent")),
+                failed_count=Count("deliveries", filter=Q(deliveries__status="failed")),
+            )
+        )
+
+    @admin.display(description="Sent", ordering="sent_count")
+    def sent_count(self, obj):
+        return obj.sent_count
+
+    @admin.display(description="Failed", ordering="failed_count")
+    def failed_count(self, obj):
+        return obj.failed_count
+
+
+@admin.register(NewsletterDelivery)
+class NewsletterDeliveryAdmin(ModelAdmin):
+    list_display = ("email", "newsletter", "status", "sent_at")
+    list_filter = ("status", "newsletter")
+    search_fields = ("email",)
+    readonly_fields = ("newsletter", "email", "status", "error", "sent_at")
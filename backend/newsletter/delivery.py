@@ -0,0 +1,173 @@
+import logging
+import time
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from backend.emails import render_email
+from .models import NewsletterDelivery, Subscriber
+
+logger = logging.getLogger(__name__)
+
+PLAIN_TEXT = "Your email client does not support HTML emails."
+
+
+class DeliveryReport(namedtuple("DeliveryReport", ["sent", "failed", "seconds"])):
+    @property
+    def rate(self):
+        """
+        Messages handled per second.
+        """
+        return (self.sent + self.failed) / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        return (
+            f"Sent {self.sent}, failed {self.failed} in {self.seconds:.1f}s "
+            f"({self.rate:.1f} messages/s)"
+        )
+
+
+def queue_deliveries(newsletter, batch_size):
+    """
+    Create a pending delivery for every subscriber that has none yet,
+    streaming the addresses in chunks. Returns how many were added.
+    """
+    added = 0
+    batch = []
+    emails = Subscriber.objects.order_by("pk").values_list("email", flat=True)
+    for email in emails.iterator(chunk_size=batch_size):
+        batch.append(NewsletterDelivery(newsletter=newsletter, email=email))
+        if len(batch) == batch_size:
+            added += len(
+                NewsletterDelivery.objects.bulk_create(batch, ignore_conflicts=True)
+            )
+            batch = []
+    if batch:
+        added += len(
+            NewsletterDelivery.objects.bulk_create(batch, ignore_conflicts=True)
+        )
+    return added
+
+
+def claim_batch(newsletter, batch_size):
+    """
+    Mark the next ``batch_size`` deliveries as "sending" for this run and
+    return them as ``[(pk, email), ...]`` in id order. Pending deliveries
+    are claimed, and so are those a send left claimed for longer than
+    ``settings.NEWSLETTER_CLAIM_TIMEOUT`` seconds, as it died.
+
+    Like ``jobs.queue.claim_job``, uses ``SELECT ... FOR UPDATE SKIP
+    LOCKED`` where the database supports it, and elsewhere claims each row
+    with a conditional UPDATE on its status, which only one run can win.
+    """
+    now = timezone.now()
+    claimable = NewsletterDelivery.objects.filter(
+        Q(status="pending")
+        | Q(
+            status="sending",
+            claimed_at__lt=now - timedelta(seconds=settings.NEWSLETTER_CLAIM_TIMEOUT),
+        ),
+        newsletter=newsletter,
+    ).order_by("pk")
+    claim = {"status": "sending", "claimed_at": now}
+
+    if connections[claimable.db].features.has_select_for_update_skip_locked:
+        with transaction.atomic(using=claimable.db):
+            batch = list(
+                claimable.select_for_update(skip_locked=True).values_list(
+                    "pk", "email"
+                )[:batch_size]
+            )
+            NewsletterDelivery.objects.filter(pk__in=[pk for pk, _ in batch]).update(
+                **claim
+            )
+        return batch
+    return [
+        (pk, email)
+        for pk, email in claimable.values_list("pk", "email")[:batch_size]
+        if claimable.filter(pk=pk).update(**claim)
+    ]
+
+
+def claimed_batches(newsletter, batch_size):
+    """
+    Yield claimed batches until no delivery is left to claim, so statuses
+    can be written between batches.
+    """
+    while batch := claim_batch(newsletter, batch_size):
+        yield batch
+
+
+def deliver_newsletter(newsletter, batch_size=None, retry_failed=False, heartbeat=None):
+    """
+    Send ``newsletter`` to every subscriber that has not received it yet,
+    each in their own message, over one SMTP connection.
+
+    Each batch is claimed before it is sent and recorded per recipient after,
+    so concurrent runs never share a recipient, and running it again after a
+    crash only sends what is still pending (a crash mid-batch can send that
+    batch twice, once its claim times out). ``retry_failed`` also retries
+    addresses that failed before. ``heartbeat`` is called after every batch, so a queued
+    job sending a long campaign is not taken for stale.
+
+    Returns:
+        DeliveryReport: Counts of this run and its throughput.
+    """
+    batch_size = batch_size or settings.NEWSLETTER_BATCH_SIZE
+    started = time.monotonic()
+    queue_deliveries(newsletter, batch_size)
+    if retry_failed:
+        newsletter.deliveries.filter(status="failed").update(status="pending", error="")
+
+    # Rendered once for the whole campaign, every recipient gets the same body
+    html_message = render_email("newsletter.html", {"message": newsletter.message})
+
+    sent = failed = 0
+    connection = get_connection()
+    connection.open()
+    try:
+        for batch in claimed_batches(newsletter, batch_size):
+            delivered = []
+            errors = []
+            try:
+                for pk, email in batch:
+                    message = EmailMultiAlternatives(
+                        subject=newsletter.subject,
+                        body=PLAIN_TEXT,
+                        from_email=settings.DEFAULT_FROM_EMAIL,
+                        to=[email],
+                        connection=connection,
+                    )
+                    message.attach_alternative(html_message, "text/html")
+                    try:
+                        connection.send_messages([message])
+                    except Exception as e:
+                        errors.append(
+                            NewsletterDelivery(pk=pk, status="failed", error=str(e))
+                        )
+                        # The server may have dropped us, reconnect for the next
+                        connection.close()
+                        connection.open()
+                    else:
+                        delivered.append(pk)
+            finally:
+                # Record what was sent even if the connection is lost for good
+                NewsletterDelivery.objects.filter(pk__in=delivered).update(
+                    status="sent", sent_at=timezone.now()
+                )
+                NewsletterDelivery.objects.bulk_update(errors, ["status", "error"])
+            sent += len(delivered)
+            failed += len(errors)
+            if heartbeat is not None:
+                heartbeat()
+    finally:
+        connection.close()
+
+    report = DeliveryReport(sent, failed, time.monotonic() - started)
+    logger.info("Newsletter #%s: %s", newsletter.pk, report)
+    return report
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from newsletter.delivery import deliver_newsletter
+from newsletter.models import Newsletter
+
+
+class Command(BaseCommand):
+    help = "Send a newsletter, or finish an interrupted send, and report throughput."
+
+    def add_arguments(self, parser):
+        parser.add_argument("newsletter_id", type=int)
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=None,
+            help="Recipients per batch (default: settings.NEWSLETTER_BATCH_SIZE).",
+        )
+        parser.add_argument(
+            "--retry-failed",
+            action="store_true",
+            help="Also retry recipients whose delivery failed before.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            newsletter = Newsletter.objects.get(pk=options["newsletter_id"])
+        except Newsletter.DoesNotExist:
+            raise CommandError(f"Newsletter {options['newsletter_id']} does not exist.")
+
+        report = deliver_newsletter(
+            newsletter,
+            batch_size=options["batch_size"],
+            retry_failed=options["retry_failed"],
+        )
+        self.stdout.write(self.style.SUCCESS(str(report)))
@@ -18,41 +18,60 @@ class Newsletter(models.Model):
 
     def send_newsletter(self):
         """
-        Sends an email to all subscribers.
+        Sends an email to every subscriber who has not received it yet.
         """
-        from django.core.mail import send_mail
-        from django.template.loader import render_to_string
-        from django.conf import settings
-
-        subscribers = Subscriber.objects.values_list("email", flat=True)
-
-        if not subscribers:
-            return "No subscribers found."
-
-        email_html = render_to_string(
-            "email/newsletter.html",
-            {
-                "message": self.message,
-                "logo_url": f"{settings.SITE_URL}/static/logo.png",
-                "help_url": f"{settings.FRONTEND_SITE_URL}/help",
-            },
-        )
-
-        send_mail(
-            subject=self.subject,
-            message="Your email client does not support HTML emails.",
-            html_message=email_html,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=subscribers,
-            fail_silently=False,
-        )
+        from .delivery import deliver_newsletter
+
+        return deliver_newsletter(self)
 
     def save(self, *args, **kwargs):
         """
-        Override save method to send emails when a new newsletter is created.
+        Override save method to queue the emails when a new newsletter is created.
         """
+        from .tasks import send_newsletter
+
+        created = self._state.adding
         super().save(*args, **kwargs)
-        self.send_newsletter()
+        if created:
+            send_newsletter.enqueue(self.pk)
 
     def __str__(self):
         return self.subject
+
+
+class NewsletterDelivery(models.Model):
+    """
+    The delivery of a newsletter to one subscriber address. Rows are created
+    before sending, so an interrupted send resumes with the pending ones, and
+    claimed as "sending" batch by batch, so concurrent sends never share one.
+    """
+
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("sending", "Sending"),
+        ("sent", "Sent"),
+        ("failed", "Failed"),
+    ]
+    newsletter = models.ForeignKey(
+        Newsletter, on_delete=models.CASCADE, related_name="deliveries"
+    )
+    email = models.EmailField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+    error = models.TextField(blank=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+    claimed_at = models.DateTimeField(blank=True, null=True, editable=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["newsletter", "email"], name="unique_newsletter_delivery"
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["newsletter", "status", "id"], name="delivery_status_idx"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.newsletter} -> {self.email} ({self.status})"
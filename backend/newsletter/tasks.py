@@ -0,0 +1,11 @@
+from jobs.queue import heartbeat, task
+from .delivery import deliver_newsletter
+from .models import Newsletter
+
+
+@task
+def send_newsletter(newsletter_id):
+    """
+    Send a newsletter to all subscribers.
+    """
+    deliver_newsletter(Newsletter.objects.get(pk=newsletter_id), heartbeat=heartbeat)
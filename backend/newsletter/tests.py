@@ -1,3 +1,90 @@
-from django.test import TestCase
+from smtplib import SMTPRecipientsRefused
 
-# Create your tests here.
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .delivery import claim_batch, deliver_newsletter, queue_deliveries
+from .models import Newsletter, Subscriber
+
+
+class CountingBackend(EmailBackend):
+    """
+    In-memory backend that counts connections and refuses bounce@ addresses.
+    """
+
+    opened = 0
+    refuse = True
+
+    def open(self):
+        CountingBackend.opened += 1
+        return True
+
+    def send_messages(self, messages):
+        for message in messages:
+            if self.refuse and message.to == ["bounce@example.com"]:
+                raise SMTPRecipientsRefused({message.to[0]: (550, b"No such user")})
+        return super().send_messages(messages)
+
+
+@override_settings(EMAIL_BACKEND="newsletter.tests.CountingBackend")
+class NewsletterDeliveryTests(TestCase):
+    def setUp(self):
+        CountingBackend.opened = 0
+        CountingBackend.refuse = True
+        for name in ("anna", "bounce", "karel", "petr", "jana"):
+            Subscriber.objects.create(email=f"{name}@example.com")
+        self.newsletter = Newsletter.objects.create(
+            subject="Spring sale", message="<p>Hi</p>"
+        )
+
+    def test_one_message_per_subscriber_over_one_connection(self):
+        report = deliver_newsletter(self.newsletter, batch_size=2)
+
+        self.assertEqual((report.sent, report.failed), (4, 1))
+        self.assertEqual(CountingBackend.opened, 1 + report.failed)
+        self.assertEqual(
+            sorted(message.to[0] for message in mail.outbox),
+            [
+                "anna@example.com",
+                "jana@example.com",
+                "karel@example.com",
+                "petr@example.com",
+            ],
+        )
+        self.assertTrue(all(len(message.to) == 1 for message in mail.outbox))
+        failed = self.newsletter.deliveries.get(status="failed")
+        self.assertEqual(failed.email, "bounce@example.com")
+        self.assertIn("No such user", failed.error)
+
+    def test_resume_only_sends_what_is_pending(self):
+        deliver_newsletter(self.newsletter, batch_size=2)
+        Subscriber.objects.create(email="late@example.com")
+
+        report = deliver_newsletter(self.newsletter, batch_size=2)
+        self.assertEqual((report.sent, report.failed), (1, 0))
+        self.assertEqual(mail.outbox[-1].to, ["late@example.com"])
+
+        CountingBackend.refuse = False
+        report = deliver_newsletter(self.newsletter, retry_failed=True)
+        self.assertEqual((report.sent, report.failed), (1, 0))
+        self.assertEqual(len(mail.outbox), 6)
+        self.assertFalse(self.newsletter.deliveries.exclude(status="sent").exists())
+
+    def test_batches_claimed_by_another_send_are_skipped(self):
+        CountingBackend.refuse = False
+        queue_deliveries(self.newsletter, 100)
+        taken = [email for _, email in claim_batch(self.newsletter, 2)]
+
+        report = deliver_newsletter(self.newsletter, batch_size=2)
+        self.assertEqual(report.sent, 3)
+        self.assertFalse({message.to[0] for message in mail.outbox} & set(taken))
+
+        # Until that send is taken for dead
+        self.newsletter.deliveries.filter(status="sending").update(
+            claimed_at=timezone.now() - timezone.timedelta(hours=1)
+        )
+        report = deliver_newsletter(self.newsletter, batch_size=2)
+        self.assertEqual(report.sent, 2)
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox[-2:]), taken)
@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.utils.html import format_html
 from unfold.admin import ModelAdmin, TabularInline
-from .models import Order, OrderItem
+from .models import Order, OrderItem, StripePriceMap, StripeProductMap
 
 
 class OrderItemInline(TabularInline):
@@ -14,6 +14,14 @@ class OrderItemInline(TabularInline):
     can_delete = True
     readonly_fields = ["product_price", "product_image", "long_term_guarantee"]
 
+    def get_queryset(self, request):
+        return (
+            super()
+            .get_queryset(request)
+            .select_related("product")
+            .prefetch_related("product__gallery")
+        )
+
     def product_price(self, instance):
         """
         Display the discounted price of the product.
@@ -24,10 +32,11 @@ class OrderItemInline(TabularInline):
         """
         Display the product image as a thumbnail.
         """
-        if instance.product.gallery.exists():
+        images = instance.product.gallery.all()
+        if images:
             return format_html(
                 '<img src="{}" style="width: 50px; height: 50px; object-fit: cover;" alt="{}">',
-                instance.product.gallery.first().image.url,
+                images[0].image.url,
                 instance.product.name,
             )
         return "No Image"
@@ -81,8 +90,30 @@ class OrderItemAdmin(admin.ModelAdmin):
         """
         Display total price of the item including long-term guarantee if selected.
         """
-        base_price = obj.product.discounted_price() * obj.quantity
-        guarantee_cost = 50 * obj.quantity if obj.long_term_guarantee_selected else 0
-        return f"${base_price + guarantee_cost}"
+        return f"${obj.line_total()}"
 
     get_total_price.short_description = "Total Price"
+
+
+@admin.register(StripeProductMap)
+class StripeProductMapAdmin(ModelAdmin):
+    """
+    Admin view for the Stripe Products created for catalogue products.
+    """
+
+    list_display = ["id", "product", "kind", "stripe_product_id", "created_at"]
+    list_filter = ["kind"]
+    search_fields = ["product__name", "stripe_product_id"]
+    readonly_fields = ["created_at"]
+
+
+@admin.register(StripePriceMap)
+class StripePriceMapAdmin(ModelAdmin):
+    """
+    Admin view for the Stripe Prices of mapped products.
+    """
+
+    list_display = ["id", "product_map", "unit_amount", "currency", "stripe_price_id"]
+    list_filter = ["currency"]
+    search_fields = ["product_map__product__name", "stripe_price_id"]
+    readonly_fields = ["created_at"]
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from orders.reservations import release_expired_reservations
+
+
+class Command(BaseCommand):
+    help = "Return the stock of unpaid orders whose reservations have expired."
+
+    def handle(self, *args, **options):
+        released = release_expired_reservations()
+        self.stdout.write(
+            self.style.SUCCESS(f"Released {released} expired stock reservations.")
+        )
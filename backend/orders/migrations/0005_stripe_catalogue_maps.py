@@ -0,0 +1,94 @@
+# Generated by Django 5.1.5 on 2026-10-18 19:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0004_stockreservation"),
+        ("products", "0011_productcharacteristic_typed_values"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StripeProductMap",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("product", "Product"),
+                            ("guarantee", "24-Month Guarantee"),
+                        ],
+                        default="product",
+                        max_length=20,
+                    ),
+                ),
+                ("stripe_product_id", models.CharField(max_length=255, unique=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="stripe_products",
+                        to="products.product",
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="StripePriceMap",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "unit_amount",
+                    models.PositiveIntegerField(
+                        help_text="Price in the smallest unit."
+                    ),
+                ),
+                ("currency", models.CharField(max_length=3)),
+                ("stripe_price_id", models.CharField(max_length=255, unique=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "product_map",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="prices",
+                        to="orders.stripeproductmap",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="stripeproductmap",
+            constraint=models.UniqueConstraint(
+                fields=("product", "kind"), name="unique_stripe_product"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="stripepricemap",
+            constraint=models.UniqueConstraint(
+                fields=("product_map", "unit_amount", "currency"),
+                name="unique_stripe_price",
+            ),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.5 on 2026-10-18 19:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0005_stripe_catalogue_maps"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="paid_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="order",
+            name="stripe_session_id",
+            field=models.CharField(blank=True, max_length=255, null=True, unique=True),
+        ),
+    ]
@@ -1,7 +1,25 @@
-from django.db import models
+from decimal import Decimal
+
+from django.db import models, transaction
+from django.db.models import (
+    Count,
+    DecimalField,
+    ExpressionWrapper,
+    F,
+    Max,
+    Q,
+    Sum,
+    Value,
+)
+from django.db.models.functions import Coalesce, Now
 from users.models import User
 from products.models import Product
 
+# Price of the optional 24-month guarantee, per unit
+LONG_TERM_GUARANTEE_PRICE = Decimal("1250")
+
+CENTS = Decimal("0.01")
+
 
 class Order(models.Model):
     STATUS_CHOICES = [
@@ -27,23 +45,88 @@ class Order(models.Model):
     phone = models.CharField(max_length=15)
     order_notes = models.TextField(blank=True, null=True)
     total_price = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    # Set by the Stripe webhook, see orders/webhooks.py
+    stripe_session_id = models.CharField(
+        max_length=255, unique=True, blank=True, null=True
+    )
+    paid_at = models.DateTimeField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Order history of a user, newest first
+            models.Index(fields=["user", "-created_at"], name="order_user_created_idx"),
+            # Orders by status: unpaid, to ship, ...
+            models.Index(fields=["status", "-created_at"], name="order_status_idx"),
+        ]
+
+    @classmethod
+    def summary_for(cls, user):
+        """
+        Return order counts of ``user``, in total and per status, and what
+        the paid orders added up to, from a single aggregate query.
+        """
+        statuses = [status for status, _ in cls.STATUS_CHOICES]
+        summary = cls.objects.filter(user=user).aggregate(
+            count=Count("pk"),
+            total_spent=Coalesce(
+                Sum("total_price", filter=Q(paid_at__isnull=False)),
+                Value(Decimal(0)),
+            ),
+            last_order_at=Max("created_at"),
+            **{
+                f"status_{status}": Count("pk", filter=Q(status=status))
+                for status in statuses
+            },
+        )
+        summary["by_status"] = {
+            status: summary.pop(f"status_{status}") for status in statuses
+        }
+        return summary
+
+    @classmethod
+    def create_with_items(cls, items, **fields):
+        """
+        Create an order and its items in one transaction.
+
+        ``items`` are dicts of OrderItem fields. They are bulk-inserted,
+        skipping the per-item total updates of ``OrderItem.save``, and the
+        total is computed and written once.
+        """
+        with transaction.atomic():
+            order = cls.objects.create(**fields)
+            OrderItem.objects.bulk_create(
+                OrderItem(order=order, **item) for item in items
+            )
+            order.calculate_total_price()
+        return order
+
     def calculate_total_price(self):
         """
         Calculate the total price of the order based on its items and their optional long-term guarantees.
+
+        The total comes from a single aggregate over the items and is written
+        with a single UPDATE.
         """
-        total = sum(
-            (
-                item.product.discounted_price()
-                + (1250 if item.long_term_guarantee_selected else 0)
-            )
-            * item.quantity
-            for item in self.items.all()
+        total = self.items.aggregate(
+            total=Coalesce(Sum(OrderItem.line_total_expression()), Value(Decimal(0)))
+        )["total"]
+        self.total_price = Decimal(total).quantize(CENTS)
+        Order.objects.filter(pk=self.pk).update(
+            total_price=self.total_price, updated_at=Now()
+        )
+
+    @staticmethod
+    def adjust_total_price(order_id, delta):
+        """
+        Atomically shift the total of an order by ``delta``.
+        """
+        if not delta:
+            return
+        Order.objects.filter(pk=order_id).update(
+            total_price=F("total_price") + delta, updated_at=Now()
         )
-        self.total_price = total
-        self.save()
 
     def __str__(self):
         return f"Order #{self.id} by {self.user.email}"
@@ -55,19 +138,149 @@ class OrderItem(models.Model):
     quantity = models.PositiveIntegerField()
     long_term_guarantee_selected = models.BooleanField(default=False)
 
+    @staticmethod
+    def line_total_expression():
+        """
+        SQL expression for an item's price: discounted product price plus the
+        guarantee when selected, times the quantity.
+        """
+        guarantee = models.Case(
+            models.When(
+                long_term_guarantee_selected=True,
+                then=Value(LONG_TERM_GUARANTEE_PRICE),
+            ),
+            default=Value(Decimal(0)),
+        )
+        return ExpressionWrapper(
+            (F("product__effective_price") + guarantee) * F("quantity"),
+            output_field=DecimalField(max_digits=12, decimal_places=2),
+        )
+
+    def line_total(self):
+        """
+        Return the price of this item, matching ``line_total_expression``.
+        """
+        guarantee = (
+            LONG_TERM_GUARANTEE_PRICE if self.long_term_guarantee_selected else 0
+        )
+        return ((self.product.discounted_price() + guarantee) * self.quantity).quantize(
+            CENTS
+        )
+
     def save(self, *args, **kwargs):
         """
-        Override the save method to recalculate the order's total price including guarantees.
+        Override the save method to shift the order's total by the change in this item's price.
         """
-        super().save(*args, **kwargs)
-        self.order.calculate_total_price()
+        with transaction.atomic():
+            previous = None
+            if self.pk:
+                previous = (
+                    OrderItem.objects.select_related("product")
+                    .filter(pk=self.pk)
+                    .first()
+                )
+            super().save(*args, **kwargs)
+
+            if previous is not None and previous.order_id != self.order_id:
+                Order.adjust_total_price(previous.order_id, -previous.line_total())
+                previous = None
+            delta = self.line_total() - (previous.line_total() if previous else 0)
+            Order.adjust_total_price(self.order_id, delta)
 
     def delete(self, *args, **kwargs):
         """
-        Override the delete method to recalculate the order's total price after an item is removed.
+        Override the delete method to subtract this item from the order's total.
         """
-        super().delete(*args, **kwargs)
-        self.order.calculate_total_price()
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            Order.adjust_total_price(self.order_id, -self.line_total())
+        return result
 
     def __str__(self):
         return f"{self.quantity} x {self.product.name} (Order #{self.order.id})"
+
+
+class StockReservation(models.Model):
+    """
+    Stock held back for an unpaid order, see orders/reservations.py.
+
+    The product's stock is decremented when the reservation is made.
+    Payment commits it, cancellation or expiry puts the stock back.
+    """
+
+    STATUS_CHOICES = [
+        ("reserved", "Reserved"),  # Stock held until payment or expiry
+        ("committed", "Committed"),  # Order paid, the stock is sold
+        ("released", "Released"),  # Stock returned to the product
+    ]
+    order = models.ForeignKey(
+        Order, on_delete=models.CASCADE, related_name="reservations"
+    )
+    product = models.ForeignKey("products.Product", on_delete=models.PROTECT)
+    quantity = models.PositiveIntegerField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="reserved")
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["status", "expires_at"], name="reservation_expiry_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product.name} for Order #{self.order_id} ({self.status})"
+
+
+class StripeProductMap(models.Model):
+    """
+    Stripe Product created for a catalogue product or for its guarantee, so
+    checkout never has to search Stripe's catalogue. See orders/stripe.py.
+    """
+
+    KIND_CHOICES = [
+        ("product", "Product"),
+        ("guarantee", "24-Month Guarantee"),
+    ]
+    product = models.ForeignKey(
+        "products.Product", on_delete=models.CASCADE, related_name="stripe_products"
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, default="product")
+    stripe_product_id = models.CharField(max_length=255, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["product", "kind"], name="unique_stripe_product"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.product.name} ({self.kind}) -> {self.stripe_product_id}"
+
+
+class StripePriceMap(models.Model):
+    """
+    Stripe Price of a mapped product, one per unit amount and currency.
+    """
+
+    product_map = models.ForeignKey(
+        StripeProductMap, on_delete=models.CASCADE, related_name="prices"
+    )
+    unit_amount = models.PositiveIntegerField(help_text="Price in the smallest unit.")
+    currency = models.CharField(max_length=3)
+    stripe_price_id = models.CharField(max_length=255, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["product_map", "unit_amount", "currency"],
+                name="unique_stripe_price",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.product_map} {self.unit_amount} {self.currency}"
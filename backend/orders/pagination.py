@@ -0,0 +1,13 @@
+from rest_framework.pagination import CursorPagination
+
+
+class OrderHistoryPagination(CursorPagination):
+    """
+    Keyset pagination for a user's order history, served by the
+    (user, -created_at) index.
+    """
+
+    page_size = 10
+    page_size_query_param = "page_size"
+    max_page_size = 50
+    ordering = ("-created_at", "id")
@@ -0,0 +1,192 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Now
+from django.utils import timezone
+
+from products.models import Product
+from products.signals import invalidate_catalogue
+from .models import Order, StockReservation
+
+
+class InsufficientStock(Exception):
+    """
+    Raised when an order asks for more units than a product has in stock.
+    """
+
+    def __init__(self, product_names):
+        self.product_names = list(product_names)
+        super().__init__(f"Not enough stock for {', '.join(self.product_names)}")
+
+
+def reservation_expiry():
+    return timezone.now() + timedelta(minutes=settings.STOCK_RESERVATION_MINUTES)
+
+
+def _order_quantities(order):
+    quantities = defaultdict(int)
+    for product_id, quantity in order.items.values_list("product_id", "quantity"):
+        quantities[product_id] += quantity
+    return quantities
+
+
+def _shift_stock(product_id, delta):
+    # Conditional UPDATE: never takes stock below zero, whatever runs alongside
+    return Product.objects.filter(pk=product_id, stock__gte=-delta).update(
+        stock=F("stock") + delta, updated_at=Now()
+    )
+
+
+def reserve_stock(order, expires_at=None):
+    """
+    Take the order's quantities out of stock and record the reservations.
+
+    Runs in one transaction: the products are locked in id order, so
+    concurrent checkouts cannot deadlock, and each decrement is a
+    conditional ``UPDATE ... WHERE stock >= quantity``. If any product is
+    short, nothing is reserved and InsufficientStock is raised. Expired
+    reservations on the same products are released first.
+    """
+    quantities = _order_quantities(order)
+    expires_at = expires_at or reservation_expiry()
+
+    with transaction.atomic():
+        release_expired_reservations(product_ids=list(quantities))
+        list(
+            Product.objects.select_for_update()
+            .filter(pk__in=quantities)
+            .order_by("pk")
+            .values_list("pk", flat=True)
+        )
+
+        short = [
+            product_id
+            for product_id in sorted(quantities)
+            if not _shift_stock(product_id, -quantities[product_id])
+        ]
+        if short:
+            raise InsufficientStock(
+                Product.objects.filter(pk__in=short)
+                .order_by("pk")
+                .values_list("name", flat=True)
+            )
+
+        StockReservation.objects.bulk_create(
+            StockReservation(
+                order=order,
+                product_id=product_id,
+                quantity=quantity,
+                expires_at=expires_at,
+            )
+            for product_id, quantity in quantities.items()
+        )
+        invalidate_catalogue(product_ids=list(quantities))
+    return expires_at
+
+
+def commit_stock(order):
+    """
+    Sell the stock held for a paid order.
+
+    An order whose reservation lapsed, or that predates reservations, is
+    reserved again first, which raises InsufficientStock when the stock
+    has gone in the meantime.
+    """
+    with transaction.atomic():
+        if not order.reservations.exclude(status="released").exists():
+            reserve_stock(order)
+        return order.reservations.filter(status="reserved").update(status="committed")
+
+
+def release_reservations(reservations):
+    """
+    Put the stock of the still active ``reservations`` back, returning how
+    many reservations were released.
+    """
+    with transaction.atomic():
+        rows = list(
+            reservations.select_for_update()
+            .filter(status="reserved")
+            .order_by("product_id")
+            .values_list("pk", "product_id", "quantity")
+        )
+        if not rows:
+            return 0
+
+        StockReservation.objects.filter(pk__in=[pk for pk, _, _ in rows]).update(
+            status="released"
+        )
+        returned = defaultdict(int)
+        for _, product_id, quantity in rows:
+            returned[product_id] += quantity
+        for product_id in sorted(returned):
+            _shift_stock(product_id, returned[product_id])
+        invalidate_catalogue(product_ids=list(returned))
+    return len(rows)
+
+
+def release_order_stock(order):
+    return release_reservations(order.reservations.all())
+
+
+def _lock_unpaid_orders(order_ids):
+    """
+    Lock the orders of ``order_ids`` that are still unpaid, in id order, and
+    return their ids.
+
+    Order rows are always locked before their reservations and products,
+    as the Stripe webhook does, so a payment and an expiry running at once
+    cannot deadlock, and ``paid_at`` is checked again under the lock.
+    """
+    return list(
+        Order.objects.select_for_update()
+        .filter(pk__in=order_ids, paid_at__isnull=True)
+        .order_by("pk")
+        .values_list("pk", flat=True)
+    )
+
+
+def cancel_unpaid_order(order):
+    """
+    Give back the stock held by an order that will not be paid and mark it
+    canceled. Does nothing once the order is paid.
+    """
+    with transaction.atomic():
+        if not _lock_unpaid_orders([order.pk]):
+            return 0
+        released = release_order_stock(order)
+        Order.objects.filter(pk=order.pk).update(status="canceled", updated_at=Now())
+    return released
+
+
+def release_expired_reservations(product_ids=None):
+    """
+    Release every reservation of the unpaid orders whose reservations have
+    expired, optionally only orders holding one of ``product_ids``, and
+    cancel those orders. Returns how many reservations were released.
+
+    Paid orders keep their stock, even when it is not committed yet.
+    """
+    expired = StockReservation.objects.filter(
+        status="reserved", expires_at__lte=timezone.now(), order__paid_at__isnull=True
+    )
+    if product_ids is not None:
+        expired = expired.filter(product__in=product_ids)
+    order_ids = list(expired.values_list("order_id", flat=True).distinct())
+    if not order_ids:
+        return 0
+
+    with transaction.atomic():
+        order_ids = _lock_unpaid_orders(order_ids)
+        if not order_ids:
+            return 0
+        released = release_reservations(
+            StockReservation.objects.filter(order__in=order_ids)
+        )
+        Order.objects.filter(pk__in=order_ids, status="pending").update(
+            status="canceled", updated_at=Now()
+        )
+    return released
@@ -1,23 +1,78 @@
+from collections import defaultdict
+
 from rest_framework import serializers
 
-from products.serializers import ProductSerializer
-from .models import Order, OrderItem
+from products.serializers import ProductListSerializer, ProductSerializer
+from .models import CENTS, Order, OrderItem
 from products.models import Product
 from users.models import User
 
 
+class OrderItemListSerializer(serializers.ListSerializer):
+    """
+    Validates a cart's items together: every product is fetched with one
+    ``in_bulk`` query, then existence, stock and prices are checked against
+    that map. Validated items carry their Product instance.
+    """
+
+    def to_internal_value(self, data):
+        items = super().to_internal_value(data)
+        products = Product.objects.in_bulk({item["product_id"] for item in items})
+
+        wanted = defaultdict(int)
+        for item in items:
+            wanted[item["product_id"]] += item["quantity"]
+
+        errors = []
+        for item in items:
+            error = {}
+            product = products.get(item["product_id"])
+            if product is None:
+                error["product_id"] = [
+                    f'Invalid pk "{item["product_id"]}" - object does not exist.'
+                ]
+            else:
+                if wanted[product.pk] > product.stock:
+                    error["quantity"] = [
+                        f"Only {product.stock} of {product.name} left in stock."
+                    ]
+                price = product.discounted_price().quantize(CENTS)
+                expected = item.pop("price", None)
+                if expected is not None and expected != price:
+                    error["price"] = [f"The price of {product.name} is now {price}."]
+                item["product"] = product
+            errors.append(error)
+
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        for item in items:
+            del item["product_id"]
+        return items
+
+
 class OrderItemSerializer(serializers.ModelSerializer):
     product = ProductSerializer(
         read_only=True
     )  # Use ProductSerializer for detailed product data
-    product_id = serializers.PrimaryKeyRelatedField(
-        queryset=Product.objects.all(), source="product", write_only=True
+    # Resolved to Products in bulk by OrderItemListSerializer
+    product_id = serializers.IntegerField(write_only=True, min_value=1)
+    # The unit price the customer saw, rejected if it has changed since
+    price = serializers.DecimalField(
+        max_digits=10, decimal_places=2, write_only=True, required=False
     )
+    quantity = serializers.IntegerField(min_value=1)
     long_term_guarantee_selected = serializers.BooleanField(default=False)
 
     class Meta:
         model = OrderItem
-        fields = ["product", "product_id", "quantity", "long_term_guarantee_selected"]
+        fields = [
+            "product",
+            "product_id",
+            "price",
+            "quantity",
+            "long_term_guarantee_selected",
+        ]
+        list_serializer_class = OrderItemListSerializer
 
 
 class OrderSerializer(serializers.ModelSerializer):
@@ -58,24 +113,56 @@ class OrderSerializer(serializers.ModelSerializer):
             email=email, defaults={"first_name": first_name, "last_name": last_name}
         )
 
-        # Create the order
+        # Create the order with its items, totalled once
         items_data = validated_data.pop("items")
-        order = Order.objects.create(user=user, **validated_data)
-
-        # Create the order items
-        for item_data in items_data:
-            product = item_data["product"]
-            quantity = item_data["quantity"]
-            long_term_guarantee_selected = item_data.get(
-                "long_term_guarantee_selected", False
-            )
-            OrderItem.objects.create(
-                order=order,
-                product=product,
-                quantity=quantity,
-                long_term_guarantee_selected=long_term_guarantee_selected,
-            )
-
-        # Recalculate total price including guarantee
-        order.calculate_total_price()
-        return order
+        return Order.create_with_items(
+            [
+                {
+                    "product": item_data["product"],
+                    "quantity": item_data["quantity"],
+                    "long_term_guarantee_selected": item_data.get(
+                        "long_term_guarantee_selected", False
+                    ),
+                }
+                for item_data in items_data
+            ],
+            user=user,
+            **validated_data,
+        )
+
+
+class OrderHistoryItemSerializer(serializers.ModelSerializer):
+    """
+    Order item for the order history: just enough product data to show and
+    link it.
+    """
+
+    product = ProductListSerializer(
+        read_only=True,
+        fields=["id", "name", "slug", "discounted_price", "thumbnail"],
+    )
+
+    class Meta:
+        model = OrderItem
+        fields = ["product", "quantity", "long_term_guarantee_selected"]
+
+
+class OrderHistorySerializer(serializers.ModelSerializer):
+    items = OrderHistoryItemSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Order
+        fields = [
+            "id",
+            "status",
+            "total_price",
+            "created_at",
+            "paid_at",
+            "address",
+            "city",
+            "postal_code",
+            "country",
+            "phone",
+            "order_notes",
+            "items",
+        ]
@@ -0,0 +1,11 @@
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
+
+from .models import Order
+from .reservations import release_order_stock
+
+
+@receiver(pre_delete, sender=Order)
+def release_deleted_order_stock(sender, instance, **kwargs):
+    # Deleting an unpaid order, e.g. on cancel or in the admin, frees its stock
+    release_order_stock(instance)
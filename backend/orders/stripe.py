@@ -1,95 +1,267 @@
 # orders/stripe.py
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from decimal import Decimal
+
 import stripe
 from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import Q
+from django.utils.module_loading import import_string
+
+from .models import LONG_TERM_GUARANTEE_PRICE, StripePriceMap, StripeProductMap
 
 # Initialize Stripe with the secret key from settings
 stripe.api_key = settings.STRIPE_SECRET_KEY
+# The SDK retries connection errors, 409s and 429s with idempotency keys
+stripe.max_network_retries = settings.STRIPE_MAX_RETRIES
+stripe.default_http_client = stripe.RequestsClient(
+    timeout=settings.STRIPE_REQUEST_TIMEOUT
+)
+
+STRIPE_CURRENCY = "czk"
+# Price ids never change for a given amount, keep them for a day
+PRICE_CACHE_TIMEOUT = 60 * 60 * 24
 
 
-def get_or_create_stripe_product_and_price(
-    product_name, product_description, price, product_url=None, product_image_url=None
-):
+def get_stripe_client():
     """
-    Gets or creates a Stripe product and associated price.
+    Return the Stripe API client: the ``stripe`` module, or the stand-in
+    named by ``settings.STRIPE_CLIENT`` (tests use a fake).
+    """
+    if getattr(settings, "STRIPE_CLIENT", None):
+        return import_string(settings.STRIPE_CLIENT)
+    return stripe
 
-    Args:
-        product_name (str): Name of the product.
-        product_description (str): Description of the product.
-        price (float): Product price in dollars.
-        product_url (str, optional): URL for the product details.
-        product_image_url (str, optional): URL for the product image.
 
-    Returns:
-        tuple: Stripe product and price objects.
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """
+    Return the bounded thread pool Stripe calls run on.
+
+    Only Stripe requests run on it; database work stays on the request
+    thread, before and after.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.STRIPE_MAX_WORKERS, thread_name_prefix="stripe"
+            )
+    return _executor
+
+
+def gather(futures, timeout=None):
+    """
+    Wait for ``{key: future}`` and return ``{key: result}``, raising the first
+    error or TimeoutError once ``timeout`` seconds (default
+    ``settings.STRIPE_CHECKOUT_TIMEOUT``) have passed in total.
     """
+    deadline = time.monotonic() + (timeout or settings.STRIPE_CHECKOUT_TIMEOUT)
     try:
-        existing_products = stripe.Product.list(limit=100, active=True)
-        product = next(
-            (prod for prod in existing_products.data if prod.name == product_name), None
-        )
+        return {
+            key: future.result(timeout=max(deadline - time.monotonic(), 0))
+            for key, future in futures.items()
+        }
+    except FutureTimeoutError:
+        for future in futures.values():
+            future.cancel()
+        raise TimeoutError("Stripe did not answer in time")
 
-        if not product:
-            product_data = {
-                "name": product_name,
-                "description": product_description,
-                "url": product_url,
-            }
-            if product_image_url:
-                product_data["images"] = [product_image_url]
 
-            product = stripe.Product.create(**product_data)
+def to_unit_amount(price):
+    """
+    Convert a price in crowns to the integer amount Stripe expects.
+    """
+    return int((Decimal(price) * 100).quantize(Decimal(1)))
+
 
-        price_in_cents = int(price * 100)
-        existing_prices = stripe.Price.list(product=product.id, active=True)
-        stripe_price = next(
-            (
-                p
-                for p in existing_prices.data
-                if p.unit_amount == price_in_cents and p.currency == "czk"
-            ),
-            None,
+def _price_cache_key(product_id, kind, unit_amount, currency=STRIPE_CURRENCY):
+    return f"stripe:price:{product_id}:{kind}:{unit_amount}:{currency}"
+
+
+def guarantee_product_data(product):
+    """
+    Stripe product data of the 24-month guarantee for ``product``.
+    """
+    return {
+        "name": f"{product.name} - 24 Month Guarantee",
+        "description": "Extended warranty for 24 months.",
+    }
+
+
+def stripe_product_data(product, kind="product"):
+    """
+    Stripe product data for ``product``, or for its guarantee.
+    """
+    if kind == "guarantee":
+        return guarantee_product_data(product)
+
+    product_data = {
+        "name": product.name,
+        "description": product.description or "No description available",
+        "url": f"{settings.FRONTEND_SITE_URL}/products/{product.slug}",
+    }
+    image = product.gallery.first()
+    if image:
+        product_data["images"] = [image.image.url]
+    return product_data
+
+
+def create_remote_price(unit_amount, stripe_product_id=None, product_data=None):
+    """
+    Create a Stripe Price, and first its Stripe Product when only
+    ``product_data`` is given. Makes no database queries, so it can run on
+    the Stripe pool.
+
+    Returns:
+        tuple: The Stripe Product id and Stripe Price id.
+    """
+    client = get_stripe_client()
+    if stripe_product_id is None:
+        stripe_product_id = client.Product.create(**product_data).id
+    stripe_price = client.Price.create(
+        product=stripe_product_id,
+        unit_amount=unit_amount,
+        currency=STRIPE_CURRENCY,
+    )
+    return stripe_product_id, stripe_price.id
+
+
+def store_stripe_price(product_id, kind, unit_amount, stripe_product_id, price_id):
+    """
+    Record a Stripe Product and Price in the mapping tables and return the
+    Price id to use. A concurrent checkout may have mapped them first, then
+    the stored ones win.
+    """
+    product_map, _ = StripeProductMap.objects.get_or_create(
+        product_id=product_id,
+        kind=kind,
+        defaults={"stripe_product_id": stripe_product_id},
+    )
+    price_map, _ = StripePriceMap.objects.get_or_create(
+        product_map=product_map,
+        unit_amount=unit_amount,
+        currency=STRIPE_CURRENCY,
+        defaults={"stripe_price_id": price_id},
+    )
+    return price_map.stripe_price_id
+
+
+def get_stripe_prices(entries):
+    """
+    Resolve Stripe Price ids for many ``(product, kind, unit_amount)`` entries.
+
+    Looks in the cache first, then in StripePriceMap with one query, and only
+    calls Stripe for prices never used before. Those calls run concurrently
+    on the Stripe pool.
+
+    Returns:
+        dict: ``{(product_id, kind, unit_amount): stripe_price_id}``.
+    """
+    products = {
+        (product.pk, kind, unit_amount): product
+        for product, kind, unit_amount in entries
+    }
+    cache_keys = {key: _price_cache_key(*key) for key in products}
+    cached = cache.get_many(cache_keys.values())
+    prices = {
+        key: cached[cache_key]
+        for key, cache_key in cache_keys.items()
+        if cache_key in cached
+    }
+
+    missing = [key for key in products if key not in prices]
+    if not missing:
+        return prices
+
+    condition = Q()
+    for product_id, kind, unit_amount in missing:
+        condition |= Q(
+            product_map__product_id=product_id,
+            product_map__kind=kind,
+            unit_amount=unit_amount,
         )
+    rows = StripePriceMap.objects.filter(
+        condition, currency=STRIPE_CURRENCY
+    ).values_list(
+        "product_map__product_id",
+        "product_map__kind",
+        "unit_amount",
+        "stripe_price_id",
+    )
+    for product_id, kind, unit_amount, price_id in rows:
+        prices[(product_id, kind, unit_amount)] = price_id
 
-        if not stripe_price:
-            stripe_price = stripe.Price.create(
-                product=product.id,
-                unit_amount=price_in_cents,
-                currency="czk",
+    unmapped = [key for key in missing if key not in prices]
+    if unmapped:
+        mapped = StripeProductMap.objects.filter(
+            product__in={product_id for product_id, _, _ in unmapped}
+        ).values_list("product_id", "kind", "stripe_product_id")
+        product_maps = {
+            (product_id, kind): stripe_product_id
+            for product_id, kind, stripe_product_id in mapped
+        }
+        futures = {}
+        for key in unmapped:
+            product_id, kind, unit_amount = key
+            stripe_product_id = product_maps.get((product_id, kind))
+            futures[key] = get_executor().submit(
+                create_remote_price,
+                unit_amount,
+                stripe_product_id=stripe_product_id,
+                product_data=(
+                    None
+                    if stripe_product_id
+                    else stripe_product_data(products[key], kind)
+                ),
             )
+        for key, (stripe_product_id, price_id) in gather(futures).items():
+            prices[key] = store_stripe_price(*key, stripe_product_id, price_id)
 
-        return product, stripe_price
-    except stripe.error.StripeError as e:
-        print(
-            f"Stripe error occurred: {e.user_message if hasattr(e, 'user_message') else str(e)}"
-        )
-        raise Exception("Failed to interact with Stripe API") from e
+    cache.set_many(
+        {cache_keys[key]: prices[key] for key in missing},
+        timeout=PRICE_CACHE_TIMEOUT,
+    )
+    return prices
 
 
-def get_or_create_stripe_guarantee(product_name, quantity):
+def order_line_entries(items):
     """
-    Gets or creates a Stripe product and price for a 24-month guarantee.
+    Return ``(product, kind, unit_amount, quantity)`` for every checkout line
+    of the given order items, guarantees included.
     """
-    guarantee_product_name = f"{product_name} - 24 Month Guarantee"
-    guarantee_description = "Extended warranty for 24 months."
-    guarantee_price = 1250  # Fixed guarantee cost per item
-
-    try:
-        guarantee_product, guarantee_stripe_price = (
-            get_or_create_stripe_product_and_price(
-                product_name=guarantee_product_name,
-                product_description=guarantee_description,
-                price=guarantee_price,
+    entries = []
+    for item in items:
+        entries.append(
+            (
+                item.product,
+                "product",
+                to_unit_amount(item.product.discounted_price()),
+                item.quantity,
             )
         )
-        return {"price": guarantee_stripe_price.id, "quantity": quantity}
-    except Exception as e:
-        print(f"Error creating Stripe guarantee product for {product_name}: {e}")
-        return None
+        if item.long_term_guarantee_selected:
+            entries.append(
+                (
+                    item.product,
+                    "guarantee",
+                    to_unit_amount(LONG_TERM_GUARANTEE_PRICE),
+                    item.quantity,
+                )
+            )
+    return entries
 
 
 def create_stripe_products_from_order(order):
     """
-    Creates Stripe products and prices for each item in an order.
+    Build the Stripe line items of an order from mapped Stripe Prices.
 
     Args:
         order (Order): The order instance containing items.
@@ -97,39 +269,81 @@ def create_stripe_products_from_order(order):
     Returns:
         list: Stripe line items for creating a Checkout Session.
     """
+    entries = order_line_entries(order.items.select_related("product"))
+    prices = get_stripe_prices(
+        (product, kind, unit_amount) for product, kind, unit_amount, _ in entries
+    )
+    return [
+        {"price": prices[(product.pk, kind, unit_amount)], "quantity": quantity}
+        for product, kind, unit_amount, quantity in entries
+    ]
+
+
+def create_inline_line_items(order):
+    """
+    Build the Stripe line items of an order with inline ``price_data``, so the
+    Checkout Session is the only Stripe call whatever the cart size.
+
+    Args:
+        order (Order): The order instance containing items.
+
+    Returns:
+        list: Stripe line items for creating a Checkout Session.
+    """
+    items = order.items.select_related("product").prefetch_related("product__gallery")
     line_items = []
+    for product, kind, unit_amount, quantity in order_line_entries(items):
+        if kind == "guarantee":
+            product_data = guarantee_product_data(product)
+        else:
+            product_data = {"name": product.name}
+            # Stripe rejects empty descriptions
+            if product.description:
+                product_data["description"] = product.description
+            images = product.gallery.all()
+            if images:
+                product_data["images"] = [images[0].image.url]
 
-    for item in order.items.all():
-        product_name = item.product.name
-        product_description = item.product.description or "No description available"
-        product_price = item.product.discounted_price()
-        quantity = item.quantity
-        product_image_url = (
-            f"{item.product.gallery.first().image.url}"
-            if item.product.gallery.exists()
-            else None
+        line_items.append(
+            {
+                "price_data": {
+                    "currency": STRIPE_CURRENCY,
+                    "unit_amount": unit_amount,
+                    "product_data": product_data,
+                },
+                "quantity": quantity,
+            }
         )
-        product_url = f"{settings.FRONTEND_SITE_URL}/products/{item.product.slug}"
-
-        try:
-            product, stripe_price = get_or_create_stripe_product_and_price(
-                product_name=product_name,
-                product_description=product_description,
-                price=product_price,
-                product_url=product_url,
-                product_image_url=product_image_url,
-            )
-            line_items.append({"price": stripe_price.id, "quantity": quantity})
+    return line_items
 
-            if item.long_term_guarantee_selected:
-                guarantee_item = get_or_create_stripe_guarantee(product_name, quantity)
-                if guarantee_item:
-                    line_items.append(guarantee_item)
-        except Exception as e:
-            print(f"Error creating Stripe product/price for {product_name}: {e}")
-            continue
 
-    return line_items
+# settings.STRIPE_CHECKOUT_LINE_ITEMS -> line item builder
+LINE_ITEM_BUILDERS = {
+    "catalogue": create_stripe_products_from_order,
+    "inline": create_inline_line_items,
+}
+
+
+def build_checkout_line_items(order, mode=None):
+    """
+    Build the Stripe line items of an order in the given mode, by default
+    ``settings.STRIPE_CHECKOUT_LINE_ITEMS``.
+    """
+    mode = mode or settings.STRIPE_CHECKOUT_LINE_ITEMS
+    try:
+        builder = LINE_ITEM_BUILDERS[mode]
+    except KeyError:
+        raise ImproperlyConfigured(
+            f"STRIPE_CHECKOUT_LINE_ITEMS must be one of {', '.join(LINE_ITEM_BUILDERS)}."
+        )
+    return builder(order)
+
+
+def create_remote_customer(email, name):
+    """
+    Create a Stripe customer and return its id, without database queries.
+    """
+    return get_stripe_client().Customer.create(email=email, name=name)["id"]
 
 
 def get_or_create_stripe_customer(user):
@@ -147,13 +361,42 @@ def get_or_create_stripe_customer(user):
         return user.stripe_customer_id
 
     # Create a new customer on Stripe
-    customer = stripe.Customer.create(
-        email=user.email,
-        name=f"{user.first_name} {user.last_name}",
+    return save_stripe_customer(
+        user,
+        create_remote_customer(user.email, f"{user.first_name} {user.last_name}"),
     )
 
+
+def save_stripe_customer(user, customer_id):
     # Save the Stripe customer ID to the user model
-    user.stripe_customer_id = customer["id"]
-    user.save()
+    user.stripe_customer_id = customer_id
+    user.save(update_fields=["stripe_customer_id"])
+    return customer_id
+
+
+def prepare_checkout(order, mode=None):
+    """
+    Resolve everything a Checkout Session for ``order`` needs.
+
+    A missing Stripe customer is created on the Stripe pool while the line
+    items are built, whose own missing Prices are created concurrently too,
+    so a cold checkout costs about two round trips however large the cart.
+
+    Returns:
+        tuple: The Stripe line items and the Stripe customer ID.
+    """
+    user = order.user
+    customer = None
+    if not user.stripe_customer_id:
+        customer = get_executor().submit(
+            create_remote_customer,
+            user.email,
+            f"{user.first_name} {user.last_name}",
+        )
+
+    line_items = build_checkout_line_items(order, mode)
 
-    return customer["id"]
+    if customer is None:
+        return line_items, user.stripe_customer_id
+    customer_id = gather({"customer": customer})["customer"]
+    return line_items, save_stripe_customer(user, customer_id)
@@ -0,0 +1,89 @@
+import logging
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.urls import reverse
+
+from backend.emails import render_email
+from jobs.queue import task
+from users.models import User
+from .models import Order
+from .reservations import InsufficientStock, commit_stock
+
+logger = logging.getLogger(__name__)
+
+
+@task
+def notify_paid_order(order_id):
+    """
+    Tell the admins about a paid order, whose stock the webhook committed.
+    """
+    send_order_email(Order.objects.select_related("user").get(pk=order_id))
+
+
+def commit_paid_stock(order):
+    """
+    Sell the stock held for a paid ``order``, logging a shortfall instead of
+    raising: the payment went through, so the admins sort it out.
+    """
+    try:
+        commit_stock(order)
+    except InsufficientStock as e:
+        logger.error("Order #%s paid with %s", order.id, e)
+
+
+def order_email_context(order):
+    """
+    Build the admin email context of an order. The items, products and
+    images come from one prefetched queryset, so the query count does not
+    grow with the order.
+    """
+    items = order.items.select_related("product").prefetch_related("product__gallery")
+    admin_url = (
+        f"{settings.SITE_URL}{reverse('admin:orders_order_change', args=[order.id])}"
+    )
+
+    items_data = []
+    for item in items:
+        images = item.product.gallery.all()
+        items_data.append(
+            {
+                "product_name": item.product.name,
+                "quantity": item.quantity,
+                "price": item.product.discounted_price(),
+                "product_image": images[0].image.url if images else "",
+                "long_term_guarantee_selected": item.long_term_guarantee_selected,
+            }
+        )
+
+    return {
+        "first_name": order.user.first_name,
+        "last_name": order.user.last_name,
+        "email": order.user.email,
+        "phone": order.phone,
+        "address": order.address,
+        "city": order.city,
+        "postal_code": order.postal_code,
+        "country": order.country,
+        "total_price": order.total_price,
+        "items": items_data,
+        "order_notes": order.order_notes,
+        "admin_url": admin_url,
+    }
+
+
+def send_order_email(order):
+    """
+    Sends an order notification email to the admin.
+    """
+    admin_emails = User.objects.filter(is_superuser=True).values_list(
+        "email", flat=True
+    )
+
+    send_mail(
+        subject=f"RideFuture: New Order #{order.id}",
+        message="",
+        html_message=render_email("orderCreated.html", order_email_context(order)),
+        from_email=settings.EMAIL_HOST_USER,
+        recipient_list=list(admin_emails),
+    )
@@ -0,0 +1,79 @@
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+
+
+class FakeStripeObject(dict):
+    """
+    Stripe objects allow both ``obj["id"]`` and ``obj.id``.
+    """
+
+    __getattr__ = dict.__getitem__
+
+
+class FakeStripeResource:
+    def __init__(self, client, name, prefix):
+        self.client = client
+        self.name = name
+        self.prefix = prefix
+
+    def create(self, **params):
+        if self.name in self.client.failing:
+            raise RuntimeError(f"Stripe refused to create the {self.name}")
+        with self.client.request():
+            obj = FakeStripeObject(
+                params, id=f"{self.prefix}_{next(self.client.ids)}", object=self.name
+            )
+        self.client.calls.append((self.name, params))
+        if self.name == "checkout.session":
+            obj["url"] = f"https://checkout.stripe.test/{obj['id']}"
+        return obj
+
+
+class FakeStripe:
+    """
+    In-memory, thread-safe stand-in for the stripe module that records every
+    API call, installed with
+    ``override_settings(STRIPE_CLIENT="orders.testing.fake_stripe")``.
+
+    ``latency`` simulates the round trip of each call and ``max_in_flight``
+    tells how many ran at once. Creating a resource named in ``failing``
+    raises.
+    """
+
+    def __init__(self):
+        self.Product = FakeStripeResource(self, "product", "prod")
+        self.Price = FakeStripeResource(self, "price", "price")
+        self.Customer = FakeStripeResource(self, "customer", "cus")
+        self.checkout = FakeStripeObject(
+            Session=FakeStripeResource(self, "checkout.session", "cs")
+        )
+        self.lock = threading.Lock()
+        # Ids stay unique across resets, like Stripe's
+        self.ids = itertools.count(1)
+        self.reset()
+
+    def reset(self, latency=0, failing=()):
+        self.calls = []
+        self.latency = latency
+        self.failing = set(failing)
+        self.in_flight = self.max_in_flight = 0
+
+    @contextmanager
+    def request(self):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.latency)
+            yield
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+    def call_names(self):
+        return [name for name, _ in self.calls]
+
+
+fake_stripe = FakeStripe()
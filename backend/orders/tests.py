@@ -1,3 +1,555 @@
-from django.test import TestCase
+import hashlib
+import hmac
+import json
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.core import mail
+from django.db import connection
+from django.core.cache import cache
+from django.test import (
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+    skipUnlessDBFeature,
+)
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from jobs.models import Job
+from products.models import Category, Product, ProductGallery
+from users.models import User
+from .models import Order, OrderItem, StockReservation, StripePriceMap
+from .reservations import (
+    InsufficientStock,
+    cancel_unpaid_order,
+    release_expired_reservations,
+    reserve_stock,
+)
+from .serializers import OrderSerializer
+from .tasks import send_order_email
+from .testing import fake_stripe
+
+
+def order_fields(**extra):
+    return {
+        "phone": "+420123456789",
+        "country": "Czechia",
+        "address": "Main street 1",
+        "postal_code": "11000",
+        "city": "Prague",
+        **extra,
+    }
+
+
+class OrderTotalTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name="Scooters")
+        cls.products = [
+            Product.objects.create(
+                name=f"Scooter {i}",
+                price=Decimal("10000") + i,
+                discount_percentage=10,
+                stock=5,
+                category=category,
+            )
+            for i in range(10)
+        ]
+        cls.user = User.objects.create_user(email="rider@example.com")
+
+    def expected_total(self, items):
+        return sum(
+            (product.discounted_price() + (1250 if guarantee else 0)) * quantity
+            for product, quantity, guarantee in items
+        )
+
+    def test_create_costs_the_same_for_any_number_of_items(self):
+        def create(count):
+            data = order_fields(
+                email="rider@example.com",
+                first_name="Ride",
+                last_name="Future",
+                items=[
+                    {
+                        "product_id": product.id,
+                        "quantity": 2,
+                        "long_term_guarantee_selected": i % 2 == 0,
+                    }
+                    for i, product in enumerate(self.products[:count])
+                ],
+            )
+            serializer = OrderSerializer(data=data)
+            serializer.is_valid(raise_exception=True)
+            with CaptureQueriesContext(connection) as queries:
+                order = serializer.save()
+            return order, len(queries)
+
+        small_order, small_queries = create(2)
+        large_order, large_queries = create(10)
+
+        self.assertEqual(small_queries, large_queries)
+        order = Order.objects.get(pk=large_order.pk)
+        self.assertEqual(
+            order.total_price,
+            self.expected_total(
+                (product, 2, i % 2 == 0) for i, product in enumerate(self.products)
+            ),
+        )
+
+    def test_items_are_validated_in_one_query(self):
+        items = [
+            {"product_id": product.id, "quantity": 2, "price": "9000.00"}
+            for product in self.products
+        ]
+        serializer = OrderSerializer(data=order_fields(items=items))
+        with CaptureQueriesContext(connection) as queries:
+            self.assertFalse(serializer.is_valid())
+        self.assertEqual(len(queries), 1)
+        # 10000 + i with 10% off
+        self.assertEqual(serializer.errors["items"][0], {})
+        self.assertIn("now 9000.90", serializer.errors["items"][1]["price"][0])
+
+        items = [
+            {"product_id": self.products[0].id, "quantity": 3},
+            {"product_id": self.products[0].id, "quantity": 3},
+            {"product_id": 999999, "quantity": 1},
+        ]
+        serializer = OrderSerializer(data=order_fields(items=items))
+        self.assertFalse(serializer.is_valid())
+        errors = serializer.errors["items"]
+        self.assertIn("Only 5", errors[0]["quantity"][0])
+        self.assertIn("does not exist", errors[2]["product_id"][0])
+
+    def test_item_edits_shift_the_total(self):
+        order = Order.create_with_items(
+            [{"product": self.products[0], "quantity": 1}],
+            user=self.user,
+            **order_fields(),
+        )
+        item = order.items.get()
+
+        item.quantity = 3
+        item.long_term_guarantee_selected = True
+        item.save()
+        added = OrderItem.objects.create(
+            order=order, product=self.products[1], quantity=1
+        )
+        order.refresh_from_db()
+        self.assertEqual(
+            order.total_price,
+            self.expected_total(
+                [(self.products[0], 3, True), (self.products[1], 1, False)]
+            ),
+        )
+
+        added.delete()
+        order.refresh_from_db()
+        self.assertEqual(
+            order.total_price, self.expected_total([(self.products[0], 3, True)])
+        )
+
+        # The incremental total agrees with a full recalculation
+        order.calculate_total_price()
+        order.refresh_from_db()
+        self.assertEqual(
+            order.total_price, self.expected_total([(self.products[0], 3, True)])
+        )
+
+
+def create_order(user, *items):
+    return Order.create_with_items(
+        [{"product": product, "quantity": quantity} for product, quantity in items],
+        user=user,
+        **order_fields(),
+    )
+
+
+class StockReservationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name="Scooters")
+        cls.scooter = Product.objects.create(
+            name="Scooter", price=1000, stock=3, category=category
+        )
+        cls.helmet = Product.objects.create(
+            name="Helmet", price=100, stock=1, category=category
+        )
+        cls.user = User.objects.create_user(email="rider@example.com")
+        User.objects.create_superuser(email="admin@example.com", password="secret")
+
+    def stock(self, product):
+        product.refresh_from_db()
+        return product.stock
+
+    def test_short_product_reserves_nothing(self):
+        order = create_order(self.user, (self.scooter, 2), (self.helmet, 2))
+        with self.assertRaises(InsufficientStock) as raised:
+            reserve_stock(order)
+
+        self.assertEqual(raised.exception.product_names, ["Helmet"])
+        self.assertEqual(self.stock(self.scooter), 3)
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_expired_reservations_are_released(self):
+        expired = create_order(self.user, (self.helmet, 1))
+        reserve_stock(expired, expires_at=timezone.now() - timedelta(minutes=1))
+        self.assertEqual(self.stock(self.helmet), 0)
+
+        # A new checkout reclaims the stock of the lapsed one
+        order = create_order(self.user, (self.helmet, 1))
+        reserve_stock(order)
+        self.assertEqual(self.stock(self.helmet), 0)
+        expired.refresh_from_db()
+        self.assertEqual(expired.status, "canceled")
+
+        self.assertEqual(release_expired_reservations(), 0)
+
+    def test_paid_orders_keep_expired_reservations(self):
+        paid = create_order(self.user, (self.helmet, 1))
+        reserve_stock(paid, expires_at=timezone.now() - timedelta(minutes=1))
+        Order.objects.filter(pk=paid.pk).update(paid_at=timezone.now())
+
+        self.assertEqual(release_expired_reservations(), 0)
+        self.assertEqual(self.stock(self.helmet), 0)
+        self.assertEqual(paid.reservations.get().status, "reserved")
+
+    def test_paid_orders_are_not_canceled(self):
+        paid = create_order(self.user, (self.helmet, 1))
+        reserve_stock(paid)
+        Order.objects.filter(pk=paid.pk).update(paid_at=timezone.now())
+
+        self.assertEqual(cancel_unpaid_order(paid), 0)
+        paid.refresh_from_db()
+        self.assertEqual(paid.status, "pending")
+        self.assertEqual(paid.reservations.get().status, "reserved")
+
+    def test_cancel_releases_unpaid_orders_only(self):
+        canceled = create_order(self.user, (self.scooter, 1))
+        reserve_stock(canceled)
+        self.assertEqual(self.stock(self.scooter), 2)
+        self.client.get(f"/api/order-cancel/{canceled.id}/")
+        self.assertEqual(self.stock(self.scooter), 3)
+
+        paid = create_order(self.user, (self.scooter, 1))
+        Order.objects.filter(pk=paid.pk).update(paid_at=timezone.now())
+        response = self.client.get(f"/api/order-cancel/{paid.id}/")
+        self.assertEqual(response.status_code, 404)
+
+
+WEBHOOK_SECRET = "whsec_test"
+
+
+def post_stripe_event(client, event_type, session, secret=WEBHOOK_SECRET):
+    """
+    Post a Stripe event to the webhook, signed like Stripe signs it.
+    """
+    payload = json.dumps(
+        {"id": "evt_test", "type": event_type, "data": {"object": session}}
+    )
+    timestamp = int(time.time())
+    signature = hmac.new(
+        secret.encode(), f"{timestamp}.{payload}".encode(), hashlib.sha256
+    ).hexdigest()
+    return client.post(
+        "/api/stripe/webhook/",
+        payload,
+        content_type="application/json",
+        HTTP_STRIPE_SIGNATURE=f"t={timestamp},v1={signature}",
+    )
+
+
+@override_settings(STRIPE_WEBHOOK_SECRET=WEBHOOK_SECRET, JOBS_EAGER=True)
+class StripeWebhookTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name="Scooters")
+        cls.scooter = Product.objects.create(
+            name="Scooter", price=1000, stock=3, category=category
+        )
+        User.objects.create_superuser(email="admin@example.com", password="secret")
+
+    def setUp(self):
+        user = User.objects.create_user(email="rider@example.com")
+        self.order = create_order(user, (self.scooter, 2))
+        reserve_stock(self.order)
+        Order.objects.filter(pk=self.order.pk).update(stripe_session_id="cs_test_1")
+        self.session = {
+            "id": "cs_test_1",
+            "payment_status": "paid",
+            "metadata": {"order_id": str(self.order.pk)},
+        }
+
+    def test_completed_session_confirms_once(self):
+        response = self.client.get(f"/api/order-success/{self.order.id}/")
+        self.assertIn("pending=true", response["Location"])
+
+        for _ in range(2):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = post_stripe_event(
+                    self.client, "checkout.session.completed", self.session
+                )
+            self.assertEqual(response.status_code, 200)
+
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, "confirmed")
+        self.assertIsNotNone(self.order.paid_at)
+        self.assertEqual(self.order.reservations.get().status, "committed")
+        self.assertEqual(len(mail.outbox), 1)
+
+        response = self.client.get(f"/api/order-success/{self.order.id}/")
+        self.assertNotIn("pending", response["Location"])
+
+    @override_settings(JOBS_EAGER=False)
+    def test_stock_is_committed_without_a_worker(self):
+        post_stripe_event(self.client, "checkout.session.completed", self.session)
+
+        self.assertEqual(self.order.reservations.get().status, "committed")
+        job = Job.objects.get()
+        self.assertEqual(job.name, "orders.tasks.notify_paid_order")
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_forged_events_are_rejected(self):
+        response = post_stripe_event(
+            self.client, "checkout.session.completed", self.session, secret="wrong"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.order.refresh_from_db()
+        self.assertIsNone(self.order.paid_at)
+
+    def test_expired_session_releases_stock(self):
+        post_stripe_event(self.client, "checkout.session.expired", self.session)
+        self.scooter.refresh_from_db()
+        self.assertEqual(self.scooter.stock, 3)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, "canceled")
+
+
+class OrderEmailTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name="Scooters")
+        cls.products = [
+            Product.objects.create(
+                name=f"Scooter {i}", price=1000, stock=5, category=category
+            )
+            for i in range(6)
+        ]
+        ProductGallery.objects.bulk_create(
+            ProductGallery(product=product, image=f"product_gallery/{product.pk}.jpg")
+            for product in cls.products
+            for _ in range(2)
+        )
+        cls.user = User.objects.create_user(email="rider@example.com")
+        User.objects.create_superuser(email="admin@example.com", password="secret")
+
+    def queries_to_email(self, products):
+        order = create_order(self.user, *((product, 1) for product in products))
+        order = Order.objects.select_related("user").get(pk=order.pk)
+        with CaptureQueriesContext(connection) as queries:
+            send_order_email(order)
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_items(self):
+        self.assertEqual(
+            self.queries_to_email(self.products[:1]),
+            self.queries_to_email(self.products),
+        )
+        body = mail.outbox[-1].alternatives[0][0]
+        self.assertIn("Scooter 5", body)
+        self.assertIn(f"product_gallery/{self.products[5].pk}.jpg", body)
+        self.assertIn("/static/logo.png", body)
+
+
+class ConcurrentReservationTests(TransactionTestCase):
+    """
+    Hammer the reservation engine from many threads, each on its own
+    database connection, and check nothing is oversold.
+    """
+
+    threads = 12
+    stock = 5
+
+    def hammer(self, target, count):
+        barrier = threading.Barrier(count)
+        results = []
+
+        def run(index):
+            try:
+                barrier.wait()
+                results.append(target(index))
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return results
+
+    @skipUnlessDBFeature("has_select_for_update")
+    def test_concurrent_checkouts_never_oversell(self):
+        category = Category.objects.create(name="Scooters")
+        products = [
+            Product.objects.create(
+                name=f"Scooter {i}", price=1000, stock=self.stock, category=category
+            )
+            for i in range(2)
+        ]
+        user = User.objects.create_user(email="rider@example.com")
+        # Half of the orders list the products in reverse, which would
+        # deadlock without the ordered locking
+        orders = [
+            create_order(user, *((product, 1) for product in products[:: (-1) ** i]))
+            for i in range(self.threads)
+        ]
+
+        def checkout(index):
+            try:
+                reserve_stock(orders[index])
+                return True
+            except InsufficientStock:
+                return False
+
+        results = self.hammer(checkout, self.threads)
+
+        self.assertEqual(results.count(True), self.stock)
+        for product in products:
+            product.refresh_from_db()
+            self.assertEqual(product.stock, 0)
+        self.assertEqual(
+            StockReservation.objects.filter(status="reserved").count(),
+            self.stock * len(products),
+        )
+
+
+@override_settings(STRIPE_CLIENT="orders.testing.fake_stripe")
+class StripeCheckoutTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name="Scooters")
+        cls.products = [
+            Product.objects.create(
+                name=f"Scooter {i}",
+                price=1000 + i,
+                discount_percentage=10,
+                stock=10,
+                category=category,
+            )
+            for i in range(3)
+        ]
+
+    def setUp(self):
+        fake_stripe.reset()
+        cache.clear()
+
+    def checkout(self):
+        response = self.client.post(
+            "/api/orders/",
+            {
+                **order_fields(
+                    email="rider@example.com", first_name="Ride", last_name="Future"
+                ),
+                "items": [
+                    {
+                        "product_id": product.id,
+                        "quantity": 1,
+                        "long_term_guarantee_selected": product == self.products[0],
+                    }
+                    for product in self.products
+                ],
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201, response.data)
+        return response
+
+    def test_warm_catalogue_only_creates_the_session(self):
+        self.checkout()
+        self.assertEqual(
+            sorted(fake_stripe.call_names()),
+            ["checkout.session", "customer"] + ["price"] * 4 + ["product"] * 4,
+        )
+        session = fake_stripe.calls[-1][1]
+        self.assertEqual(len(session["line_items"]), 4)
+        self.assertEqual(
+            StripePriceMap.objects.get(
+                product_map__product=self.products[1], product_map__kind="product"
+            ).unit_amount,
+            90090,
+        )
+
+        fake_stripe.reset()
+        self.checkout()
+        self.assertEqual(fake_stripe.call_names(), ["checkout.session"])
+
+        # Mapped prices are still found once the cache is gone
+        cache.clear()
+        fake_stripe.reset()
+        self.checkout()
+        self.assertEqual(fake_stripe.call_names(), ["checkout.session"])
+
+    def test_price_change_creates_one_new_price(self):
+        self.checkout()
+        product = self.products[2]
+        product.price = 2000
+        product.save()
+
+        fake_stripe.reset()
+        self.checkout()
+        self.assertEqual(fake_stripe.call_names(), ["price", "checkout.session"])
+
+    @override_settings(STRIPE_CHECKOUT_LINE_ITEMS="inline")
+    def test_inline_mode_makes_a_single_call(self):
+        self.checkout()
+        self.assertEqual(fake_stripe.call_names(), ["customer", "checkout.session"])
+
+        line_items = fake_stripe.calls[-1][1]["line_items"]
+        self.assertEqual(len(line_items), 4)
+        self.assertEqual(
+            line_items[0]["price_data"],
+            {
+                "currency": "czk",
+                "unit_amount": 90000,
+                "product_data": {"name": "Scooter 0"},
+            },
+        )
+        self.assertEqual(line_items[1]["price_data"]["unit_amount"], 125000)
+        self.assertFalse(StripePriceMap.objects.exists())
+
+    def test_failed_checkout_gives_the_stock_back(self):
+        for failing in ("customer", "checkout.session"):
+            fake_stripe.reset(failing=[failing])
+            response = self.client.post(
+                "/api/orders/",
+                {
+                    **order_fields(
+                        email="rider@example.com", first_name="Ride", last_name="Future"
+                    ),
+                    "items": [{"product_id": self.products[0].id, "quantity": 2}],
+                },
+                format="json",
+            )
+            self.assertEqual(response.status_code, 400)
+
+            self.products[0].refresh_from_db()
+            self.assertEqual(self.products[0].stock, 10)
+            order = Order.objects.latest("pk")
+            self.assertEqual(order.status, "canceled")
+            self.assertEqual(order.reservations.get().status, "released")
+
+    def test_cold_checkout_calls_stripe_concurrently(self):
+        fake_stripe.reset(latency=0.1)
+        started = time.monotonic()
+        self.checkout()
+        elapsed = time.monotonic() - started
+
+        # Customer, 4 Products and 4 Prices, then the session
+        self.assertEqual(len(fake_stripe.calls), 10)
+        self.assertGreater(fake_stripe.max_in_flight, 1)
+        # Product and Price chains overlap: about three round trips, not ten
+        self.assertLess(elapsed, 0.6)
@@ -1,6 +1,11 @@
 from rest_framework.routers import DefaultRouter
 from django.urls import path, include
-from .views import OrderViewSet, OrderSuccessView, OrderCancelView
+from .views import (
+    OrderViewSet,
+    OrderSuccessView,
+    OrderCancelView,
+    StripeWebhookView,
+)
 
 router = DefaultRouter()
 router.register(r"orders", OrderViewSet, basename="order")
@@ -14,6 +19,7 @@ custom_urls = [
     path(
         "order-cancel/<int:order_id>/", OrderCancelView.as_view(), name="order_cancel"
     ),
+    path("stripe/webhook/", StripeWebhookView.as_view(), name="stripe_webhook"),
 ]
 
 # Combine the router URLs and custom URLs
@@ -3,20 +3,16 @@ import stripe
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.status import HTTP_201_CREATED, HTTP_400_BAD_REQUEST
-from django.core.mail import send_mail
-from django.template.loader import render_to_string
 from django.conf import settings
-from django.urls import reverse
+from django.db import transaction
 from rest_framework.permissions import AllowAny
 from rest_framework.viewsets import ModelViewSet
 
-from users.models import User
 from .models import Order
+from .reservations import InsufficientStock, cancel_unpaid_order, reserve_stock
 from .serializers import OrderSerializer
-from .stripe import (
-    create_stripe_products_from_order,
-    get_or_create_stripe_customer,
-)
+from .webhooks import EVENT_HANDLERS
+from .stripe import get_stripe_client, prepare_checkout
 from rest_framework import status
 from rest_framework_simplejwt.tokens import RefreshToken
 from users.serializers import UserSerializer
@@ -29,37 +25,42 @@ class OrderViewSet(ModelViewSet):
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        order = serializer.save()
 
-        # Generate Stripe line items
+        # Hold the stock until the order is paid or the checkout expires
         try:
-            line_items = create_stripe_products_from_order(order)
-        except Exception as e:
-            return Response(
-                {"error": f"Failed to create Stripe products and prices: {str(e)}"},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-
+            with transaction.atomic():
+                order = serializer.save()
+                reserved_until = reserve_stock(order)
+        except InsufficientStock as e:
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
+
+        # Resolve line items and the Stripe customer, concurrently. Without a
+        # checkout the order cannot be paid, so it gives its stock back.
         try:
-            customer_id = get_or_create_stripe_customer(order.user)
+            line_items, customer_id = prepare_checkout(order)
         except Exception as e:
+            cancel_unpaid_order(order)
             return Response(
-                {"error": f"Failed to create Stripe customer: {str(e)}"},
+                {"error": f"Failed to prepare Stripe checkout: {str(e)}"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
         # Create Stripe Checkout Session
         try:
-            session = stripe.checkout.Session.create(
+            session = get_stripe_client().checkout.Session.create(
                 customer=customer_id,
                 line_items=line_items,
                 mode="payment",
                 success_url=f"{settings.SITE_URL}/api/order-success/{order.id}/",
                 cancel_url=f"{settings.SITE_URL}/api/order-cancel/{order.id}/",
                 metadata={"order_id": order.id},
+                expires_at=int(reserved_until.timestamp()),
             )
             checkout_url = session.url
+            # The webhook finds the order by its session
+            Order.objects.filter(pk=order.pk).update(stripe_session_id=session.id)
         except Exception as e:
+            cancel_unpaid_order(order)
             return Response(
                 {"error": f"Failed to create Stripe Checkout Session: {str(e)}"},
                 status=status.HTTP_400_BAD_REQUEST,
@@ -83,83 +84,49 @@ class OrderViewSet(ModelViewSet):
 
 class OrderSuccessView(APIView):
     """
-    Handles the success callback from Stripe after payment.
+    Handles the success redirect from Stripe after payment.
+
+    Only reads the order: confirmation arrives through the Stripe webhook,
+    which may land just after the customer does.
     """
 
     permission_classes = [AllowAny]
 
     def get(self, request, order_id):
-        order = get_object_or_404(Order, id=order_id)
-
-        # Mark the order as paid
-        order.status = "confirmed"
-        for item in order.items.all():
-            if item.product.stock >= item.quantity:
-                item.product.stock -= item.quantity
-                item.product.save()
-            else:
-                raise ValueError(f"Not enough stock for product {item.product.name}")
-
-        order.save()
-
-        self._send_order_email(order)
+        order = get_object_or_404(Order.objects.only("paid_at"), id=order_id)
 
         success_url = f"{settings.FRONTEND_SITE_URL}/order/finished?success=true"
+        if order.paid_at is None:
+            success_url += "&pending=true"
 
         return redirect(success_url)
 
-    def _send_order_email(self, order):
-        """
-        Sends an order notification email to the admin.
-        """
-        items = order.items.all()
-        admin_url = f"{settings.SITE_URL}{reverse('admin:orders_order_change', args=[order.id])}"
 
-        items_data = [
-            {
-                "product_name": item.product.name,
-                "quantity": item.quantity,
-                "price": item.product.discounted_price(),
-                "product_image": (
-                    f"{item.product.gallery.first().image.url}"
-                    if item.product.gallery.exists()
-                    else ""
-                ),
-                "long_term_guarantee_selected": item.long_term_guarantee_selected,
-            }
-            for item in items
-        ]
-
-        email_content = render_to_string(
-            "email/orderCreated.html",
-            {
-                "logo_url": f"{settings.SITE_URL}/static/logo.png",
-                "first_name": order.user.first_name,
-                "last_name": order.user.last_name,
-                "email": order.user.email,
-                "phone": order.phone,
-                "address": order.address,
-                "city": order.city,
-                "postal_code": order.postal_code,
-                "country": order.country,
-                "total_price": order.total_price,
-                "items": items_data,
-                "order_notes": order.order_notes,
-                "admin_url": admin_url,
-            },
-        )
+class StripeWebhookView(APIView):
+    """
+    Receives signed ``checkout.session.*`` events from Stripe.
+    """
 
-        admin_emails = User.objects.filter(is_superuser=True).values_list(
-            "email", flat=True
-        )
+    permission_classes = [AllowAny]
+    authentication_classes = []
 
-        send_mail(
-            subject=f"RideFuture: New Order #{order.id}",
-            message="",
-            html_message=email_content,
-            from_email=settings.EMAIL_HOST_USER,
-            recipient_list=list(admin_emails),
-        )
+    def post(self, request):
+        try:
+            event = stripe.Webhook.construct_event(
+                request.body,
+                request.headers.get("Stripe-Signature", ""),
+                settings.STRIPE_WEBHOOK_SECRET,
+            )
+        except (ValueError, stripe.error.SignatureVerificationError):
+            return Response(
+                {"error": "Invalid payload or signature."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        handler = EVENT_HANDLERS.get(event["type"])
+        if handler is not None:
+            handler(event["data"]["object"])
+        return Response({"received": True})
 
 
 class OrderCancelView(APIView):
@@ -170,7 +137,8 @@ class OrderCancelView(APIView):
     permission_classes = [AllowAny]
 
     def get(self, request, order_id):
-        order = get_object_or_404(Order, id=order_id)
+        # Paid orders stay, whoever opens this URL
+        order = get_object_or_404(Order, id=order_id, paid_at__isnull=True)
         order.delete()
 
         cancel_url = f"{settings.FRONTEND_SITE_URL}/order/finished?success=false"
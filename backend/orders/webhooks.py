@@ -0,0 +1,72 @@
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Order
+from .reservations import release_order_stock
+from .tasks import commit_paid_stock, notify_paid_order
+
+
+def _lock_session_order(session):
+    """
+    Lock and return the order of a Checkout Session: the one holding its id,
+    or the one named in its metadata if the id was never stored.
+    """
+    order_id = (session.get("metadata") or {}).get("order_id")
+    condition = Q(stripe_session_id=session["id"])
+    if order_id:
+        condition |= Q(pk=order_id, stripe_session_id__isnull=True)
+    return Order.objects.select_for_update().filter(condition).first()
+
+
+def handle_checkout_completed(session):
+    """
+    Mark the order of a paid Checkout Session as confirmed, sell its stock
+    in the same transaction and queue the admin email.
+
+    Stripe delivers events at least once. The order row is locked and
+    ``paid_at`` checked, so redeliveries of the same session are no-ops.
+    Returns whether this delivery confirmed the order.
+    """
+    if session.get("payment_status") != "paid":
+        # Delayed payment methods complete unpaid and succeed later
+        return False
+
+    with transaction.atomic():
+        order = _lock_session_order(session)
+        if order is None or order.paid_at:
+            return False
+        order.stripe_session_id = session["id"]
+        order.paid_at = timezone.now()
+        order.status = "confirmed"
+        order.save(
+            update_fields=["stripe_session_id", "paid_at", "status", "updated_at"]
+        )
+        # Committed here, not in a job, so a lagging worker cannot leave a
+        # paid order's stock to be released as expired
+        commit_paid_stock(order)
+        notify_paid_order.enqueue(order.pk)
+    return True
+
+
+def handle_checkout_expired(session):
+    """
+    Return the stock of an order whose Checkout Session expired unpaid.
+    """
+    with transaction.atomic():
+        order = _lock_session_order(session)
+        if order is None or order.paid_at:
+            return False
+        release_order_stock(order)
+        if order.status == "pending":
+            order.status = "canceled"
+            order.save(update_fields=["status", "updated_at"])
+    return True
+
+
+# Stripe event type -> handler taking the Checkout Session
+EVENT_HANDLERS = {
+    "checkout.session.completed": handle_checkout_completed,
+    "checkout.session.async_payment_succeeded": handle_checkout_completed,
+    "checkout.session.expired": handle_checkout_expired,
+}
@@ -95,6 +95,7 @@ class ProductAdmin(ModelAdmin, TranslationAdmin, ImportExportModelAdmin):
         "name",
         "price",
         "discount_percentage",
+        "effective_price",
         "stock",
         "category",
         "is_featured",
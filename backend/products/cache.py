@@ -0,0 +1,155 @@
+import functools
+import hashlib
+import time
+
+from django.core.cache import caches
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.utils.translation import get_language
+from rest_framework import status
+from rest_framework.response import Response
+
+# Cache alias holding catalogue responses and their generation counters
+CACHE_ALIAS = "catalogue"
+
+# Generation scopes. Category writes change every payload that embeds
+# category data, product writes only those listing products.
+CATEGORIES_SCOPE = "categories"
+PRODUCTS_SCOPE = "products"
+
+
+def category_scope(slug):
+    return f"category:{slug}"
+
+
+def get_cache():
+    return caches[CACHE_ALIAS]
+
+
+def _generation_key(scope):
+    return f"catalogue:generation:{scope}"
+
+
+def get_generations(*scopes):
+    """
+    Return the current generation of each scope, starting new ones from a
+    timestamp so an evicted counter never reuses an old generation.
+    """
+    cache = get_cache()
+    keys = [_generation_key(scope) for scope in scopes]
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            cache.add(key, time.time_ns(), timeout=None)
+            generations[key] = cache.get(key)
+    return [generations[key] for key in keys]
+
+
+def bump_generations(*scopes):
+    """
+    Invalidate every cached response built from the given scopes.
+    """
+    cache = get_cache()
+    for scope in scopes:
+        key = _generation_key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), timeout=None)
+
+
+def request_fingerprint(view, request, kwargs, *extra):
+    """
+    Hash everything a catalogue response depends on: host, action, language,
+    query parameters, URL kwargs and the generations of the view's
+    ``get_cache_scopes()``.
+    """
+    language = request.query_params.get("lang") or get_language()
+    generations = get_generations(*view.get_cache_scopes())
+    return hashlib.md5(
+        repr(
+            (
+                request.build_absolute_uri("/"),
+                view.basename,
+                view.action,
+                language,
+                sorted(request.query_params.lists()),
+                sorted(kwargs.items()),
+                generations,
+                extra,
+            )
+        ).encode()
+    ).hexdigest()
+
+
+def cache_response(method):
+    """
+    Cache the serialized data of a read-only viewset action.
+
+    Writes invalidate by bumping a generation that is part of the key,
+    instead of deleting keys.
+    """
+
+    @functools.wraps(method)
+    def wrapper(self, request, *args, **kwargs):
+        key = f"catalogue:response:{request_fingerprint(self, request, kwargs)}"
+
+        cache = get_cache()
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+
+        response = method(self, request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data)
+        return response
+
+    return wrapper
+
+
+def conditional_response(method=None, *, last_modified=False):
+    """
+    Add a strong ETag to a read-only viewset action, and answer a matching
+    If-None-Match with 304 before the action runs.
+
+    The ETag comes from ``MAX(updated_at)`` and ``COUNT(*)`` over the
+    querysets returned by the view's ``get_conditional_querysets()``, plus
+    the cache generations, which also move on edits that leave
+    ``updated_at`` alone. ``MAX(updated_at)`` of a list does not move when
+    a row is deleted or filtered out, so Last-Modified/If-Modified-Since
+    are only supported with ``last_modified=True``, on actions whose
+    querysets cover every row the payload is built from.
+    """
+    if method is None:
+        return functools.partial(conditional_response, last_modified=last_modified)
+
+    @functools.wraps(method)
+    def wrapper(self, request, *args, **kwargs):
+        modified = None
+        stats = []
+        for queryset in self.get_conditional_querysets(**kwargs):
+            row = queryset.order_by().aggregate(
+                last_modified=Max("updated_at"), count=Count("pk")
+            )
+            stats.append((row["last_modified"], row["count"]))
+            if row["last_modified"] and (
+                modified is None or row["last_modified"] > modified
+            ):
+                modified = row["last_modified"]
+
+        etag = quote_etag(request_fingerprint(self, request, kwargs, stats))
+        timestamp = int(modified.timestamp()) if last_modified and modified else None
+
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = method(self, request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+
+        response["ETag"] = etag
+        if timestamp is not None:
+            response["Last-Modified"] = http_date(timestamp)
+        return response
+
+    return wrapper
@@ -0,0 +1,250 @@
+import re
+from collections import defaultdict
+
+import django_filters
+from django.db.models import Case, Count, Exists, F, Max, Min, OuterRef, Q, Value, When
+from rest_framework.exceptions import ValidationError
+from modeltranslation.utils import (
+    build_localized_fieldname,
+    get_language,
+    resolution_order,
+)
+from rest_framework.filters import BaseFilterBackend
+
+from .models import CharacteristicType, Product, ProductCharacteristic
+
+NUMERIC_TYPES = ("integer", "float")
+DISCRETE_TYPES = ("string", "boolean")
+
+
+def translated_value_matches(value):
+    """
+    Match ``value`` case-insensitively the way it is displayed: in the active
+    language, or in the first fallback language that has a translation.
+    """
+    condition = Q()
+    untranslated = Q()
+    for language in resolution_order(get_language()):
+        column = build_localized_fieldname("value", language)
+        condition |= untranslated & Q(**{f"{column}__iexact": value})
+        untranslated &= Q(**{f"{column}__isnull": True}) | Q(**{column: ""})
+    return condition
+
+
+class ProductFilterSet(django_filters.FilterSet):
+    """
+    Product filters. django-filter cannot derive filters for generated
+    columns, so the ``effective_price`` ones are declared.
+    """
+
+    effective_price = django_filters.NumberFilter()
+    effective_price__gte = django_filters.NumberFilter(
+        field_name="effective_price", lookup_expr="gte"
+    )
+    effective_price__lte = django_filters.NumberFilter(
+        field_name="effective_price", lookup_expr="lte"
+    )
+
+    class Meta:
+        model = Product
+        fields = ["is_featured", "price"]
+
+
+class CharacteristicFilter(BaseFilterBackend):
+    """
+    Filter products by characteristic values.
+
+    ``?char_<type id>=a,b`` matches any of the listed values, and
+    ``?char_<type id>_min=40`` / ``?char_<type id>_max=80`` bound numeric
+    characteristics. Every characteristic becomes one EXISTS subquery on
+    the ``(characteristic_type, value_*)`` indexes.
+    """
+
+    param_re = re.compile(r"^char_(?P<type_id>\d+)(?:_(?P<bound>min|max))?$")
+
+    def get_constraints(self, request):
+        """
+        Return ``{type_id: {"values": [...], "min": ..., "max": ...}}``.
+        """
+        constraints = defaultdict(dict)
+        for param, raw in request.query_params.items():
+            match = self.param_re.match(param)
+            if not match or raw == "":
+                continue
+            type_id = int(match["type_id"])
+            if match["bound"]:
+                constraints[type_id][match["bound"]] = raw
+            else:
+                constraints[type_id]["values"] = [
+                    value.strip() for value in raw.split(",") if value.strip()
+                ]
+        return constraints
+
+    def characteristic_filter(self, characteristic_type, constraint):
+        data_type = characteristic_type.data_type
+        column = ProductCharacteristic.TYPED_COLUMNS.get(data_type, "value")
+
+        def parse(param, value):
+            try:
+                return ProductCharacteristic.parse_value(data_type, value)
+            except (ValueError, TypeError):
+                raise ValidationError(
+                    {
+                        param: f"{characteristic_type.name} "
+                        f"{ProductCharacteristic.INVALID_VALUE_MESSAGES[data_type]}."
+                    }
+                )
+
+        param = f"char_{characteristic_type.pk}"
+        condition = Q(characteristic_type=characteristic_type)
+        if constraint.get("values"):
+            if data_type == "string":
+                values = Q()
+                for value in constraint["values"]:
+                    values |= translated_value_matches(value)
+                condition &= values
+            else:
+                condition &= Q(
+                    **{
+                        f"{column}__in": [
+                            parse(param, value) for value in constraint["values"]
+                        ]
+                    }
+                )
+
+        for bound, lookup in (("min", "gte"), ("max", "lte")):
+            if bound not in constraint:
+                continue
+            if data_type not in NUMERIC_TYPES:
+                raise ValidationError(
+                    {f"{param}_{bound}": "Only numeric characteristics have ranges."}
+                )
+            value = parse(f"{param}_{bound}", constraint[bound])
+            condition &= Q(**{f"{column}__{lookup}": value})
+
+        return Exists(
+            ProductCharacteristic.objects.filter(condition, product=OuterRef("pk"))
+        )
+
+    def filter_queryset(self, request, queryset, view):
+        constraints = self.get_constraints(request)
+        if not constraints:
+            return queryset
+
+        characteristic_types = CharacteristicType.objects.in_bulk(constraints)
+        if len(characteristic_types) < len(constraints):
+            # A characteristic that does not exist matches no product
+            return queryset.none()
+
+        for type_id, constraint in constraints.items():
+            queryset = queryset.filter(
+                self.characteristic_filter(characteristic_types[type_id], constraint)
+            )
+        return queryset
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": "char_<id>",
+                "required": False,
+                "in": "query",
+                "description": "Comma-separated characteristic values to match, "
+                "e.g. char_3=red,blue. char_<id>_min and char_<id>_max bound "
+                "numeric characteristics.",
+                "schema": {"type": "string"},
+            }
+        ]
+
+
+def facet_counts(queryset):
+    """
+    Return category and characteristic facets for the products in ``queryset``.
+
+    Category counts come from one GROUP BY query, characteristics from
+    another: numeric characteristics leave the value columns out of their
+    group, so they get one row per type with the range, while discrete
+    ones get a row per value.
+    """
+    products = queryset.order_by()
+    categories = [
+        {"category": row["category__slug"], "count": row["count"]}
+        for row in products.values("category__slug")
+        .annotate(count=Count("pk"))
+        .order_by("category__slug")
+    ]
+
+    # Group keys, NULL for numeric types. The translated value columns are
+    # grouped one by one and resolved like translated_value_matches() does.
+    numeric = Q(characteristic_type__data_type__in=NUMERIC_TYPES)
+    languages = resolution_order(get_language())
+    columns = {"bool": "value_bool"}
+    for language in languages:
+        columns[language] = build_localized_fieldname("value", language)
+    keys = {
+        f"facet_{key}": Case(When(numeric, then=Value(None)), default=F(column))
+        for key, column in columns.items()
+    }
+    rows = list(
+        ProductCharacteristic.objects.filter(product__in=products.values("pk"))
+        .order_by()
+        .values("characteristic_type", **keys)
+        .annotate(
+            count=Count("product", distinct=True),
+            min_int=Min("value_int"),
+            max_int=Max("value_int"),
+            min_float=Min("value_float"),
+            max_float=Max("value_float"),
+        )
+    )
+    characteristic_types = CharacteristicType.objects.in_bulk(
+        {row["characteristic_type"] for row in rows}
+    )
+    facets = {}
+    value_counts = defaultdict(lambda: defaultdict(int))
+    for row in rows:
+        data_type = characteristic_types[row["characteristic_type"]].data_type
+        if data_type in NUMERIC_TYPES:
+            facets[row["characteristic_type"]] = {
+                "count": row["count"],
+                "min": (
+                    row["min_int"] if row["min_int"] is not None else row["min_float"]
+                ),
+                "max": (
+                    row["max_int"] if row["max_int"] is not None else row["max_float"]
+                ),
+            }
+        elif data_type in DISCRETE_TYPES:
+            # Booleans are counted by typed value, whatever their spelling
+            value = row["facet_bool"]
+            if value is None:
+                value = next(
+                    (
+                        row[f"facet_{language}"]
+                        for language in languages
+                        if row[f"facet_{language}"]
+                    ),
+                    "",
+                )
+            value_counts[row["characteristic_type"]][value] += row["count"]
+    for type_id, counts in value_counts.items():
+        facets[type_id] = {
+            "values": [
+                {"value": value, "count": count}
+                for value, count in sorted(counts.items(), key=lambda item: -item[1])
+            ]
+        }
+
+    return {
+        "count": sum(category["count"] for category in categories),
+        "categories": categories,
+        "characteristics": [
+            {
+                "id": type_id,
+                "name": characteristic_types[type_id].name,
+                "data_type": characteristic_types[type_id].data_type,
+                "suffix": characteristic_types[type_id].suffix,
+                **facet,
+            }
+            for type_id, facet in sorted(facets.items())
+        ],
+    }
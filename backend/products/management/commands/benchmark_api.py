@@ -0,0 +1,254 @@
+import json
+import math
+import time
+from collections import namedtuple
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from orders.testing import fake_stripe
+from products.models import Product
+from users.models import User
+from .explain_hot_paths import REPLAY_SETTINGS
+
+# ``data`` is called before every request, for payloads that change
+Endpoint = namedtuple("Endpoint", "name method url user data")
+
+# Metric -> (relative growth allowed over the baseline, absolute slack in
+# ms). Query counts must not grow at all, timings are noisy.
+BUDGETS = {
+    "queries": lambda options: (0, 0),
+    "bytes": lambda options: (options["bytes_tolerance"], 0),
+    "p95_ms": lambda options: (options["tolerance"], options["noise_ms"]),
+    "sql_ms": lambda options: (options["tolerance"], options["noise_ms"]),
+}
+
+
+def endpoints(product, customer):
+    """
+    Return the endpoints to benchmark, storefront and checkout.
+    """
+    refresh = str(RefreshToken.for_user(customer))
+
+    def order():
+        return {
+            "email": customer.email,
+            "first_name": customer.first_name or "Bench",
+            "last_name": customer.last_name or "Mark",
+            "phone": "+420123456789",
+            "country": "Czechia",
+            "address": "Main street 1",
+            "postal_code": "11000",
+            "city": "Prague",
+            "items": [{"product_id": product.pk, "quantity": 1}],
+        }
+
+    def verify():
+        customer.refresh_from_db(fields=["temp_password"])
+        return {"email": customer.email, "temp_password": customer.temp_password}
+
+    return [
+        Endpoint("product list", "get", "/api/products/", None, None),
+        Endpoint("product detail", "get", f"/api/products/{product.slug}/", None, None),
+        Endpoint(
+            "similar products",
+            "get",
+            f"/api/products/{product.slug}/similar/",
+            None,
+            None,
+        ),
+        Endpoint("categories", "get", "/api/categories/", None, None),
+        Endpoint("create order", "post", "/api/orders/", None, order),
+        Endpoint("profile", "get", "/api/profile/", customer, None),
+        Endpoint("order history", "get", "/api/profile/orders/", customer, None),
+        Endpoint(
+            "temp password",
+            "post",
+            "/api/auth/generate-temp-password/",
+            None,
+            lambda: {"email": customer.email},
+        ),
+        Endpoint(
+            "verify password", "post", "/api/auth/verify-temp-password/", None, verify
+        ),
+        Endpoint(
+            "token refresh",
+            "post",
+            "/api/token/refresh/",
+            None,
+            lambda: {"refresh": refresh},
+        ),
+    ]
+
+
+def percentile(values, fraction):
+    """
+    Nearest-rank percentile of ``values``.
+    """
+    ordered = sorted(values)
+    return ordered[max(math.ceil(fraction * len(ordered)) - 1, 0)]
+
+
+def regressions(results, baseline, options):
+    """
+    Return a line per metric of ``results`` over its budget in ``baseline``.
+    """
+    problems = []
+    for name, metrics in results.items():
+        budget = baseline.get(name)
+        if budget is None:
+            continue
+        for metric, allowance in BUDGETS.items():
+            tolerance, noise = allowance(options)
+            limit = budget[metric] * (1 + tolerance) + noise
+            if metrics[metric] > limit:
+                problems.append(
+                    f"{name}: {metric} {metrics[metric]} over the budget of "
+                    f"{budget[metric]}"
+                )
+    return problems
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay the main API endpoints in-process, with Stripe faked, and "
+        "measure latency, SQL queries and response sizes against a baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--baseline",
+            default=str(Path(settings.BASE_DIR) / "api_benchmark.json"),
+            help="JSON file holding the budgets.",
+        )
+        parser.add_argument(
+            "--write-baseline",
+            action="store_true",
+            help="Save this run as the new baseline instead of comparing.",
+        )
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument(
+            "--warmup", type=int, default=2, help="Unmeasured runs per endpoint."
+        )
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.5,
+            help="Growth of p95 and SQL time allowed over the baseline, 0.5 is 50%%.",
+        )
+        parser.add_argument(
+            "--bytes-tolerance",
+            type=float,
+            default=0.1,
+            help="Growth of response sizes allowed over the baseline.",
+        )
+        parser.add_argument(
+            "--noise-ms",
+            type=float,
+            default=2,
+            help="Milliseconds any timing may drift, whatever the tolerance.",
+        )
+
+    def handle(self, *args, **options):
+        runs = options["repeat"] + options["warmup"]
+        product = Product.objects.filter(stock__gte=runs).order_by("-pk").first()
+        customer = User.objects.filter(orders__isnull=False).order_by("-pk").first()
+        if product is None or customer is None:
+            raise CommandError(
+                f"Needs a product with {runs} in stock and a customer with orders, "
+                "load some or run seed_perf."
+            )
+
+        client = APIClient()
+        fake_stripe.reset()
+        results = {}
+        with override_settings(
+            **REPLAY_SETTINGS,
+            STRIPE_CLIENT="orders.testing.fake_stripe",
+            EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend",
+            JOBS_EAGER=False,
+        ), transaction.atomic():
+            for endpoint in endpoints(product, customer):
+                results[endpoint.name] = self.measure(client, endpoint, options)
+                self.stdout.write(
+                    "{name}: p50 {p50_ms}ms, p95 {p95_ms}ms, {queries} queries "
+                    "({sql_ms}ms), {bytes} bytes".format(
+                        name=endpoint.name, **results[endpoint.name]
+                    )
+                )
+            # Orders, reservations, temp passwords... leave no trace
+            transaction.set_rollback(True)
+
+        path = Path(options["baseline"])
+        if options["write_baseline"]:
+            path.write_text(
+                json.dumps(
+                    {
+                        "database": connection.vendor,
+                        "repeat": options["repeat"],
+                        "endpoints": results,
+                    },
+                    indent=2,
+                )
+                + "\n"
+            )
+            self.stdout.write(self.style.SUCCESS(f"Baseline written to {path}."))
+            return
+        if not path.exists():
+            raise CommandError(f"No baseline at {path}, run with --write-baseline.")
+
+        baseline = json.loads(path.read_text())
+        if baseline["database"] != connection.vendor:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"The baseline was measured on {baseline['database']}, "
+                    "timings will not compare."
+                )
+            )
+        problems = regressions(results, baseline["endpoints"], options)
+        if problems:
+            raise CommandError(
+                "Over budget:\n" + "\n".join(f"- {problem}" for problem in problems)
+            )
+        self.stdout.write(self.style.SUCCESS("Every endpoint is within budget."))
+
+    def measure(self, client, endpoint, options):
+        """
+        Request ``endpoint`` --warmup + --repeat times and summarize the
+        measured runs. The query count and size are the worst seen.
+        """
+        latencies, sql_times, queries, sizes = [], [], [], []
+        client.force_authenticate(endpoint.user)
+        for run in range(options["warmup"] + options["repeat"]):
+            request = getattr(client, endpoint.method)
+            data = endpoint.data() if endpoint.data else None
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = request(endpoint.url, data, format="json")
+                elapsed = time.perf_counter() - started
+            if response.status_code >= 400:
+                raise CommandError(
+                    f"{endpoint.method.upper()} {endpoint.url} answered "
+                    f"{response.status_code}: {response.content[:200]!r}"
+                )
+            if run < options["warmup"]:
+                continue
+            latencies.append(elapsed * 1000)
+            sql_times.append(
+                sum(float(query["time"]) for query in captured.captured_queries) * 1000
+            )
+            queries.append(len(captured))
+            sizes.append(len(response.content))
+
+        return {
+            "p50_ms": round(percentile(latencies, 0.5), 2),
+            "p95_ms": round(percentile(latencies, 0.95), 2),
+            "sql_ms": round(percentile(sql_times, 0.5), 2),
+            "queries": max(queries),
+            "bytes": max(sizes),
+        }
@@ -0,0 +1,185 @@
+import json
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIClient
+
+from orders.models import Order, OrderItem
+from products.models import (
+    Product,
+    ProductCharacteristic,
+    ProductComment,
+    ProductGallery,
+)
+from users.models import User
+
+# Tables that grow with the business; a full scan of one is a bug
+HOT_TABLES = {
+    model._meta.db_table
+    for model in (
+        Product,
+        ProductComment,
+        ProductGallery,
+        ProductCharacteristic,
+        Order,
+        OrderItem,
+        User,
+    )
+}
+
+# SQLite's EXPLAIN QUERY PLAN: "SCAN <table>" walks the whole table, or the
+# whole index after "USING"
+SQLITE_SCAN = re.compile(r"^SCAN (?P<table>\S+)(?: AS \S+)?(?P<index> USING .*)?$")
+
+# The ETag validators and paginator counts: MAX(updated_at) and COUNT over
+# a whole table, nothing else
+_AGGREGATE = r'(?:MAX\("\w+"\."updated_at"\)|COUNT\((?:\*|"\w+"\."\w+")\)) AS "\w+"'
+WHOLE_TABLE_AGGREGATE = re.compile(
+    rf'^SELECT {_AGGREGATE}(?:, {_AGGREGATE})* FROM "\w+"$'
+)
+
+# Replay requests in-process, every one served from the database and not
+# the catalogue cache
+REPLAY_SETTINGS = {
+    "ALLOWED_HOSTS": ["testserver"],
+    "CACHES": {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+        "catalogue": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"},
+    },
+}
+
+
+def hot_paths(product, category, customer):
+    """
+    Return ``(label, url, user)`` for the requests the storefront makes most.
+    """
+    return [
+        ("product list", "/api/products/", None),
+        ("product keyset page", "/api/products/?pagination=cursor", None),
+        ("category list", f"/api/products/?category={category.slug}", None),
+        ("featured list", "/api/products/?featured=true", None),
+        ("price range", "/api/products/?effective_price__lte=10000", None),
+        ("product detail", f"/api/products/{product.slug}/", None),
+        ("product comments", f"/api/products/{product.slug}/comments/", None),
+        ("categories", "/api/categories/", None),
+        ("order history", "/api/profile/orders/", customer),
+        ("profile", "/api/profile/", customer),
+    ]
+
+
+def _postgresql_full_scans(plan, sorted_input=False):
+    """
+    Walk a JSON plan for sequential scans, and for index scans without an
+    index condition that feed a sort, i.e. read the whole index.
+    """
+    scans = []
+    relation = plan.get("Relation Name")
+    if plan["Node Type"] == "Seq Scan":
+        scans.append(relation)
+    elif relation and sorted_input and "Index Cond" not in plan:
+        scans.append(relation)
+    for child in plan.get("Plans", []):
+        scans += _postgresql_full_scans(
+            child, sorted_input or plan["Node Type"] == "Sort"
+        )
+    return scans
+
+
+def plan_full_scans(sql, params=()):
+    """
+    Return the hot tables ``sql`` reads in full: without an index, or
+    through a whole index and then sorted.
+
+    PostgreSQL plans with sequential scans disabled, so one that remains
+    means no index can serve the query, whatever the size of the tables.
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            with transaction.atomic():
+                cursor.execute("SET LOCAL enable_seqscan = off")
+                cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+                plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            scans = _postgresql_full_scans(plan[0]["Plan"])
+        elif WHOLE_TABLE_AGGREGATE.match(sql.strip()):
+            # SQLite reads these from the table even when an index covers
+            # them; PostgreSQL runs them as index-only scans
+            return []
+        else:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            details = [detail for *_, detail in cursor.fetchall()]
+            sorted_scan = any(
+                detail.startswith("USE TEMP B-TREE FOR") and "ORDER BY" in detail
+                for detail in details
+            )
+            scans = [
+                match["table"]
+                for detail in details
+                if (match := SQLITE_SCAN.match(detail))
+                and (sorted_scan or not match["index"])
+            ]
+    return sorted(set(scans) & HOT_TABLES)
+
+
+class Command(BaseCommand):
+    help = (
+        "EXPLAIN the queries of the hot API endpoints against the current "
+        "database and fail if one scans a large table without an index."
+    )
+
+    def handle(self, *args, **options):
+        product = Product.objects.order_by("-comment_count").first()
+        customer = User.objects.filter(orders__isnull=False).order_by("-pk").first()
+        if product is None or customer is None:
+            raise CommandError(
+                "Needs products and orders to explain, load some or run seed_perf."
+            )
+
+        client = APIClient()
+        failures = []
+        with override_settings(**REPLAY_SETTINGS):
+            for label, url, user in hot_paths(product, product.category, customer):
+                client.force_authenticate(user)
+                with CaptureQueriesContext(connection) as queries:
+                    response = client.get(url)
+                if response.status_code != 200:
+                    raise CommandError(f"{url} answered {response.status_code}.")
+
+                selects = [
+                    query["sql"]
+                    for query in queries.captured_queries
+                    if query["sql"].lstrip().upper().startswith("SELECT")
+                ]
+                problems = [
+                    (sql, scans) for sql in selects if (scans := plan_full_scans(sql))
+                ]
+                self.stdout.write(
+                    f"{label}: {len(selects)} queries, "
+                    + (
+                        self.style.ERROR(f"{len(problems)} with full scans")
+                        if problems
+                        else self.style.SUCCESS("all indexed")
+                    )
+                )
+                for sql, scans in problems:
+                    failures.append((label, sql, scans))
+                    if options["verbosity"] > 1:
+                        self.stdout.write(f"  {', '.join(scans)}: {sql}")
+
+        superusers = User.objects.filter(is_superuser=True).values_list("email")
+        sql, params = superusers.query.sql_with_params()
+        scans = plan_full_scans(sql, params)
+        if scans:
+            failures.append(("superuser emails", sql, scans))
+
+        if failures:
+            raise CommandError(
+                "Full scans on hot paths:\n"
+                + "\n".join(
+                    f"- {label}: {', '.join(scans)}" for label, _, scans in failures
+                )
+            )
+        self.stdout.write(self.style.SUCCESS("Every hot path is served by indexes."))
@@ -0,0 +1,69 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from products.models import Product, ProductComment
+
+
+def rating_aggregate_expressions():
+    """
+    Return the UPDATE expressions that recompute every rating aggregate column
+    from ProductComment in a single statement.
+    """
+    comments = (
+        ProductComment.objects.filter(product=OuterRef("pk"))
+        .order_by()
+        .values("product")
+    )
+
+    def aggregate(expression):
+        return Coalesce(
+            Subquery(
+                comments.annotate(total=expression).values("total"),
+                output_field=IntegerField(),
+            ),
+            0,
+        )
+
+    return {
+        "rating_sum": aggregate(Sum("rating")),
+        "rating_count": aggregate(Count("rating")),
+        "comment_count": aggregate(
+            Count("pk", filter=Q(comment__isnull=False) & ~Q(comment=""))
+        ),
+    }
+
+
+class Command(BaseCommand):
+    help = "Rebuild the denormalized rating_sum, rating_count and comment_count of products."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Number of products updated per UPDATE statement.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        expressions = rating_aggregate_expressions()
+
+        updated = 0
+        last_id = 0
+        while True:
+            ids = list(
+                Product.objects.filter(pk__gt=last_id)
+                .order_by("pk")
+                .values_list("pk", flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            updated += Product.objects.filter(pk__gt=last_id, pk__lte=ids[-1]).update(
+                **expressions
+            )
+            last_id = ids[-1]
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt rating aggregates for {updated} products.")
+        )
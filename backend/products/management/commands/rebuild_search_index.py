@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+
+from products.models import Product
+from products.search import update_search_vectors, uses_postgres_search
+
+
+class Command(BaseCommand):
+    help = "Recompute the stored full-text search vectors of every product."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Number of products updated per UPDATE statement.",
+        )
+
+    def handle(self, *args, **options):
+        if not uses_postgres_search():
+            self.stdout.write(
+                "This database searches through the in-process index, nothing to rebuild."
+            )
+            return
+
+        batch_size = options["batch_size"]
+        updated = 0
+        last_id = 0
+        while True:
+            ids = list(
+                Product.objects.filter(pk__gt=last_id)
+                .order_by("pk")
+                .values_list("pk", flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            updated += update_search_vectors(
+                Product.objects.filter(pk__gt=last_id, pk__lte=ids[-1])
+            )
+            last_id = ids[-1]
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt search vectors for {updated} products.")
+        )
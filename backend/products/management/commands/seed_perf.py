@@ -0,0 +1,438 @@
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import slugify
+
+from orders.models import LONG_TERM_GUARANTEE_PRICE, Order, OrderItem
+from products.cache import CATEGORIES_SCOPE, bump_generations
+from products.models import (
+    Category,
+    CharacteristicType,
+    Product,
+    ProductCharacteristic,
+    ProductComment,
+    ProductGallery,
+)
+from products.search import update_search_vectors
+from products.signals import invalidate_catalogue
+from users.models import User
+
+# (English, Czech) words the names are built from
+ADJECTIVES = [
+    ("Urban", "Městská"),
+    ("Folding", "Skládací"),
+    ("Sport", "Sportovní"),
+    ("Compact", "Kompaktní"),
+    ("Offroad", "Terénní"),
+    ("Touring", "Cestovní"),
+    ("Kids", "Dětská"),
+    ("Cargo", "Nákladní"),
+]
+NOUNS = [
+    ("scooter", "koloběžka"),
+    ("bike", "kolo"),
+    ("skateboard", "skateboard"),
+    ("unicycle", "jednokolka"),
+    ("moped", "moped"),
+    ("tricycle", "tříkolka"),
+]
+COLOURS = [
+    ("black", "černá"),
+    ("white", "bílá"),
+    ("red", "červená"),
+    ("blue", "modrá"),
+    ("green", "zelená"),
+]
+# One characteristic type per data type: (name_en, name_cs, data_type, suffix)
+CHARACTERISTICS = [
+    ("Colour", "Barva", "string", None),
+    ("Max speed", "Maximální rychlost", "integer", "km/h"),
+    ("Battery capacity", "Kapacita baterie", "float", "kWh"),
+    ("Foldable", "Skládací", "boolean", None),
+]
+COMMENTS = [
+    "Great value for the money.",
+    "Battery lasts less than advertised.",
+    "Arrived quickly, well packed.",
+    "Solid build, a bit heavy.",
+]
+# Weights of the statuses historical orders end up in
+ORDER_STATUSES = {
+    "delivered": 70,
+    "shipped": 5,
+    "processing": 5,
+    "confirmed": 5,
+    "pending": 5,
+    "canceled": 7,
+    "returned": 3,
+}
+UNPAID_STATUSES = {"pending", "canceled"}
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """
+    Let bulk_create store the given created_at/updated_at values instead of
+    stamping every row with the current time.
+    """
+    fields = [
+        field
+        for model in models
+        for field in model._meta.concrete_fields
+        if getattr(field, "auto_now", False) or getattr(field, "auto_now_add", False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def chunked(count, size):
+    """
+    Yield ``range`` objects covering ``range(count)`` in steps of ``size``.
+    """
+    for start in range(0, count, size):
+        yield range(start, min(start + size, count))
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-generate a reproducible catalogue, customers and order history "
+        "for load and performance testing."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--categories", type=int, default=10)
+        parser.add_argument("--products", type=int, default=10000)
+        parser.add_argument("--users", type=int, default=5000)
+        parser.add_argument("--orders", type=int, default=50000)
+        parser.add_argument(
+            "--comments-per-product",
+            type=int,
+            default=5,
+            help="Average number of comments per product.",
+        )
+        parser.add_argument("--images-per-product", type=int, default=3)
+        parser.add_argument(
+            "--max-items", type=int, default=4, help="Most lines in one order."
+        )
+        parser.add_argument(
+            "--days", type=int, default=365, help="How far back the history goes."
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=5000,
+            help="Number of rows inserted per INSERT statement.",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Random seed, the same seed generates the same data.",
+        )
+        parser.add_argument(
+            "--prefix",
+            default="perf",
+            help="Prefix of generated slugs and emails, change it to seed again.",
+        )
+
+    def handle(self, *args, **options):
+        if options["products"] and not options["categories"]:
+            raise CommandError("Products need at least one category.")
+        if options["orders"] and not (options["users"] and options["products"]):
+            raise CommandError("Orders need at least one user and one product.")
+        prefix = f"{options['prefix']}-"
+        if (
+            User.objects.filter(email__startswith=prefix).exists()
+            or Product.objects.filter(slug__startswith=prefix).exists()
+        ):
+            raise CommandError(
+                f"Data prefixed {options['prefix']!r} exists, pick another --prefix."
+            )
+
+        self.rng = random.Random(options["seed"])
+        self.options = options
+        self.prefix = options["prefix"]
+        self.chunk_size = options["chunk_size"]
+        self.now = timezone.now()
+        self.rows = {}
+
+        started = time.monotonic()
+        with explicit_timestamps(Product, ProductComment, Order):
+            categories = self.seed_categories()
+            characteristic_types = self.seed_characteristic_types(categories)
+            user_ids = self.seed_users()
+            prices = self.seed_products(categories, characteristic_types, user_ids)
+            self.seed_orders(user_ids, prices)
+
+        invalidate_catalogue(category_ids=[category.pk for category in categories])
+        bump_generations(CATEGORIES_SCOPE)
+
+        seconds = time.monotonic() - started
+        total = sum(self.rows.values())
+        for label, count in self.rows.items():
+            self.stdout.write(f"{label}: {count}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Inserted {total} rows in {seconds:.1f}s "
+                f"({total / max(seconds, 0.001):.0f} rows/s)."
+            )
+        )
+
+    def count(self, label, rows):
+        self.rows[label] = self.rows.get(label, 0) + len(rows)
+        return rows
+
+    def past(self, after=None):
+        """
+        A random moment between ``after`` (or --days ago) and now.
+        """
+        start = after or self.now - timedelta(days=self.options["days"])
+        span = (self.now - start).total_seconds()
+        return start + timedelta(seconds=self.rng.uniform(0, span))
+
+    def seed_categories(self):
+        categories = []
+        for index in range(self.options["categories"]):
+            adjective_en, adjective_cs = ADJECTIVES[index % len(ADJECTIVES)]
+            noun_en, noun_cs = NOUNS[index % len(NOUNS)]
+            name_en = f"{adjective_en} {noun_en}s {self.prefix} {index}"
+            categories.append(
+                Category(
+                    name=name_en,
+                    name_en=name_en,
+                    name_cs=f"{adjective_cs} {noun_cs} {self.prefix} {index}",
+                    slug=slugify(name_en),
+                    long_term_guarantee=index % 2 == 0,
+                )
+            )
+        return self.count("categories", Category.objects.bulk_create(categories))
+
+    def seed_characteristic_types(self, categories):
+        """
+        Reuse the characteristic type of each data type, creating it once.
+        """
+        types = []
+        for name_en, name_cs, data_type, suffix in CHARACTERISTICS:
+            characteristic_type, _ = CharacteristicType.objects.get_or_create(
+                name_en=name_en,
+                data_type=data_type,
+                defaults={
+                    "name": name_en,
+                    "name_cs": name_cs,
+                    "suffix": suffix,
+                    "suffix_en": suffix,
+                    "suffix_cs": suffix,
+                },
+            )
+            characteristic_type.categories.add(*categories)
+            types.append(characteristic_type)
+        return types
+
+    def characteristic_values(self, data_type):
+        """
+        Return ``(value_en, value_cs, typed columns)`` of a random value.
+        """
+        rng = self.rng
+        if data_type == "string":
+            value_en, value_cs = rng.choice(COLOURS)
+            return value_en, value_cs, {}
+        if data_type == "integer":
+            value = rng.randrange(15, 60, 5)
+            return str(value), str(value), {"value_int": value}
+        if data_type == "float":
+            value = round(rng.uniform(0.2, 1.5), 2)
+            return str(value), str(value), {"value_float": value}
+        value = rng.random() < 0.5
+        return str(value).lower(), str(value).lower(), {"value_bool": value}
+
+    def seed_users(self):
+        # Unusable passwords, hashing a real one per user would dominate the run
+        password = make_password(None)
+        user_ids = []
+        for chunk in chunked(self.options["users"], self.chunk_size):
+            users = [
+                User(
+                    email=f"{self.prefix}-{index}@example.com",
+                    first_name=f"Customer{index}",
+                    last_name=self.prefix.title(),
+                    password=password,
+                )
+                for index in chunk
+            ]
+            with transaction.atomic():
+                User.objects.bulk_create(users)
+            user_ids += [user.pk for user in self.count("users", users)]
+        return user_ids
+
+    def seed_products(self, categories, characteristic_types, user_ids):
+        """
+        Insert products with their characteristics, gallery and comments.
+        Return the effective price of every product by id.
+        """
+        rng = self.rng
+        options = self.options
+        prices = {}
+        for chunk in chunked(options["products"], self.chunk_size):
+            products = []
+            comments = []
+            for index in chunk:
+                adjective_en, adjective_cs = rng.choice(ADJECTIVES)
+                noun_en, noun_cs = rng.choice(NOUNS)
+                name_en = f"{adjective_en} {noun_en} {index}"
+                name_cs = f"{adjective_cs} {noun_cs} {index}"
+                created_at = self.past()
+                product = Product(
+                    name=name_en,
+                    name_en=name_en,
+                    name_cs=name_cs,
+                    description=f"{name_en}, built for everyday rides.",
+                    description_en=f"{name_en}, built for everyday rides.",
+                    description_cs=f"{name_cs} pro každodenní jízdu.",
+                    slug=f"{self.prefix}-{slugify(name_en)}",
+                    price=Decimal(rng.randrange(2000, 60000, 10)),
+                    discount_percentage=Decimal(rng.choice([0, 0, 0, 5, 10, 25])),
+                    stock=rng.randrange(0, 200),
+                    category=rng.choice(categories),
+                    is_featured=rng.random() < 0.02,
+                    created_at=created_at,
+                    updated_at=created_at,
+                )
+
+                product_comments = []
+                if user_ids:
+                    for _ in range(rng.randint(0, 2 * options["comments_per_product"])):
+                        comment = ProductComment(
+                            product=product,
+                            user_id=rng.choice(user_ids),
+                            comment=(
+                                rng.choice(COMMENTS) if rng.random() < 0.7 else None
+                            ),
+                            rating=rng.randint(1, 5) if rng.random() < 0.8 else None,
+                        )
+                        comment.created_at = comment.updated_at = self.past(created_at)
+                        product_comments.append(comment)
+                # Denormalized aggregates, as ProductComment.save keeps them
+                contributions = [
+                    comment.aggregate_contribution() for comment in product_comments
+                ]
+                product.rating_sum, product.rating_count, product.comment_count = (
+                    sum(column) for column in zip((0, 0, 0), *contributions)
+                )
+                products.append(product)
+                comments += product_comments
+
+            with transaction.atomic():
+                Product.objects.bulk_create(products)
+                self.count("products", products)
+                characteristics = []
+                for product in products:
+                    for characteristic_type in characteristic_types:
+                        value_en, value_cs, typed = self.characteristic_values(
+                            characteristic_type.data_type
+                        )
+                        characteristics.append(
+                            ProductCharacteristic(
+                                product=product,
+                                characteristic_type=characteristic_type,
+                                value=value_en,
+                                value_en=value_en,
+                                value_cs=value_cs,
+                                **typed,
+                            )
+                        )
+                ProductCharacteristic.objects.bulk_create(
+                    self.count("characteristics", characteristics),
+                    batch_size=self.chunk_size,
+                )
+                ProductGallery.objects.bulk_create(
+                    self.count(
+                        "gallery images",
+                        [
+                            ProductGallery(
+                                product=product,
+                                image=f"product_gallery/{product.slug}/{image}.jpg",
+                            )
+                            for product in products
+                            for image in range(options["images_per_product"])
+                        ],
+                    ),
+                    batch_size=self.chunk_size,
+                )
+                ProductComment.objects.bulk_create(
+                    self.count("comments", comments), batch_size=self.chunk_size
+                )
+                update_search_vectors(
+                    Product.objects.filter(
+                        pk__gte=products[0].pk, pk__lte=products[-1].pk
+                    )
+                )
+            for product in products:
+                prices[product.pk] = (product.discounted_price(), product.created_at)
+        return prices
+
+    def seed_orders(self, user_ids, prices):
+        rng = self.rng
+        options = self.options
+        product_ids = list(prices)
+        statuses = list(ORDER_STATUSES)
+        weights = list(ORDER_STATUSES.values())
+        for chunk in chunked(options["orders"], self.chunk_size):
+            orders = []
+            order_items = []
+            for _ in chunk:
+                lines = rng.sample(
+                    product_ids, min(rng.randint(1, options["max_items"]), len(prices))
+                )
+                # An order cannot predate the products in it
+                created_at = self.past(max(prices[pk][1] for pk in lines))
+                status = rng.choices(statuses, weights)[0]
+                order = Order(
+                    user_id=rng.choice(user_ids),
+                    status=status,
+                    address=f"{rng.randint(1, 200)} Main Street",
+                    city=rng.choice(["Prague", "Brno", "Ostrava", "Plzeň"]),
+                    postal_code=f"{rng.randint(10000, 79999)}",
+                    country="CZ",
+                    phone=f"+420{rng.randint(600000000, 799999999)}",
+                    paid_at=(
+                        None
+                        if status in UNPAID_STATUSES
+                        else created_at + timedelta(minutes=rng.randint(1, 30))
+                    ),
+                    created_at=created_at,
+                    updated_at=created_at,
+                )
+                total = Decimal(0)
+                for product_id in lines:
+                    item = OrderItem(
+                        order=order,
+                        product_id=product_id,
+                        quantity=rng.choices([1, 2, 3], [80, 15, 5])[0],
+                        long_term_guarantee_selected=rng.random() < 0.2,
+                    )
+                    unit_price = prices[product_id][0]
+                    if item.long_term_guarantee_selected:
+                        unit_price += LONG_TERM_GUARANTEE_PRICE
+                    total += unit_price * item.quantity
+                    order_items.append(item)
+                order.total_price = total
+                orders.append(order)
+
+            with transaction.atomic():
+                Order.objects.bulk_create(self.count("orders", orders))
+                OrderItem.objects.bulk_create(
+                    self.count("order items", order_items), batch_size=self.chunk_size
+                )
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.5 on 2026-10-18 18:49
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0006_alter_product_price"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="productcomment",
+            options={"ordering": ["-created_at"]},
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.1.5 on 2026-10-18 18:50
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_rating_aggregates(apps, schema_editor):
+    Product = apps.get_model("products", "Product")
+    ProductComment = apps.get_model("products", "ProductComment")
+    comments = (
+        ProductComment.objects.filter(product=OuterRef("pk"))
+        .order_by()
+        .values("product")
+    )
+
+    def aggregate(expression):
+        return Coalesce(
+            Subquery(
+                comments.annotate(total=expression).values("total"),
+                output_field=IntegerField(),
+            ),
+            0,
+        )
+
+    Product.objects.update(
+        rating_sum=aggregate(Sum("rating")),
+        rating_count=aggregate(Count("rating")),
+        comment_count=aggregate(
+            Count("pk", filter=Q(comment__isnull=False) & ~Q(comment=""))
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0007_productcomment_ordering"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="comment_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="rating_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="rating_sum",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_rating_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.1.5 on 2026-10-18 18:51
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0008_product_rating_aggregates"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="productcomment",
+            index=models.Index(
+                fields=["product", "-created_at", "id"],
+                name="comment_product_created_idx",
+            ),
+        ),
+    ]
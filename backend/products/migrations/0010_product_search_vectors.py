@@ -0,0 +1,69 @@
+# Generated by Django 5.1.5 on 2026-10-18 18:58
+
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce, NullIf
+
+import products.search
+
+FIELD_WEIGHTS = {"name": "A", "description": "B"}
+
+
+def backfill_search_vectors(apps, schema_editor):
+    """
+    PostgreSQL only: other databases search through the in-process index in
+    products/search.py.
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    Product = apps.get_model("products", "Product")
+    expressions = {}
+    for language, config in settings.PRODUCT_SEARCH_CONFIGS.items():
+        vector = None
+        for field, weight in FIELD_WEIGHTS.items():
+            text = Coalesce(NullIf(F(f"{field}_{language}"), Value("")), F(field))
+            field_vector = SearchVector(text, weight=weight, config=config)
+            vector = field_vector if vector is None else vector + field_vector
+        expressions[f"search_vector_{language}"] = vector
+    Product.objects.update(**expressions)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0009_productcomment_product_created_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="search_vector_cs",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="search_vector_en",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.RunPython(backfill_search_vectors, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="product",
+            index=products.search.SearchVectorIndex(
+                fields=["search_vector_en"], name="product_search_en_gin"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=products.search.SearchVectorIndex(
+                fields=["search_vector_cs"], name="product_search_cs_gin"
+            ),
+        ),
+    ]
@@ -0,0 +1,90 @@
+# Generated by Django 5.1.5 on 2026-10-18 19:00
+
+from django.db import migrations, models
+
+TYPED_COLUMNS = {
+    "integer": "value_int",
+    "float": "value_float",
+    "boolean": "value_bool",
+}
+PARSERS = {
+    "integer": int,
+    "float": float,
+    "boolean": lambda value: {"true": True, "false": False}[value.lower()],
+}
+
+
+def backfill_typed_values(apps, schema_editor):
+    """
+    Fill the typed columns of existing rows; values that never passed
+    validation are left NULL.
+    """
+    ProductCharacteristic = apps.get_model("products", "ProductCharacteristic")
+    characteristics = (
+        ProductCharacteristic.objects.filter(
+            characteristic_type__data_type__in=list(TYPED_COLUMNS)
+        )
+        .select_related("characteristic_type")
+        .order_by("pk")
+    )
+
+    batch = []
+    for characteristic in characteristics.iterator(chunk_size=2000):
+        data_type = characteristic.characteristic_type.data_type
+        try:
+            typed_value = PARSERS[data_type](characteristic.value)
+        except (KeyError, ValueError, TypeError, AttributeError):
+            continue
+        setattr(characteristic, TYPED_COLUMNS[data_type], typed_value)
+        batch.append(characteristic)
+        if len(batch) >= 2000:
+            ProductCharacteristic.objects.bulk_update(batch, TYPED_COLUMNS.values())
+            batch = []
+    ProductCharacteristic.objects.bulk_update(batch, TYPED_COLUMNS.values())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0010_product_search_vectors"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="productcharacteristic",
+            name="value_bool",
+            field=models.BooleanField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="productcharacteristic",
+            name="value_float",
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="productcharacteristic",
+            name="value_int",
+            field=models.BigIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="productcharacteristic",
+            index=models.Index(
+                fields=["characteristic_type", "value_int", "product"],
+                name="characteristic_int_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="productcharacteristic",
+            index=models.Index(
+                fields=["characteristic_type", "value_float", "product"],
+                name="characteristic_float_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="productcharacteristic",
+            index=models.Index(
+                fields=["characteristic_type", "value_bool", "product"],
+                name="characteristic_bool_idx",
+            ),
+        ),
+        migrations.RunPython(backfill_typed_values, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.1.5 on 2026-10-18 19:22
+
+import django.db.models.expressions
+import django.db.models.functions.math
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0011_productcharacteristic_typed_values"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="effective_price",
+            field=models.GeneratedField(
+                db_persist=True,
+                expression=django.db.models.functions.math.Round(
+                    django.db.models.expressions.CombinedExpression(
+                        django.db.models.expressions.CombinedExpression(
+                            models.F("price"),
+                            "*",
+                            django.db.models.expressions.CombinedExpression(
+                                models.Value(100), "-", models.F("discount_percentage")
+                            ),
+                        ),
+                        "*",
+                        models.Value(Decimal("0.01")),
+                    ),
+                    2,
+                ),
+                output_field=models.DecimalField(decimal_places=2, max_digits=10),
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["effective_price"], name="product_effective_price_idx"
+            ),
+        ),
+    ]
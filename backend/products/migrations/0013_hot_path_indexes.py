@@ -0,0 +1,54 @@
+# Generated by Django 5.1.5 on 2026-10-18 19:24
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0012_product_effective_price"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["-created_at", "-id"], name="product_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["category", "-created_at"], name="product_category_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["category", "-is_featured", "-created_at", "id"],
+                name="product_category_listing_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                condition=models.Q(("is_featured", True)),
+                fields=["-created_at"],
+                name="product_featured_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(fields=["updated_at"], name="product_updated_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="productcomment",
+            index=models.Index(
+                condition=models.Q(("rating__isnull", False)),
+                fields=["product", "rating"],
+                name="comment_rated_idx",
+            ),
+        ),
+    ]
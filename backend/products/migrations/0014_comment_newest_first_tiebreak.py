@@ -0,0 +1,30 @@
+# Generated by Django 5.1.5 on 2026-10-18 20:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0013_hot_path_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="productcomment",
+            options={"ordering": ["-created_at", "-id"]},
+        ),
+        migrations.RemoveIndex(
+            model_name="productcomment",
+            name="comment_product_created_idx",
+        ),
+        migrations.AddIndex(
+            model_name="productcomment",
+            index=models.Index(
+                fields=["product", "-created_at", "-id"],
+                name="comment_product_created_idx",
+            ),
+        ),
+    ]
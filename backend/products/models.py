@@ -1,7 +1,13 @@
-from django.db import models
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Now, Round
 from django.utils.text import slugify
 from users.models import User
 from django.core.exceptions import ValidationError
+from .search import SearchVectorIndex, search_source_fields, update_search_vectors
 
 
 def product_image_upload_path(instance, filename):
@@ -69,6 +75,16 @@ class Product(models.Model):
         default=0.0,
         help_text="Discount percentage (e.g., 10.0 for 10%)",
     )
+    # Price after discount, computed and stored by the database so the API
+    # can filter and order by it. discounted_price() is the Python twin.
+    effective_price = models.GeneratedField(
+        expression=Round(
+            F("price") * (100 - F("discount_percentage")) * Value(Decimal("0.01")),
+            2,
+        ),
+        output_field=models.DecimalField(max_digits=10, decimal_places=2),
+        db_persist=True,
+    )
     stock = models.PositiveIntegerField(default=0)
     category = models.ForeignKey(
         "Category", related_name="products", on_delete=models.CASCADE
@@ -76,35 +92,118 @@ class Product(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_featured = models.BooleanField(default=False)
+    # Denormalized from ProductComment, see ProductComment.save and products.signals
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    # Full-text search documents, see products/search.py (GIN indexed on PostgreSQL)
+    search_vector_en = SearchVectorField(null=True, editable=False)
+    search_vector_cs = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # Catalogue lists, newest first, also the keyset pagination order
+            models.Index(fields=["-created_at", "-id"], name="product_created_idx"),
+            # ?category= lists, newest first
+            models.Index(
+                fields=["category", "-created_at"], name="product_category_created_idx"
+            ),
+            # Products embedded in categories, featured first
+            models.Index(
+                fields=["category", "-is_featured", "-created_at", "id"],
+                name="product_category_listing_idx",
+            ),
+            # ?featured= lists, only the few featured rows
+            models.Index(
+                fields=["-created_at"],
+                condition=models.Q(is_featured=True),
+                name="product_featured_idx",
+            ),
+            models.Index(
+                fields=["effective_price"], name="product_effective_price_idx"
+            ),
+            # Last-Modified/ETag of the lists: MAX(updated_at) and COUNT(*)
+            # read this index alone
+            models.Index(fields=["updated_at"], name="product_updated_idx"),
+            # Full-text search, see products/search.py
+            SearchVectorIndex(
+                fields=["search_vector_en"], name="product_search_en_gin"
+            ),
+            SearchVectorIndex(
+                fields=["search_vector_cs"], name="product_search_cs_gin"
+            ),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_search_text = instance.search_text()
+        return instance
+
+    def search_text(self):
+        """
+        Return the loaded values of the fields the search vectors index.
+        """
+        return {
+            field: self.__dict__.get(field)
+            for field in search_source_fields()
+            if field in self.__dict__
+        }
 
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
+        update_fields = kwargs.get("update_fields")
+        search_text = self.search_text()
+        # Only recompute the search vectors when the text they index changed
+        reindex = (
+            self._state.adding
+            or search_text != getattr(self, "_loaded_search_text", None)
+        ) and (
+            update_fields is None
+            or not set(update_fields).isdisjoint(search_source_fields())
+        )
         super().save(*args, **kwargs)
+        if reindex:
+            update_search_vectors(Product.objects.filter(pk=self.pk))
+        self._loaded_search_text = search_text
 
     def discounted_price(self):
-        """Calculate and return the price after discount."""
+        """Calculate and return the price after discount, as effective_price."""
         if self.discount_percentage > 0:
-            discount = (self.price * self.discount_percentage) / 100
-            return self.price - discount
+            discounted = self.price * (100 - Decimal(str(self.discount_percentage)))
+            return (discounted / 100).quantize(Decimal("0.01"), ROUND_HALF_UP)
         return self.price
 
     def average_rating(self):
         """Calculate and return the average rating of the product."""
-        ratings = self.product_comments.exclude(rating__isnull=True).values_list(
-            "rating", flat=True
-        )
-        if ratings:
-            return sum(ratings) / len(ratings)
+        if self.rating_count:
+            return self.rating_sum / self.rating_count
         return None  # No ratings yet
 
     def total_ratings(self):
         """Return the total number of ratings."""
-        return self.comments.exclude(rating__isnull=True).count()
+        return self.rating_count
 
     def total_comments(self):
         """Return the total number of comments."""
-        return self.comments.exclude(comment__isnull=True).count()
+        return self.comment_count
+
+    @staticmethod
+    def adjust_rating_aggregates(
+        product_id, rating_sum=0, rating_count=0, comment_count=0
+    ):
+        """
+        Atomically shift the denormalized rating columns of a product by the given deltas.
+        """
+        if not (rating_sum or rating_count or comment_count):
+            return
+        Product.objects.filter(pk=product_id).update(
+            rating_sum=F("rating_sum") + rating_sum,
+            rating_count=F("rating_count") + rating_count,
+            comment_count=F("comment_count") + comment_count,
+            updated_at=Now(),
+        )
 
     def __str__(self):
         return self.name
@@ -133,6 +232,65 @@ class ProductComment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        # Newest first, comments created in the same tick by id
+        ordering = ["-created_at", "-id"]
+        indexes = [
+            models.Index(
+                fields=["product", "-created_at", "-id"],
+                name="comment_product_created_idx",
+            ),
+            # Rating aggregates only read comments that carry a rating
+            models.Index(
+                fields=["product", "rating"],
+                condition=models.Q(rating__isnull=False),
+                name="comment_rated_idx",
+            ),
+        ]
+
+    def aggregate_contribution(self):
+        """
+        Return the (rating_sum, rating_count, comment_count) this row adds to its product.
+        """
+        return (
+            self.rating or 0,
+            int(self.rating is not None),
+            int(bool(self.comment)),
+        )
+
+    def save(self, *args, **kwargs):
+        """
+        Override the save method to keep the product's rating aggregates in sync.
+        """
+        with transaction.atomic():
+            previous = None
+            if self.pk:
+                previous = ProductComment.objects.filter(pk=self.pk).first()
+            # Moving a comment changes the product it leaves as well
+            self._previous_product_id = previous.product_id if previous else None
+            super().save(*args, **kwargs)
+
+            current = self.aggregate_contribution()
+            if previous is None:
+                Product.adjust_rating_aggregates(self.product_id, *current)
+            elif previous.product_id == self.product_id:
+                deltas = (
+                    new - old
+                    for new, old in zip(current, previous.aggregate_contribution())
+                )
+                Product.adjust_rating_aggregates(self.product_id, *deltas)
+            else:
+                previous.remove_from_aggregates()
+                Product.adjust_rating_aggregates(self.product_id, *current)
+
+    def remove_from_aggregates(self):
+        """
+        Subtract this row from its product's rating aggregates.
+        """
+        Product.adjust_rating_aggregates(
+            self.product_id, *(-value for value in self.aggregate_contribution())
+        )
+
     def __str__(self):
         return f"{self.product.name} - {self.user.email} - {self.rating or 'No Rating'}"
 
@@ -159,33 +317,74 @@ class ProductCharacteristic(models.Model):
     )
     value = models.CharField(max_length=255)
 
+    # Typed copies of ``value`` so characteristics can be filtered by range
+    value_int = models.BigIntegerField(null=True, blank=True, editable=False)
+    value_float = models.FloatField(null=True, blank=True, editable=False)
+    value_bool = models.BooleanField(null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["characteristic_type", "value_int", "product"],
+                name="characteristic_int_idx",
+            ),
+            models.Index(
+                fields=["characteristic_type", "value_float", "product"],
+                name="characteristic_float_idx",
+            ),
+            models.Index(
+                fields=["characteristic_type", "value_bool", "product"],
+                name="characteristic_bool_idx",
+            ),
+        ]
+
+    # Shadow column holding the typed value of each data type
+    TYPED_COLUMNS = {
+        "integer": "value_int",
+        "float": "value_float",
+        "boolean": "value_bool",
+    }
+
+    INVALID_VALUE_MESSAGES = {
+        "integer": "must be an integer",
+        "float": "must be a float",
+        "boolean": "must be 'true' or 'false'",
+    }
+
+    @staticmethod
+    def parse_value(data_type, value):
+        """
+        Convert a raw value to the Python type of ``data_type``.
+
+        Raises ValueError or TypeError when the value does not fit.
+        """
+        if data_type == "integer":
+            return int(value)
+        if data_type == "float":
+            return float(value)
+        if data_type == "boolean":
+            if value.lower() not in ["true", "false"]:
+                raise ValueError(value)
+            return value.lower() == "true"
+        return value
+
     def clean(self):
         """
-        Validate the value field based on the data_type of the characteristic_type.
+        Validate the value field based on the data_type of the characteristic_type,
+        and fill in the matching typed column.
         """
         data_type = self.characteristic_type.data_type
 
-        if data_type == "integer":
-            try:
-                int(self.value)
-            except ValueError:
-                raise ValidationError(
-                    f"The value for {self.characteristic_type.name} must be an integer."
-                )
+        try:
+            typed_value = self.parse_value(data_type, self.value)
+        except (ValueError, TypeError):
+            raise ValidationError(
+                f"The value for {self.characteristic_type.name} "
+                f"{self.INVALID_VALUE_MESSAGES[data_type]}."
+            )
 
-        elif data_type == "float":
-            try:
-                float(self.value)
-            except ValueError:
-                raise ValidationError(
-                    f"The value for {self.characteristic_type.name} must be a float."
-                )
-
-        elif data_type == "boolean":
-            if self.value.lower() not in ["true", "false"]:
-                raise ValidationError(
-                    f"The value for {self.characteristic_type.name} must be 'true' or 'false'."
-                )
+        for typed_type, column in self.TYPED_COLUMNS.items():
+            setattr(self, column, typed_value if typed_type == data_type else None)
 
     def save(self, *args, **kwargs):
         # Call clean method to validate before saving
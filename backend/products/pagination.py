@@ -1,13 +1,189 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import binascii
+import hashlib
+import json
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from .cache import PRODUCTS_SCOPE, get_cache, get_generations
+
+
+def approximate_count(queryset):
+    """
+    Return a cheap estimate of ``queryset.count()``.
+
+    PostgreSQL answers from planner statistics, without touching the rows.
+    Other databases count once and cache the result until the catalogue's
+    product generation moves.
+    """
+    queryset = queryset.order_by()
+    if connections[queryset.db].vendor == "postgresql":
+        plan = json.loads(queryset.explain(format="json"))
+        if isinstance(plan, list):
+            plan = plan[0]
+        return int(plan["Plan"]["Plan Rows"])
+
+    sql, params = queryset.values("pk").query.sql_with_params()
+    fingerprint = hashlib.md5(
+        repr((sql, params, get_generations(PRODUCTS_SCOPE))).encode()
+    ).hexdigest()
+    key = f"catalogue:count:{fingerprint}"
+    cache = get_cache()
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count)
+    return count
 
 
 class CustomPagination(PageNumberPagination):
+    """
+    Page-number pagination, with an opt-in keyset mode for infinite scroll.
+
+    ``?pagination=cursor`` (or any ``?cursor=``) switches to keyset pages
+    over the active ordering plus ``id`` as tiebreaker, so page 200 costs
+    the same as page 1 and no ``COUNT(*)`` runs. ``?count=approximate``
+    adds an estimated total to keyset pages.
+    """
+
     page_size = 50  # Number of products per page
     page_size_query_param = "page_size"  # Allow clients to set the page size (optional)
     max_page_size = 100  # Maximum page size allowed
 
+    mode_query_param = "pagination"
+    cursor_query_param = "cursor"
+    count_query_param = "count"
+    ordering_param = "ordering"
+    # Orderings keyset pages can follow, the first is the default. Search
+    # rank is not one of them, so cursor pages of a search follow this too.
+    cursor_ordering_fields = (
+        "-created_at",
+        "created_at",
+        "price",
+        "-price",
+        "effective_price",
+        "-effective_price",
+        "updated_at",
+        "-updated_at",
+    )
+
+    def use_cursor(self, request):
+        return (
+            request.query_params.get(self.mode_query_param) == "cursor"
+            or self.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_mode = self.use_cursor(request)
+        if not self.cursor_mode:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_cursor_ordering(request)
+        self.count = None
+        if request.query_params.get(self.count_query_param) == "approximate":
+            self.count = approximate_count(queryset)
+
+        field = self.ordering.lstrip("-")
+        descending = self.ordering.startswith("-")
+        value, pk, reverse = self.decode_cursor(request, queryset.model, field)
+
+        # Walking backwards flips both the comparison and the sort
+        backwards = descending != reverse
+        direction = "-" if backwards else ""
+        queryset = queryset.order_by(f"{direction}{field}", f"{direction}id")
+        if pk is not None:
+            lookup = "lt" if backwards else "gt"
+            queryset = queryset.filter(
+                Q(**{f"{field}__{lookup}": value})
+                | Q(**{field: value, f"id__{lookup}": pk})
+            )
+
+        results = list(queryset[: self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[: self.page_size]
+        if reverse:
+            results.reverse()
+
+        self.next_position = self.previous_position = None
+        if results:
+            if has_more or reverse:
+                self.next_position = self.position(results[-1], field, False)
+            if (has_more and reverse) or (pk is not None and not reverse):
+                self.previous_position = self.position(results[0], field, True)
+        return results
+
+    def get_cursor_ordering(self, request):
+        ordering = request.query_params.get(self.ordering_param)
+        if not ordering:
+            return self.cursor_ordering_fields[0]
+        if ordering not in self.cursor_ordering_fields:
+            raise ValidationError(
+                {
+                    self.ordering_param: "Cursor pagination supports ordering by "
+                    + ", ".join(self.cursor_ordering_fields)
+                    + "."
+                }
+            )
+        return ordering
+
+    def position(self, obj, field, reverse):
+        value = getattr(obj, field)
+        value = value.isoformat() if hasattr(value, "isoformat") else str(value)
+        return [value, obj.pk, reverse]
+
+    def encode_cursor(self, position):
+        return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+    def decode_cursor(self, request, model, field):
+        """
+        Return ``(value, pk, reverse)`` from the cursor, or Nones for page one.
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, None, False
+        try:
+            value, pk, reverse = json.loads(base64.urlsafe_b64decode(encoded))
+            value = model._meta.get_field(field).to_python(value)
+            return value, int(pk), bool(reverse)
+        except (
+            binascii.Error,
+            DjangoValidationError,
+            TypeError,
+            ValueError,
+        ):
+            raise NotFound("Invalid cursor")
+
+    def cursor_link(self, position):
+        if position is None:
+            return None
+        url = replace_query_param(self.base_url, self.mode_query_param, "cursor")
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(position)
+        )
+
     def get_paginated_response(self, data):
+        if self.cursor_mode:
+            response = {
+                "links": {
+                    "next": self.cursor_link(self.next_position),
+                    "previous": self.cursor_link(self.previous_position),
+                },
+                "results": data,
+            }
+            if self.count is not None:
+                response["count"] = self.count
+                response["count_is_approximate"] = True
+            return Response(response)
+
         return Response(
             {
                 "links": {
@@ -20,3 +196,41 @@ class CustomPagination(PageNumberPagination):
                 "results": data,
             }
         )
+
+    def get_schema_operation_parameters(self, view):
+        return super().get_schema_operation_parameters(view) + [
+            {
+                "name": self.mode_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Set to 'cursor' for keyset pages without a total count.",
+                "schema": {"type": "string", "enum": ["cursor"]},
+            },
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "The pagination cursor value.",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": self.count_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Set to 'approximate' to add an estimated total to "
+                "cursor pages.",
+                "schema": {"type": "string", "enum": ["approximate"]},
+            },
+        ]
+
+
+class CommentCursorPagination(CursorPagination):
+    """
+    Keyset pagination for product comments, served by the
+    (product, -created_at, -id) index instead of OFFSET scans.
+    """
+
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    ordering = ("-created_at", "-id")
@@ -0,0 +1,146 @@
+import copy
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+
+
+def _is_forward_path(model, path):
+    """
+    Return True if every step of the lookup path is a forward FK/one-to-one,
+    i.e. the whole path can be joined with select_related.
+    """
+    for name in path.split("__"):
+        field = model._meta.get_field(name)
+        if not field.is_relation or field.many_to_many or field.one_to_many:
+            return False
+        model = field.related_model
+    return True
+
+
+def _related_model(model, path):
+    for name in path.split("__"):
+        model = model._meta.get_field(name).related_model
+    return model
+
+
+def _relation_path(model, source_attrs):
+    """
+    Return the longest prefix of ``source_attrs`` that walks model relations,
+    joined with ``__``. Plain attributes and methods end the walk.
+    """
+    path = []
+    for attr in source_attrs:
+        try:
+            field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            break
+        if not field.is_relation:
+            break
+        path.append(attr)
+        model = field.related_model
+    return "__".join(path)
+
+
+class QueryPlan:
+    """
+    Collects the select_related and prefetch_related lookups needed to
+    serialize a queryset without issuing per-row queries.
+    """
+
+    def __init__(self):
+        self.select_related = set()
+        self.prefetch_related = {}
+
+    def add(self, model, lookup, prefix=""):
+        if isinstance(lookup, Prefetch):
+            # Hints are shared class attributes, never mutate them in place.
+            lookup = copy.copy(lookup)
+            if prefix:
+                lookup.add_prefix(prefix.removesuffix("__"))
+            self.prefetch_related[lookup.prefetch_to] = lookup
+            return
+
+        if _is_forward_path(model, lookup):
+            self.select_related.add(prefix + lookup)
+        else:
+            # Plain lookups never replace an explicit Prefetch for the same path.
+            self.prefetch_related.setdefault(prefix + lookup, prefix + lookup)
+
+    def apply(self, queryset):
+        if self.select_related:
+            queryset = queryset.select_related(*sorted(self.select_related))
+        if self.prefetch_related:
+            queryset = queryset.prefetch_related(*self.prefetch_related.values())
+        return queryset
+
+
+def _walk(serializer, model, plan, prefix=""):
+    """
+    Walk the serializer field tree and record the relations it touches.
+    """
+    hints = getattr(getattr(serializer, "Meta", None), "prefetch_hints", {})
+
+    for field_name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+
+        if field_name in hints:
+            lookups = hints[field_name]
+            if isinstance(lookups, str):
+                # Name of a serializer method that builds the lookups at runtime
+                lookups = getattr(serializer, lookups)()
+            for lookup in lookups:
+                plan.add(model, lookup, prefix)
+            continue
+
+        if field.source == "*" or isinstance(field, serializers.SerializerMethodField):
+            continue
+
+        if isinstance(field, serializers.ListSerializer) and isinstance(
+            field.child, serializers.ModelSerializer
+        ):
+            path = _relation_path(model, field.source_attrs)
+            if path:
+                child_model = _related_model(model, path)
+                child_qs = plan_queryset(
+                    child_model._default_manager.all(), field.child
+                )
+                plan.add(model, Prefetch(path, queryset=child_qs), prefix)
+            continue
+
+        path = _relation_path(model, field.source_attrs)
+        if not path:
+            continue
+
+        if isinstance(field, serializers.ModelSerializer):
+            if _is_forward_path(model, path):
+                plan.add(model, path, prefix)
+                _walk(field, _related_model(model, path), plan, f"{prefix}{path}__")
+            else:
+                child_model = _related_model(model, path)
+                child_qs = plan_queryset(child_model._default_manager.all(), field)
+                plan.add(model, Prefetch(path, queryset=child_qs), prefix)
+        elif isinstance(field, serializers.PrimaryKeyRelatedField):
+            # A bare FK rendered as a primary key reads the local ``*_id`` column.
+            continue
+        else:
+            plan.add(model, path, prefix)
+
+
+def plan_queryset(queryset, serializer):
+    """
+    Return ``queryset`` with the select_related/prefetch_related chains
+    required by ``serializer`` (an instance, so pruned fields are honoured).
+
+    Nested serializers are planned recursively. SerializerMethodFields are
+    opaque, so serializers describe what they read in ``Meta.prefetch_hints``,
+    a mapping of field name to lookups (strings or ``Prefetch`` objects), or
+    to the name of a serializer method returning them.
+    """
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+
+    plan = QueryPlan()
+    _walk(serializer, queryset.model, plan)
+    return plan.apply(queryset)
@@ -0,0 +1,312 @@
+import bisect
+import math
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import Case, F, FloatField, Index, Value, When
+from django.db.models.functions import Coalesce, NullIf
+from django.utils.translation import get_language
+from rest_framework.filters import BaseFilterBackend
+
+from .cache import PRODUCTS_SCOPE, get_generations
+
+# Searched fields and their weight in the ranking
+FIELD_WEIGHTS = {"name": "A", "description": "B"}
+PYTHON_WEIGHTS = {"A": 1.0, "B": 0.4}
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def search_language(language=None):
+    """
+    Return the language code search vectors exist for, e.g. ``en`` for ``en-us``.
+    """
+    language = (language or get_language() or "").split("-")[0]
+    if language in settings.PRODUCT_SEARCH_CONFIGS:
+        return language
+    return settings.MODELTRANSLATION_DEFAULT_LANGUAGE
+
+
+def vector_column(language):
+    return f"search_vector_{language}"
+
+
+def uses_postgres_search():
+    return connection.vendor == "postgresql"
+
+
+def search_source_fields():
+    """
+    Return the model fields the search vectors are computed from.
+    """
+    return [
+        name
+        for field in FIELD_WEIGHTS
+        for name in (
+            field,
+            *(f"{field}_{language}" for language in settings.PRODUCT_SEARCH_CONFIGS),
+        )
+    ]
+
+
+class SearchVectorIndex(GinIndex):
+    """
+    GIN index of a search vector column. Only PostgreSQL queries the column,
+    other databases get a plain index so the same migrations run everywhere.
+    """
+
+    def create_sql(self, model, schema_editor, using="", **kwargs):
+        if schema_editor.connection.vendor != "postgresql":
+            return Index.create_sql(self, model, schema_editor, using=using, **kwargs)
+        return super().create_sql(model, schema_editor, using=using, **kwargs)
+
+
+def _translated(field, language):
+    # Untranslated rows fall back to the default language column
+    return Coalesce(NullIf(F(f"{field}_{language}"), Value("")), F(field))
+
+
+def search_vector_expressions():
+    """
+    Return the UPDATE expressions that recompute every language's tsvector.
+    """
+    expressions = {}
+    for language, config in settings.PRODUCT_SEARCH_CONFIGS.items():
+        vector = None
+        for field, weight in FIELD_WEIGHTS.items():
+            field_vector = SearchVector(
+                _translated(field, language), weight=weight, config=config
+            )
+            vector = field_vector if vector is None else vector + field_vector
+        expressions[vector_column(language)] = vector
+    return expressions
+
+
+def update_search_vectors(queryset):
+    """
+    Refresh the stored search vectors of ``queryset`` on PostgreSQL.
+
+    Other databases search through the in-process index below instead.
+    """
+    if uses_postgres_search():
+        # Disable modeltranslation's rewriting so "name" is the base column
+        return queryset.rewrite(False).update(**search_vector_expressions())
+    return 0
+
+
+def tokenize(text):
+    return TOKEN_RE.findall((text or "").lower())
+
+
+def _strip_accents(token):
+    return "".join(
+        char
+        for char in unicodedata.normalize("NFKD", token)
+        if not unicodedata.combining(char)
+    )
+
+
+ENGLISH_SUFFIXES = ("ations", "ation", "ings", "ing", "ies", "es", "ed", "ly", "s")
+CZECH_SUFFIXES = (
+    "ovych",
+    "ovym",
+    "ami",
+    "ach",
+    "ich",
+    "ove",
+    "eho",
+    "emu",
+    "ymi",
+    "ych",
+    "ym",
+    "ou",
+    "em",
+    "ka",
+    "ky",
+    "ce",
+    "ek",
+    "y",
+    "a",
+    "u",
+    "e",
+    "i",
+    "o",
+)
+
+
+def _strip_suffix(token, suffixes, min_stem=3):
+    for suffix in suffixes:
+        if token.endswith(suffix) and len(token) - len(suffix) >= min_stem:
+            return token[: -len(suffix)]
+    return token
+
+
+def stem_english(token):
+    return _strip_suffix(token, ENGLISH_SUFFIXES)
+
+
+def stem_czech(token):
+    # Czech is heavily inflected; fold diacritics and drop case endings so
+    # "koloběžka", "koloběžky" and "kolobezkou" share a stem.
+    return _strip_suffix(_strip_accents(token), CZECH_SUFFIXES)
+
+
+STEMMERS = {"en": stem_english, "cs": stem_czech}
+
+
+class InvertedIndex:
+    """
+    In-process inverted index over product names and descriptions, used when
+    the database has no full-text search (SQLite test and dev runs).
+
+    Terms are stemmed per language and matched as prefixes, like the
+    ``term:*`` queries sent to PostgreSQL. Scores are weighted tf-idf.
+    """
+
+    def __init__(self, documents, stem):
+        self.stem = stem
+        postings = defaultdict(lambda: defaultdict(float))
+        count = 0
+        for pk, fields in documents:
+            count += 1
+            for text, weight in fields:
+                for token in tokenize(text):
+                    postings[self.stem(token)][pk] += PYTHON_WEIGHTS[weight]
+
+        self.postings = {
+            term: {
+                pk: score * math.log(1 + count / len(term_postings))
+                for pk, score in term_postings.items()
+            }
+            for term, term_postings in postings.items()
+        }
+        self.terms = sorted(self.postings)
+
+    def _prefix_matches(self, stem):
+        start = bisect.bisect_left(self.terms, stem)
+        for term in self.terms[start:]:
+            if not term.startswith(stem):
+                break
+            yield term
+
+    def search(self, text):
+        """
+        Return ``{pk: score}`` for products matching every token of ``text``.
+        """
+        results = None
+        for token in tokenize(text):
+            scores = defaultdict(float)
+            for term in self._prefix_matches(self.stem(token)):
+                for pk, score in self.postings[term].items():
+                    scores[pk] += score
+            if results is None:
+                results = scores
+            else:
+                results = {
+                    pk: score + scores[pk]
+                    for pk, score in results.items()
+                    if pk in scores
+                }
+            if not results:
+                return {}
+        return dict(results or {})
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_python_index(model, language):
+    """
+    Return the in-process index for ``language``, rebuilt whenever the
+    catalogue's product generation moves.
+    """
+    generation = get_generations(PRODUCTS_SCOPE)[0]
+    cached = _indexes.get(language)
+    if cached and cached[0] == generation:
+        return cached[1]
+
+    with _indexes_lock:
+        rows = model.objects.rewrite(False).values_list(
+            "pk", "name", f"name_{language}", "description", f"description_{language}"
+        )
+        documents = (
+            (
+                pk,
+                [
+                    (translated_name or name, FIELD_WEIGHTS["name"]),
+                    (
+                        translated_description or description,
+                        FIELD_WEIGHTS["description"],
+                    ),
+                ],
+            )
+            for pk, name, translated_name, description, translated_description in rows
+        )
+        index = InvertedIndex(documents, STEMMERS.get(language, stem_english))
+        _indexes[language] = (generation, index)
+    return index
+
+
+class ProductSearchFilter(BaseFilterBackend):
+    """
+    Full-text product search on ``?search=``.
+
+    PostgreSQL matches the stored per-language tsvector (GIN indexed) and
+    ranks with ts_rank. Other databases use the in-process inverted index.
+    Results are ordered by rank unless ``?ordering=`` is given.
+    """
+
+    search_param = "search"
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get(self.search_param, "").strip()
+        tokens = tokenize(text)
+        if not tokens:
+            return queryset
+
+        language = search_language()
+        if uses_postgres_search():
+            config = settings.PRODUCT_SEARCH_CONFIGS[language]
+            # Tokens are \w+ only, so the raw tsquery cannot be malformed
+            query = SearchQuery(
+                " & ".join(f"{token}:*" for token in tokens),
+                config=config,
+                search_type="raw",
+            )
+            column = vector_column(language)
+            queryset = queryset.filter(**{column: query}).annotate(
+                search_rank=SearchRank(F(column), query)
+            )
+        else:
+            scores = get_python_index(queryset.model, language).search(text)
+            if not scores:
+                return queryset.none()
+            queryset = queryset.filter(pk__in=list(scores)).annotate(
+                search_rank=Case(
+                    *(When(pk=pk, then=Value(score)) for pk, score in scores.items()),
+                    default=Value(0.0),
+                    output_field=FloatField(),
+                )
+            )
+
+        if not request.query_params.get("ordering"):
+            queryset = queryset.order_by("-search_rank", "-created_at")
+        return queryset
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.search_param,
+                "required": False,
+                "in": "query",
+                "description": "Full-text search in product names and descriptions.",
+                "schema": {"type": "string"},
+            }
+        ]
@@ -9,8 +9,48 @@ from .models import (
     ProductCharacteristic,
     CharacteristicType,
 )
+from django.db.models import Prefetch
 from django.utils.translation import get_language
 
+from .query_planner import plan_queryset
+
+# Number of newest comments embedded in the product detail payload, the rest
+# are served by the paginated /products/{slug}/comments/ endpoint.
+RECENT_COMMENTS_LIMIT = 5
+
+# Order of the products embedded in a category, featured ones first.
+CATEGORY_PRODUCTS_ORDERING = ("-is_featured", "-created_at", "id")
+
+
+class DynamicFieldsMixin:
+    """
+    Sparse fieldsets for model serializers.
+
+    ``fields`` limits the output to the named fields and ``expand`` opts into
+    ``Meta.expandable_fields``, which are left out by default. Dotted names
+    such as ``products.characteristics`` are collected in ``nested_expand``
+    for serializers built inside method fields.
+    """
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        expand = set(expand or ())
+        self.nested_expand = {}
+        for name in list(expand):
+            parent, _, child = name.partition(".")
+            if child:
+                self.nested_expand.setdefault(parent, set()).add(child)
+
+        # Asking for an expandable field by name expands it as well
+        wanted = set(fields or ())
+        for name in getattr(self.Meta, "expandable_fields", ()):
+            if name not in expand and name not in wanted:
+                self.fields.pop(name, None)
+
+        if wanted:
+            for name in set(self.fields) - wanted:
+                self.fields.pop(name)
+
 
 class CharacteristicTypeSerializer(serializers.ModelSerializer):
     name = serializers.SerializerMethodField()
@@ -56,15 +96,19 @@ class ProductCharacteristicSerializer(serializers.ModelSerializer):
         fields = ["id", "name", "value", "suffix"]
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductListSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    """
+    Compact product representation for the catalogue grid.
+    """
+
     name = serializers.SerializerMethodField()
     description = serializers.SerializerMethodField()
+    thumbnail = serializers.SerializerMethodField()
     gallery = ProductGallerySerializer(many=True, read_only=True)
     average_rating = serializers.FloatField(read_only=True)
     category = serializers.SerializerMethodField()
     discounted_price = serializers.SerializerMethodField()
     characteristics = ProductCharacteristicSerializer(many=True, read_only=True)
-    comments = serializers.SerializerMethodField()
 
     class Meta:
         model = Product
@@ -76,16 +120,28 @@ class ProductSerializer(serializers.ModelSerializer):
             "price",
             "discount_percentage",
             "discounted_price",
+            "thumbnail",
             "average_rating",
+            "rating_count",
+            "comment_count",
             "stock",
             "category",
             "is_featured",
             "gallery",
             "characteristics",
-            "comments",  # Added field for comments
-            "created_at",
-            "updated_at",
         ]
+        expandable_fields = ["description", "gallery", "characteristics"]
+        # Relations read by SerializerMethodFields, used by the query planner.
+        prefetch_hints = {
+            "category": ["category"],
+            "thumbnail": [
+                Prefetch(
+                    "gallery",
+                    queryset=ProductGallery.objects.order_by("id")[:1],
+                    to_attr="thumbnail_images",
+                )
+            ],
+        }
 
     def get_name(self, obj):
         language = get_language()
@@ -95,6 +151,20 @@ class ProductSerializer(serializers.ModelSerializer):
         language = get_language()
         return getattr(obj, f"description_{language}", obj.description)
 
+    def get_thumbnail(self, obj):
+        """
+        Return the URL of the first gallery image, if any.
+        """
+        images = getattr(obj, "thumbnail_images", None)
+        if images is None:
+            images = obj.gallery.all()[:1]
+        if not images:
+            return None
+
+        url = images[0].image.url
+        request = self.context.get("request")
+        return request.build_absolute_uri(url) if request else url
+
     def get_category(self, obj):
         """
         Return only the name and slug of the category.
@@ -111,15 +181,62 @@ class ProductSerializer(serializers.ModelSerializer):
         """
         return obj.discounted_price()
 
+
+class ProductSerializer(ProductListSerializer):
+    comments = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Product
+        fields = [
+            "id",
+            "name",
+            "slug",
+            "description",
+            "price",
+            "discount_percentage",
+            "discounted_price",
+            "thumbnail",
+            "average_rating",
+            "rating_count",
+            "comment_count",
+            "stock",
+            "category",
+            "is_featured",
+            "gallery",
+            "characteristics",
+            "comments",  # Added field for comments
+            "created_at",
+            "updated_at",
+        ]
+        # Comments are only embedded on the product page, see ProductViewSet
+        expandable_fields = ["comments"]
+        prefetch_hints = {
+            "category": ["category"],
+            "thumbnail": ["gallery"],
+            "comments": [
+                Prefetch(
+                    "product_comments",
+                    queryset=ProductComment.objects.select_related("user")[
+                        :RECENT_COMMENTS_LIMIT
+                    ],
+                    to_attr="recent_comments",
+                )
+            ],
+        }
+
     def get_comments(self, obj):
         """
-        Retrieve and order the comments by -created_at.
+        Return the newest comments, older ones are paginated separately.
         """
-        ordered_comments = obj.product_comments.order_by("-created_at")
-        return ProductCommentSerializer(ordered_comments, many=True).data
+        comments = getattr(obj, "recent_comments", None)
+        if comments is None:
+            comments = obj.product_comments.select_related("user")[
+                :RECENT_COMMENTS_LIMIT
+            ]
+        return ProductCommentSerializer(comments, many=True, context=self.context).data
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     name = serializers.SerializerMethodField()
     products = serializers.SerializerMethodField()
     characteristics = serializers.SerializerMethodField()
@@ -136,18 +253,58 @@ class CategorySerializer(serializers.ModelSerializer):
             "created_at",
             "updated_at",
         ]
+        prefetch_hints = {
+            "products": "get_products_prefetch",
+            "characteristics": ["characteristics"],
+        }
 
     def get_name(self, obj):
         language = get_language()
         return getattr(obj, f"name_{language}", obj.name)
 
+    def get_products_serializer(self, instance=None):
+        """
+        Build the compact product serializer, honouring ``expand=products.<field>``.
+        """
+        return ProductListSerializer(
+            instance,
+            many=True,
+            context=self.context,
+            expand=self.nested_expand.get("products"),
+        )
+
+    def get_products_prefetch(self):
+        """
+        Prefetch the products, and their own relations, only when they are rendered.
+
+        With a ``products_limit`` in the context the slice is applied per
+        category, which Django runs as a single
+        ``ROW_NUMBER() OVER (PARTITION BY category_id)`` query.
+        """
+        if not self.context.get("show_products", False):
+            return []
+        products = plan_queryset(
+            Product.objects.order_by(*CATEGORY_PRODUCTS_ORDERING),
+            self.get_products_serializer(),
+        )
+        limit = self.context.get("products_limit")
+        if limit is not None:
+            products = products[:limit]
+        return [Prefetch("products", queryset=products, to_attr="listed_products")]
+
     def get_products(self, obj):
         """
-        Return detailed products when accessing /categories/.
+        Return the top products (featured first) when accessing /categories/.
         """
-        if self.context.get("show_products", False):
-            return ProductSerializer(obj.products.all(), many=True).data
-        return []
+        if not self.context.get("show_products", False):
+            return []
+        products = getattr(obj, "listed_products", None)
+        if products is None:
+            products = obj.products.order_by(*CATEGORY_PRODUCTS_ORDERING)
+            limit = self.context.get("products_limit")
+            if limit is not None:
+                products = products[:limit]
+        return self.get_products_serializer(products).data
 
     def get_characteristics(self, obj):
         """
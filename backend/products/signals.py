@@ -0,0 +1,124 @@
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Now
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .cache import CATEGORIES_SCOPE, PRODUCTS_SCOPE, bump_generations, category_scope
+from .models import (
+    Category,
+    CharacteristicType,
+    Product,
+    ProductCharacteristic,
+    ProductComment,
+    ProductGallery,
+)
+from users.models import User
+from users.serializers import UserSerializer
+
+
+@receiver(post_delete, sender=ProductComment)
+def remove_comment_from_aggregates(sender, instance, **kwargs):
+    """
+    Keep product rating aggregates in sync on every delete, including cascades
+    and admin bulk deletes that never call ProductComment.delete().
+    """
+    instance.remove_from_aggregates()
+
+
+def invalidate_catalogue(product_ids=(), category_ids=()):
+    """
+    Bump the product generation and that of every category touched, once the
+    surrounding transaction commits so no reader caches pre-commit data.
+    """
+    slugs = (
+        Category.objects.filter(Q(pk__in=category_ids) | Q(products__in=product_ids))
+        .values_list("slug", flat=True)
+        .distinct()
+    )
+    scopes = [PRODUCTS_SCOPE, *(category_scope(slug) for slug in slugs)]
+    transaction.on_commit(lambda: bump_generations(*scopes))
+
+
+@receiver(pre_save, sender=Product)
+def remember_previous_category(sender, instance, **kwargs):
+    instance._previous_category_id = (
+        Product.objects.filter(pk=instance.pk)
+        .values_list("category_id", flat=True)
+        .first()
+        if instance.pk
+        else None
+    )
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_product(sender, instance, **kwargs):
+    previous = getattr(instance, "_previous_category_id", None)
+    invalidate_catalogue(category_ids={instance.category_id, previous} - {None})
+
+
+def related_product_ids(instance):
+    """
+    Return the products a gallery image, characteristic or comment belongs
+    to, and belonged to before a save moved it.
+    """
+    previous = getattr(instance, "_previous_product_id", None)
+    return {instance.product_id, previous} - {None}
+
+
+@receiver(post_save, sender=ProductGallery)
+@receiver(post_delete, sender=ProductGallery)
+@receiver(post_save, sender=ProductCharacteristic)
+@receiver(post_delete, sender=ProductCharacteristic)
+@receiver(post_save, sender=ProductComment)
+@receiver(post_delete, sender=ProductComment)
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=CharacteristicType)
+def touch_products(sender, instance, **kwargs):
+    """
+    Images, characteristics, comments, the category and characteristic
+    names are part of the product detail, move ``updated_at`` so its
+    Last-Modified moves with them.
+    """
+    if sender is Category:
+        products = Product.objects.filter(category=instance)
+    elif sender is CharacteristicType:
+        products = Product.objects.filter(characteristics__characteristic_type=instance)
+    else:
+        products = Product.objects.filter(pk__in=related_product_ids(instance))
+    products.update(updated_at=Now())
+
+
+@receiver(post_save, sender=User)
+def touch_commented_products(sender, instance, created, **kwargs):
+    """
+    Comments show their author, so a user edit that changes what the
+    detail shows of them moves the products they commented on.
+    """
+    if created or not instance.changed_fields(UserSerializer.Meta.fields):
+        return
+    products = Product.objects.filter(product_comments__user=instance)
+    invalidate_catalogue(product_ids=products.values("pk"))
+    products.update(updated_at=Now())
+
+
+@receiver(post_save, sender=ProductGallery)
+@receiver(post_delete, sender=ProductGallery)
+@receiver(post_save, sender=ProductCharacteristic)
+@receiver(post_delete, sender=ProductCharacteristic)
+@receiver(post_save, sender=ProductComment)
+@receiver(post_delete, sender=ProductComment)
+def invalidate_product_relation(sender, instance, **kwargs):
+    invalidate_catalogue(product_ids=related_product_ids(instance))
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=CharacteristicType)
+@receiver(post_delete, sender=CharacteristicType)
+@receiver(m2m_changed, sender=CharacteristicType.categories.through)
+def invalidate_categories(sender, **kwargs):
+    if kwargs.get("action", "post_").startswith("pre_"):
+        return
+    transaction.on_commit(lambda: bump_generations(CATEGORIES_SCOPE))
@@ -1,3 +1,771 @@
-from django.test import TestCase
+import json
+import tempfile
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.core.exceptions import ValidationError
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import Count, Max
+from django.utils import timezone
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from orders.models import Order, OrderItem
+from users.models import User
+from .models import (
+    Category,
+    CharacteristicType,
+    Product,
+    ProductCharacteristic,
+    ProductComment,
+    ProductGallery,
+)
+from .cache import get_cache
+from .management.commands.explain_hot_paths import plan_full_scans
+from .serializers import RECENT_COMMENTS_LIMIT
+
+
+class CatalogueTestCase(APITestCase):
+    def setUp(self):
+        # Responses are cached across tests, start every test from a cold cache
+        get_cache().clear()
+
+
+def create_catalogue(category, count, user, characteristic_type):
+    """Create ``count`` products with gallery, characteristics and comments."""
+    start = Product.objects.count()
+    for i in range(start, start + count):
+        product = Product.objects.create(
+            name=f"Scooter {i}",
+            description="Electric scooter",
+            price=10000 + i,
+            discount_percentage=10,
+            stock=5,
+            category=category,
+        )
+        ProductGallery.objects.create(product=product, image=f"scooter-{i}.png")
+        ProductCharacteristic.objects.create(
+            product=product, characteristic_type=characteristic_type, value="40"
+        )
+        ProductComment.objects.create(
+            product=product, user=user, comment="Great", rating=5
+        )
+
+
+class ProductQueryCountTests(CatalogueTestCase):
+    # Queries needed for one page of /api/products/, whatever its size.
+    MAX_LIST_QUERIES = 5
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email="rider@example.com")
+        cls.category = Category.objects.create(name="Scooters")
+        cls.characteristic_type = CharacteristicType.objects.create(
+            name="Range", data_type="integer", suffix="km"
+        )
+
+    def count_list_queries(self, url="/api/products/"):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_list_query_count_does_not_grow_with_page_size(self):
+        create_catalogue(self.category, 3, self.user, self.characteristic_type)
+        small_page = self.count_list_queries()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            create_catalogue(self.category, 20, self.user, self.characteristic_type)
+        large_page = self.count_list_queries()
+
+        self.assertEqual(small_page, large_page)
+        self.assertLessEqual(large_page, self.MAX_LIST_QUERIES)
+
+    def test_detail_and_similar_use_bounded_queries(self):
+        create_catalogue(self.category, 10, self.user, self.characteristic_type)
+        slug = Product.objects.first().slug
+
+        self.assertLessEqual(
+            self.count_list_queries(f"/api/products/{slug}/"), self.MAX_LIST_QUERIES
+        )
+        self.assertLessEqual(
+            self.count_list_queries(f"/api/products/{slug}/similar/"),
+            2 * self.MAX_LIST_QUERIES,
+        )
+
+    def test_similar_pages_are_newest_first(self):
+        create_catalogue(self.category, 5, self.user, self.characteristic_type)
+        product = Product.objects.first()
+        expected = list(
+            Product.objects.exclude(pk=product.pk)
+            .order_by("-created_at", "-id")
+            .values_list("id", flat=True)
+        )
+
+        ids = []
+        url = f"/api/products/{product.slug}/similar/?page_size=2"
+        while url:
+            page = self.client.get(url).data
+            ids += [similar["id"] for similar in page["results"]]
+            url = page["links"]["next"]
+        self.assertEqual(ids, expected)
+
+
+class ProductRatingAggregateTests(CatalogueTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email="rider@example.com")
+        cls.category = Category.objects.create(name="Scooters")
+
+    def setUp(self):
+        super().setUp()
+        self.product = Product.objects.create(
+            name="Scooter", description="Electric", price=1000, category=self.category
+        )
+
+    def assertAggregates(self, rating_sum, rating_count, comment_count):
+        self.product.refresh_from_db()
+        self.assertEqual(
+            (
+                self.product.rating_sum,
+                self.product.rating_count,
+                self.product.comment_count,
+            ),
+            (rating_sum, rating_count, comment_count),
+        )
+
+    def test_aggregates_follow_create_edit_and_delete(self):
+        first = ProductComment.objects.create(
+            product=self.product, user=self.user, rating=4, comment="Nice"
+        )
+        ProductComment.objects.create(product=self.product, user=self.user, rating=2)
+        self.assertAggregates(6, 2, 1)
+        self.assertEqual(self.product.average_rating(), 3)
+
+        first.rating = None
+        first.comment = ""
+        first.save()
+        self.assertAggregates(2, 1, 0)
+
+        ProductComment.objects.all().delete()
+        self.assertAggregates(0, 0, 0)
+        self.assertIsNone(self.product.average_rating())
+
+    def test_rebuild_command_repairs_drift(self):
+        ProductComment.objects.create(
+            product=self.product, user=self.user, rating=5, comment="Great"
+        )
+        Product.objects.update(rating_sum=0, rating_count=7, comment_count=3)
+
+        call_command("rebuild_product_ratings", stdout=StringIO())
+        self.assertAggregates(5, 1, 1)
+
+    def test_products_can_be_ordered_by_rating(self):
+        better = Product.objects.create(
+            name="Better", description="Electric", price=1000, category=self.category
+        )
+        ProductComment.objects.create(product=self.product, user=self.user, rating=2)
+        ProductComment.objects.create(product=better, user=self.user, rating=5)
+
+        response = self.client.get("/api/products/?ordering=-rating")
+        slugs = [product["slug"] for product in response.data["results"]]
+        self.assertEqual(slugs, ["better", "scooter"])
+
+
+class ProductCommentsEndpointTests(CatalogueTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email="rider@example.com")
+        category = Category.objects.create(name="Scooters")
+        cls.product = Product.objects.create(
+            name="Scooter", description="Electric", price=1000, category=category
+        )
+        cls.comments = [
+            ProductComment.objects.create(
+                product=cls.product, user=cls.user, comment=f"Review {i}", rating=5
+            )
+            for i in range(7)
+        ]
+        # All in one tick, the id breaks the tie
+        ProductComment.objects.update(created_at=timezone.now())
+
+    def test_comments_are_cursor_paginated_newest_first(self):
+        response = self.client.get("/api/products/scooter/comments/?page_size=4")
+        first_page = [comment["id"] for comment in response.data["results"]]
+
+        response = self.client.get(response.data["next"])
+        second_page = [comment["id"] for comment in response.data["results"]]
+
+        expected = [comment.id for comment in reversed(self.comments)]
+        self.assertEqual(first_page + second_page, expected)
+        self.assertIsNone(response.data["next"])
+
+    def test_list_omits_comments_and_detail_embeds_newest(self):
+        response = self.client.get("/api/products/")
+        listed = response.data["results"][0]
+        self.assertNotIn("comments", listed)
+        self.assertEqual(listed["comment_count"], 7)
+
+        response = self.client.get("/api/products/scooter/")
+        self.assertEqual(
+            [comment["id"] for comment in response.data["comments"]],
+            [comment.id for comment in reversed(self.comments)][:RECENT_COMMENTS_LIMIT],
+        )
+
+
+class SparseFieldsetTests(CatalogueTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(email="rider@example.com")
+        cls.category = Category.objects.create(name="Scooters")
+        characteristic_type = CharacteristicType.objects.create(
+            name="Range", data_type="integer"
+        )
+        create_catalogue(cls.category, 3, user, characteristic_type)
+
+    def test_list_is_compact_by_default(self):
+        product = self.client.get("/api/products/").data["results"][0]
+        self.assertIn("thumbnail", product)
+        self.assertNotIn("gallery", product)
+        self.assertNotIn("characteristics", product)
+        self.assertNotIn("description", product)
+
+    def test_fields_and_expand(self):
+        response = self.client.get("/api/products/?fields=slug,price")
+        self.assertEqual(set(response.data["results"][0]), {"slug", "price"})
+
+        response = self.client.get("/api/products/?expand=characteristics")
+        self.assertEqual(
+            response.data["results"][0]["characteristics"][0]["value"], "40"
+        )
+
+    def test_categories_support_nested_expand(self):
+        response = self.client.get("/api/categories/?expand=products.characteristics")
+        product = response.data["results"][0]["products"][0]
+        self.assertIn("characteristics", product)
+        self.assertNotIn("gallery", product)
+
+        response = self.client.get("/api/categories/?fields=name,slug")
+        self.assertEqual(set(response.data["results"][0]), {"name", "slug"})
+
+
+class CategoryProductsTests(CatalogueTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(email="rider@example.com")
+        characteristic_type = CharacteristicType.objects.create(
+            name="Range", data_type="integer"
+        )
+        for name in ("Scooters", "Bikes"):
+            category = Category.objects.create(name=name)
+            create_catalogue(category, 10, user, characteristic_type)
+        cls.featured = Product.objects.filter(category__name="Bikes").first()
+        cls.featured.is_featured = True
+        cls.featured.save()
+
+    def get_categories(self, query=""):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f"/api/categories/{query}")
+        categories = {c["slug"]: c for c in response.data["results"]}
+        return categories, len(queries)
+
+    def test_products_are_limited_per_category_featured_first(self):
+        categories, query_count = self.get_categories("?products_limit=3")
+        self.assertEqual(len(categories["scooters"]["products"]), 3)
+        self.assertEqual(categories["bikes"]["products"][0]["id"], self.featured.id)
+
+        # Two validator aggregates, count, categories, characteristics,
+        # windowed products, thumbnails
+        self.assertEqual(query_count, 7)
+
+    def test_all_products_on_request(self):
+        categories, _ = self.get_categories("?products=all")
+        self.assertEqual(len(categories["scooters"]["products"]), 10)
+
+
+class CatalogueCacheTests(CatalogueTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email="rider@example.com")
+        cls.scooters = Category.objects.create(name="Scooters")
+        cls.bikes = Category.objects.create(name="Bikes")
+        cls.characteristic_type = CharacteristicType.objects.create(
+            name="Range", data_type="integer"
+        )
+        create_catalogue(cls.scooters, 2, cls.user, cls.characteristic_type)
+        create_catalogue(cls.bikes, 2, cls.user, cls.characteristic_type)
+
+    def test_repeated_reads_are_served_from_cache(self):
+        first = self.client.get("/api/products/?lang=en")
+        # Only the ETag validator aggregate reaches the database
+        with self.assertNumQueries(1):
+            second = self.client.get("/api/products/?lang=en")
+        self.assertEqual(first.data, second.data)
+
+        # Other parameters and languages are cached separately
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get("/api/products/?lang=cs")
+        self.assertGreater(len(queries), 0)
+
+    def test_writes_invalidate_only_affected_category(self):
+        self.client.get("/api/products/?category=scooters")
+        self.client.get("/api/products/?category=bikes")
+
+        product = Product.objects.filter(category=self.scooters).first()
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductComment.objects.create(product=product, user=self.user, rating=1)
+
+        with self.assertNumQueries(1):
+            self.client.get("/api/products/?category=bikes")
+        response = self.client.get("/api/products/?category=scooters")
+        ratings = {p["slug"]: p["rating_count"] for p in response.data["results"]}
+        self.assertEqual(ratings[product.slug], 2)
+
+    def test_category_changes_invalidate_product_payloads(self):
+        slug = Product.objects.filter(category=self.bikes).first().slug
+        self.client.get(f"/api/products/{slug}/")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.bikes.name = "E-bikes"
+            self.bikes.save()
+
+        response = self.client.get(f"/api/products/{slug}/")
+        self.assertEqual(response.data["category"]["name"], "E-bikes")
+
+
+class ConditionalRequestTests(CatalogueTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name="Scooters")
+        cls.product = Product.objects.create(
+            name="Scooter", description="Electric", price=1000, category=cls.category
+        )
+
+    def test_matching_etag_returns_304_without_serializing(self):
+        # URL -> validator aggregates, the only queries a 304 costs
+        validator_queries = {
+            "/api/products/": 1,
+            "/api/products/scooter/": 1,
+            "/api/categories/": 2,
+        }
+        for url, query_count in validator_queries.items():
+            response = self.client.get(url)
+            with self.assertNumQueries(query_count):
+                not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+            self.assertEqual(not_modified.status_code, 304)
+
+    def test_only_the_detail_has_a_last_modified(self):
+        detail = self.client.get("/api/products/scooter/")
+        self.assertIn("Last-Modified", detail)
+        not_modified = self.client.get(
+            "/api/products/scooter/",
+            HTTP_IF_MODIFIED_SINCE=detail["Last-Modified"],
+        )
+        self.assertEqual(not_modified.status_code, 304)
+
+        # MAX(updated_at) of a list does not move when rows go away
+        for url in ("/api/products/", "/api/products/scooter/similar/"):
+            self.assertNotIn("Last-Modified", self.client.get(url))
+
+    def test_embedded_changes_move_the_detail_last_modified(self):
+        user = User.objects.create_user(email="rider@example.com", first_name="Ann")
+        speed = CharacteristicType.objects.create(name="Speed", data_type="integer")
+        ProductCharacteristic.objects.create(
+            product=self.product, characteristic_type=speed, value="25"
+        )
+        comment = ProductComment.objects.create(
+            product=self.product, user=user, comment="Fast"
+        )
+        edits = [
+            lambda: ProductComment.objects.create(product=self.product, user=user),
+            lambda: ProductComment.objects.filter(comment__isnull=True).delete(),
+            lambda: setattr(comment, "comment", "Very fast") or comment.save(),
+            lambda: setattr(user, "first_name", "Anna") or user.save(),
+            lambda: setattr(speed, "name", "Top speed") or speed.save(),
+        ]
+        for edit in edits:
+            # Last-Modified has a resolution of a second
+            Product.objects.update(
+                updated_at=timezone.now() - timezone.timedelta(hours=1)
+            )
+            detail = self.client.get("/api/products/scooter/")
+            with self.captureOnCommitCallbacks(execute=True):
+                edit()
+            response = self.client.get(
+                "/api/products/scooter/",
+                HTTP_IF_MODIFIED_SINCE=detail["Last-Modified"],
+            )
+            self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(response.data["characteristics"][0]["name"], "Top speed")
+
+    def test_etag_changes_when_product_changes(self):
+        etag = self.client.get("/api/products/scooter/")["ETag"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.stock = 3
+            self.product.save()
+
+        response = self.client.get("/api/products/scooter/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+
+class ProductSearchTests(CatalogueTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name="Scooters")
+        cls.city = Product.objects.create(
+            name_en="City scooter",
+            name_cs="Městská koloběžka",
+            description_en="Folding frame",
+            description_cs="Skládací rám",
+            price=1000,
+            category=category,
+        )
+        cls.offroad = Product.objects.create(
+            name_en="Offroad bike",
+            name_cs="Terénní kolo",
+            description_en="Rides like a scooter on any terrain",
+            description_cs="Jezdí jako koloběžka",
+            price=2000,
+            category=category,
+        )
+
+    def search(self, query):
+        response = self.client.get(f"/api/products/?{query}")
+        return [product["id"] for product in response.data["results"]]
+
+    def test_results_are_ranked_name_before_description(self):
+        self.assertEqual(
+            self.search("lang=en&search=scooters"), [self.city.id, self.offroad.id]
+        )
+        self.assertEqual(self.search("lang=en&search=fold"), [self.city.id])
+        self.assertEqual(
+            self.search("lang=en&search=scooter+terrain"), [self.offroad.id]
+        )
+
+    def test_czech_stemming_and_diacritics(self):
+        self.assertEqual(
+            self.search("lang=cs&search=kolobezky"), [self.city.id, self.offroad.id]
+        )
+        self.assertEqual(self.search("lang=cs&search=terénní"), [self.offroad.id])
+
+    def test_vectors_are_only_refreshed_when_the_text_changes(self):
+        product = Product.objects.get(pk=self.city.pk)
+        with mock.patch("products.models.update_search_vectors") as update:
+            product.stock = 3
+            product.save()
+            product.save(update_fields=["stock"])
+            self.assertFalse(update.called)
+
+            product.description_cs = "Lehký skládací rám"
+            product.save()
+            self.assertEqual(update.call_count, 1)
+
+    def test_explicit_ordering_overrides_rank(self):
+        self.assertEqual(
+            self.search("lang=en&search=scooter&ordering=-price"),
+            [self.offroad.id, self.city.id],
+        )
+
+
+class CharacteristicFacetTests(CatalogueTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.range = CharacteristicType.objects.create(
+            name="Range", data_type="integer", suffix="km"
+        )
+        cls.foldable = CharacteristicType.objects.create(
+            name="Foldable", data_type="boolean"
+        )
+        cls.color = CharacteristicType.objects.create(name="Color")
+        cls.products = {}
+        for category_name, specs in (
+            ("Scooters", [(25, "true", "Red"), (40, "false", "Blue")]),
+            ("Bikes", [(60, "True", "red"), (90, "false", "Black")]),
+        ):
+            category = Category.objects.create(name=category_name)
+            for km, foldable, color in specs:
+                product = Product.objects.create(
+                    name=f"{category_name} {km}", price=1000, category=category
+                )
+                for characteristic_type, value in (
+                    (cls.range, str(km)),
+                    (cls.foldable, foldable),
+                    (cls.color, color),
+                ):
+                    ProductCharacteristic.objects.create(
+                        product=product,
+                        characteristic_type=characteristic_type,
+                        value=value,
+                    )
+                cls.products[km] = product
+
+    def filter_ranges(self, query):
+        response = self.client.get(f"/api/products/?{query}")
+        self.assertEqual(response.status_code, 200)
+        return sorted(
+            km
+            for km, product in self.products.items()
+            if product.id in {p["id"] for p in response.data["results"]}
+        )
+
+    def test_typed_columns_follow_data_type(self):
+        characteristic = ProductCharacteristic.objects.get(
+            product=self.products[60], characteristic_type=self.foldable
+        )
+        self.assertIs(characteristic.value_bool, True)
+        self.assertIsNone(characteristic.value_int)
+
+        with self.assertRaises(ValidationError):
+            ProductCharacteristic(
+                product=self.products[60], characteristic_type=self.range, value="far"
+            ).save()
+
+    def test_filter_by_range_and_values(self):
+        self.assertEqual(
+            self.filter_ranges(f"char_{self.range.id}_min=40"), [40, 60, 90]
+        )
+        self.assertEqual(
+            self.filter_ranges(
+                f"char_{self.range.id}_min=30&char_{self.range.id}_max=70"
+                f"&char_{self.foldable.id}=false"
+            ),
+            [40],
+        )
+        self.assertEqual(
+            self.filter_ranges(f"lang=en&char_{self.color.id}=red,black"), [25, 60, 90]
+        )
+
+        response = self.client.get(f"/api/products/?char_{self.range.id}_min=far")
+        self.assertEqual(response.status_code, 400)
+
+    def test_facets_count_the_filtered_products(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                f"/api/products/facets/?lang=en&char_{self.range.id}_min=30"
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 3)
+        self.assertEqual(
+            response.data["categories"],
+            [{"category": "bikes", "count": 2}, {"category": "scooters", "count": 1}],
+        )
+
+        facets = {facet["id"]: facet for facet in response.data["characteristics"]}
+        self.assertEqual(
+            (facets[self.range.id]["min"], facets[self.range.id]["max"]), (40, 90)
+        )
+        self.assertEqual(
+            facets[self.foldable.id]["values"],
+            [{"value": False, "count": 2}, {"value": True, "count": 1}],
+        )
+
+        # The filter's type lookup and the validator aggregate for the ETag,
+        # then the type lookup again, categories, characteristics and types
+        self.assertEqual(len(queries), 6)
+
+
+class KeysetPaginationTests(CatalogueTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name="Scooters")
+        # Repeated prices make the id tiebreaker matter
+        for i, price in enumerate([300, 100, 200, 100, 300, 100, 200]):
+            Product.objects.create(name=f"Scooter {i}", price=price, category=category)
+        cls.by_price = list(
+            Product.objects.order_by("price", "id").values_list("id", flat=True)
+        )
+
+    def get_page(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.data, len(queries)
+
+    def test_cursor_pages_walk_the_ordering_both_ways(self):
+        url = "/api/products/?pagination=cursor&ordering=price&page_size=3"
+        pages, query_counts = [], []
+        while url:
+            data, query_count = self.get_page(url)
+            self.assertNotIn("count", data)
+            pages.append([product["id"] for product in data["results"]])
+            query_counts.append(query_count)
+            url = data["links"]["next"]
+
+        self.assertEqual(sum(pages, []), self.by_price)
+        self.assertEqual(len(set(query_counts)), 1)
+
+        previous, _ = self.get_page(data["links"]["previous"])
+        self.assertEqual([product["id"] for product in previous["results"]], pages[1])
+        first, _ = self.get_page(previous["links"]["previous"])
+        self.assertEqual([product["id"] for product in first["results"]], pages[0])
+        self.assertIsNone(first["links"]["previous"])
+
+    def test_approximate_count_and_invalid_input(self):
+        data, _ = self.get_page("/api/products/?pagination=cursor&count=approximate")
+        self.assertEqual(data["count"], 7)
+        self.assertTrue(data["count_is_approximate"])
+
+        response = self.client.get("/api/products/?cursor=bogus")
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get("/api/products/?pagination=cursor&ordering=rating")
+        self.assertEqual(response.status_code, 400)
+
+
+class EffectivePriceTests(CatalogueTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name="Scooters")
+        for i, (price, discount) in enumerate(
+            [(1000, 0), (2000, 60), ("999.99", 15), (1500, 10)]
+        ):
+            Product.objects.create(
+                name=f"Scooter {i}",
+                price=price,
+                discount_percentage=discount,
+                category=category,
+            )
+
+    def test_database_and_python_prices_agree(self):
+        for product in Product.objects.all():
+            self.assertEqual(product.effective_price, product.discounted_price())
+        self.assertEqual(
+            Product.objects.get(name="Scooter 2").effective_price, Decimal("849.99")
+        )
+
+    def test_filter_and_order_by_effective_price(self):
+        response = self.client.get(
+            "/api/products/?effective_price__gte=800&effective_price__lte=1000"
+            "&ordering=-effective_price&fields=name&lang=en"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [product["name"] for product in response.data["results"]],
+            ["Scooter 0", "Scooter 2", "Scooter 1"],
+        )
+
+
+class ExplainHotPathsTests(CatalogueTestCase):
+    def test_hot_paths_are_served_by_indexes(self):
+        user = User.objects.create_user(email="rider@example.com")
+        characteristic_type = CharacteristicType.objects.create(
+            name="Speed", data_type="integer"
+        )
+        create_catalogue(
+            Category.objects.create(name="Scooters"), 3, user, characteristic_type
+        )
+        Order.create_with_items(
+            [{"product": Product.objects.first(), "quantity": 1}],
+            user=user,
+            address="Main street 1",
+            city="Prague",
+            postal_code="11000",
+            country="Czechia",
+            phone="123",
+        )
+
+        out = StringIO()
+        call_command("explain_hot_paths", stdout=out)
+        self.assertIn("Every hot path is served by indexes.", out.getvalue())
+
+    def test_only_whole_table_aggregates_are_exempt(self):
+        with CaptureQueriesContext(connection) as queries:
+            Product.objects.order_by().aggregate(
+                last_modified=Max("updated_at"), count=Count("pk")
+            )
+            Product.objects.count()
+        for query in queries.captured_queries:
+            self.assertEqual(plan_full_scans(query["sql"]), [])
+
+        names = str(Product.objects.order_by().values("name").query)
+        self.assertEqual(plan_full_scans(names), ["products_product"])
+
+
+class SeedPerfTests(CatalogueTestCase):
+    def seed(self, prefix):
+        call_command(
+            "seed_perf",
+            categories=2,
+            products=12,
+            users=4,
+            orders=20,
+            chunk_size=5,
+            seed=7,
+            prefix=prefix,
+            stdout=StringIO(),
+        )
+        return Product.objects.filter(slug__startswith=f"{prefix}-").order_by("pk")
+
+    def test_seeds_consistent_data(self):
+        products = self.seed("perf")
+
+        self.assertEqual(products.count(), 12)
+        self.assertEqual(Order.objects.count(), 20)
+        product = products.first()
+        self.assertNotEqual(product.name_en, product.name_cs)
+        self.assertEqual(
+            ProductCharacteristic.objects.filter(product=product)
+            .exclude(value_int=None, value_float=None, value_bool=None)
+            .count(),
+            3,
+        )
+        for product in products:
+            comments = ProductComment.objects.filter(product=product)
+            self.assertEqual(
+                product.rating_count, comments.exclude(rating=None).count()
+            )
+            self.assertEqual(product.created_at, product.updated_at)
+        for order in Order.objects.prefetch_related("items__product"):
+            self.assertEqual(
+                order.total_price,
+                sum(item.line_total() for item in order.items.all()),
+            )
+            for item in order.items.all():
+                self.assertGreaterEqual(order.created_at, item.product.created_at)
+        self.assertTrue(OrderItem.objects.exists())
+
+        with self.assertRaisesMessage(CommandError, "pick another --prefix"):
+            self.seed("perf")
+
+    def test_same_seed_same_data(self):
+        first = self.seed("one").values_list("price", "discount_percentage", "stock")
+        second = self.seed("two").values_list("price", "discount_percentage", "stock")
+        self.assertEqual(list(first), list(second))
+
+
+class BenchmarkApiTests(CatalogueTestCase):
+    def test_fails_when_an_endpoint_outgrows_its_budget(self):
+        call_command(
+            "seed_perf", categories=2, products=10, users=3, orders=5, stdout=StringIO()
+        )
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        baseline = Path(directory.name) / "baseline.json"
+
+        def benchmark(*args):
+            call_command(
+                "benchmark_api",
+                *args,
+                baseline=baseline,
+                repeat=2,
+                warmup=1,
+                tolerance=100,
+                stdout=StringIO(),
+            )
+
+        benchmark("--write-baseline")
+        data = json.loads(baseline.read_text())
+        self.assertEqual(data["endpoints"]["order history"]["queries"], 3)
+        # The orders placed while measuring were rolled back
+        self.assertEqual(Order.objects.count(), 5)
+        benchmark()
+
+        data["endpoints"]["product list"]["queries"] -= 1
+        baseline.write_text(json.dumps(data))
+        with self.assertRaisesMessage(CommandError, "product list: queries"):
+            benchmark()
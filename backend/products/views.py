@@ -1,21 +1,58 @@
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.permissions import IsAuthenticatedOrReadOnly
-from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework.filters import OrderingFilter
 from django_filters.rest_framework import DjangoFilterBackend
 from .models import Product, Category, ProductComment
 from .serializers import (
+    DynamicFieldsMixin,
+    ProductListSerializer,
     ProductSerializer,
     CategorySerializer,
     ProductCommentSerializer,
 )
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from .pagination import CustomPagination
+from .pagination import CommentCursorPagination, CustomPagination
+from .query_planner import plan_queryset
+from .search import ProductSearchFilter
+from .filters import CharacteristicFilter, ProductFilterSet, facet_counts
+from .cache import (
+    CATEGORIES_SCOPE,
+    PRODUCTS_SCOPE,
+    cache_response,
+    category_scope,
+    conditional_response,
+)
 from rest_framework.exceptions import NotFound
+from django.shortcuts import get_object_or_404
 from django.utils.translation import activate
+from django.db.models import F, FloatField
+from django.db.models.functions import Cast, Coalesce, NullIf
+
+
+class SparseFieldsetMixin:
+    """
+    Pass ``?fields=a,b`` and ``?expand=c,d`` on to serializers that support
+    sparse fieldsets. ``default_expand`` maps actions to fields expanded
+    without asking.
+    """
+
+    default_expand = {}
 
+    def get_serializer(self, *args, **kwargs):
+        if self.request is not None and issubclass(
+            self.get_serializer_class(), DynamicFieldsMixin
+        ):
+            params = self.request.query_params
+            expand = set(self.default_expand.get(self.action, ()))
+            expand.update(name for name in params.get("expand", "").split(",") if name)
+            kwargs.setdefault("expand", expand)
+            if params.get("fields"):
+                kwargs.setdefault("fields", params["fields"].split(","))
+        return super().get_serializer(*args, **kwargs)
 
-class CategoryViewSet(ModelViewSet):
+
+class CategoryViewSet(SparseFieldsetMixin, ModelViewSet):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     lookup_field = "slug"
@@ -24,7 +61,11 @@ class CategoryViewSet(ModelViewSet):
         lang = self.request.query_params.get("lang")
         if lang:
             activate(lang)
-        return super().get_queryset()
+        return plan_queryset(super().get_queryset(), self.get_serializer())
+
+    # Products embedded per category, ``?products=all`` lifts the limit
+    products_limit = 8
+    max_products_limit = 50
 
     def get_serializer_context(self):
         """
@@ -34,8 +75,48 @@ class CategoryViewSet(ModelViewSet):
         context["show_products"] = (
             self.action == "list"
         )  # Show products only in the list view
+        context["products_limit"] = self.get_products_limit()
         return context
 
+    def get_products_limit(self):
+        """
+        Return how many products to embed per category, or None for all of them.
+        """
+        if self.request is None:
+            return self.products_limit
+        params = self.request.query_params
+        if params.get("products") == "all":
+            return None
+        try:
+            limit = int(params.get("products_limit", self.products_limit))
+        except ValueError:
+            return self.products_limit
+        return min(max(limit, 0), self.max_products_limit)
+
+    def get_cache_scopes(self):
+        """
+        Categories embed products, so both generations key the cache.
+        """
+        return [CATEGORIES_SCOPE, PRODUCTS_SCOPE]
+
+    def get_conditional_querysets(self, slug=None):
+        """
+        Querysets whose MAX(updated_at)/COUNT validate the response.
+        """
+        if self.action == "retrieve":
+            return [Category.objects.filter(slug=slug)]
+        return [Category.objects.all(), Product.objects.all()]
+
+    @conditional_response
+    @cache_response
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional_response
+    @cache_response
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
 
 from rest_framework.permissions import IsAuthenticated
 
@@ -51,7 +132,7 @@ class ProductCommentViewSet(ModelViewSet):
         serializer.save(user=self.request.user)
 
 
-class ProductViewSet(ModelViewSet):
+class ProductViewSet(SparseFieldsetMixin, ModelViewSet):
     """
     ViewSet for managing products.
     """
@@ -61,12 +142,26 @@ class ProductViewSet(ModelViewSet):
     serializer_class = ProductSerializer
     # permission_classes = [IsAuthenticatedOrReadOnly]
     lookup_field = "slug"  # Use slug for product URLs
+    default_expand = {"retrieve": ["comments"]}
 
     # Filters
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
-    filterset_fields = ["is_featured", "price"]  # Other filters
-    search_fields = ["name", "description"]  # Search by name or description
-    ordering_fields = ["price", "created_at", "updated_at"]
+    # Search runs last so results fall back to rank order
+    filter_backends = [
+        DjangoFilterBackend,
+        CharacteristicFilter,
+        OrderingFilter,
+        ProductSearchFilter,
+    ]
+    # Other filters, price ranges are index range scans on effective_price
+    filterset_class = ProductFilterSet
+    ordering_fields = [
+        "price",
+        "effective_price",
+        "created_at",
+        "updated_at",
+        "rating",
+        "rating_count",
+    ]
     ordering = ["-created_at"]  # Default ordering
 
     def get_queryset(self):
@@ -78,6 +173,14 @@ class ProductViewSet(ModelViewSet):
             activate(lang)
         queryset = super().get_queryset()
 
+        # Average rating from the denormalized columns, so it can be ordered on
+        queryset = queryset.annotate(
+            rating=Coalesce(
+                Cast("rating_sum", FloatField()) / NullIf(F("rating_count"), 0),
+                0.0,
+            )
+        )
+
         # Filter by category slug
         category_slug = self.request.query_params.get("category")
         if category_slug:
@@ -88,9 +191,54 @@ class ProductViewSet(ModelViewSet):
         if featured:
             queryset = queryset.filter(is_featured=True)
 
-        return queryset
+        # Load everything the serializer touches up front, not once per row
+        return plan_queryset(queryset, self.get_serializer())
+
+    def get_serializer_class(self):
+        """
+        Use the compact serializer for catalogue grids.
+        """
+        if self.action in ("list", "similar"):
+            return ProductListSerializer
+        return super().get_serializer_class()
+
+    def get_cache_scopes(self):
+        """
+        A list filtered by category only goes stale when that category's
+        products change, everything else when any product does.
+        """
+        category_slug = self.request.query_params.get("category")
+        if self.action in ("list", "facets") and category_slug:
+            return [CATEGORIES_SCOPE, category_scope(category_slug)]
+        return [CATEGORIES_SCOPE, PRODUCTS_SCOPE]
+
+    def get_conditional_querysets(self, slug=None):
+        """
+        Querysets whose MAX(updated_at)/COUNT validate the response.
+        """
+        if self.action == "list" and self.paginator.use_cursor(self.request):
+            # Cursor pages skip the full-table aggregate, the generations
+            # in the ETag already move on every product write
+            return []
+        if self.action in ("list", "facets"):
+            return [self.filter_queryset(self.get_queryset())]
+        if self.action == "retrieve":
+            return [Product.objects.filter(slug=slug)]
+        return [Product.objects.filter(category__products__slug=slug)]
+
+    @conditional_response
+    @cache_response
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional_response(last_modified=True)
+    @cache_response
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
 
     @action(detail=True, methods=["get"])
+    @conditional_response
+    @cache_response
     def similar(self, request, slug=None):
         """
         Custom action to get similar products by category.
@@ -101,9 +249,12 @@ class ProductViewSet(ModelViewSet):
             raise NotFound(detail="Product not found.")
 
         # Fetch similar products in the same category, excluding the current product
-        similar_products = Product.objects.filter(category=product.category).exclude(
-            slug=product.slug
+        similar_products = (
+            Product.objects.filter(category=product.category)
+            .exclude(slug=product.slug)
+            .order_by("-created_at", "-id")  # Stable pages, as in the catalogue
         )
+        similar_products = plan_queryset(similar_products, self.get_serializer())
 
         # Apply pagination
         page = self.paginate_queryset(similar_products)
@@ -114,3 +265,32 @@ class ProductViewSet(ModelViewSet):
         # Serialize and return similar products
         serializer = self.get_serializer(similar_products, many=True)
         return Response(serializer.data)
+
+    @action(detail=False, methods=["get"])
+    @conditional_response
+    @cache_response
+    def facets(self, request):
+        """
+        Custom action to count the filtered products per category and
+        summarize their characteristic values, for building filter panels.
+        """
+        return Response(facet_counts(self.filter_queryset(self.get_queryset())))
+
+    @action(
+        detail=True,
+        methods=["get"],
+        serializer_class=ProductCommentSerializer,
+        pagination_class=CommentCursorPagination,
+    )
+    def comments(self, request, slug=None):
+        """
+        Custom action to page through a product's comments, newest first.
+        """
+        product = get_object_or_404(Product.objects.only("pk"), slug=slug)
+        comments = plan_queryset(
+            ProductComment.objects.filter(product=product), self.get_serializer()
+        )
+
+        page = self.paginate_queryset(comments)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
@@ -0,0 +1,22 @@
+# Generated by Django 5.1.5 on 2026-10-18 19:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("users", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(
+                condition=models.Q(("is_superuser", True)),
+                fields=["email"],
+                name="user_superuser_email_idx",
+            ),
+        ),
+    ]
@@ -4,6 +4,7 @@ from django.contrib.auth.models import (
     PermissionsMixin,
 )
 from django.db import models
+from django.db.models import DEFERRED
 from django.utils.crypto import get_random_string
 from django.utils.timezone import now
 from datetime import timedelta
@@ -48,9 +49,41 @@ class User(AbstractBaseUser, PermissionsMixin):
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = []
 
+    class Meta:
+        indexes = [
+            # Admin recipients of order emails and help requests, read from
+            # the index alone
+            models.Index(
+                fields=["email"],
+                condition=models.Q(is_superuser=True),
+                name="user_superuser_email_idx",
+            ),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
     def __str__(self):
         return self.email
 
+    def changed_fields(self, fields):
+        """
+        Return which of ``fields`` differ from the values loaded from the
+        database. Without loaded values every field counts as changed.
+        """
+        loaded = getattr(self, "_loaded_values", None)
+        if loaded is None:
+            return list(fields)
+        return [
+            field
+            for field in fields
+            if loaded.get(field, DEFERRED) is not DEFERRED
+            and loaded[field] != getattr(self, field)
+        ]
+
     def set_temp_password(self):
         """
         Generate a temporary password and set its expiry.
@@ -0,0 +1,52 @@
+from django.conf import settings
+from django.core.mail import EmailMessage, send_mail
+from django.utils.html import strip_tags
+from django.utils.timezone import now
+
+from backend.emails import render_email
+from jobs.queue import task
+from .models import User
+
+
+@task
+def send_temp_password_email(user_id):
+    """
+    Send the user's current temporary password, unless it expired while the
+    email was queued.
+    """
+    user = User.objects.get(pk=user_id)
+    if not user.temp_password or user.temp_password_expiry <= now():
+        return
+
+    html_content = render_email("tempPassword.html", {"user": user})
+    email = EmailMessage(
+        subject="Your Temporary Password",
+        body=html_content,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[user.email],
+    )
+    email.content_subtype = "html"
+    email.send()
+
+
+@task
+def send_help_request_email(email, subject, message):
+    """
+    Forward a help request to all superusers.
+    """
+    superuser_emails = list(
+        User.objects.filter(is_superuser=True).values_list("email", flat=True)
+    )
+    if not superuser_emails:
+        return
+
+    html_message = render_email(
+        "helpRequest.html", {"email": email, "subject": subject, "message": message}
+    )
+    send_mail(
+        subject=f"New Help Request: {subject}",
+        message=strip_tags(html_message),
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        recipient_list=superuser_emails,
+        html_message=html_message,
+    )
@@ -1,3 +1,80 @@
-from django.test import TestCase
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
 
-# Create your tests here.
+from orders.models import Order
+from products.models import Category, Product, ProductGallery
+from .models import User
+
+
+class ProfileOrdersTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name="Scooters")
+        products = [
+            Product.objects.create(
+                name=f"Scooter {i}", price=1000, stock=5, category=category
+            )
+            for i in range(3)
+        ]
+        for product in products:
+            ProductGallery.objects.create(
+                product=product, image=f"product_gallery/{product.pk}.jpg"
+            )
+
+        cls.user = User.objects.create_user(email="rider@example.com")
+        other = User.objects.create_user(email="other@example.com")
+        for index in range(5):
+            Order.create_with_items(
+                [{"product": product, "quantity": 1} for product in products],
+                user=cls.user,
+                address="Main 1",
+                city="Prague",
+                postal_code="11000",
+                country="CZ",
+                phone="123",
+                paid_at=timezone.now() if index < 2 else None,
+            )
+        Order.create_with_items(
+            [{"product": products[0], "quantity": 1}],
+            user=other,
+            address="Main 1",
+            city="Prague",
+            postal_code="11000",
+            country="CZ",
+            phone="123",
+        )
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def test_profile_carries_only_the_summary(self):
+        response = self.client.get("/api/profile/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("orders", response.data)
+        summary = response.data["order_summary"]
+        self.assertEqual(summary["count"], 5)
+        self.assertEqual(summary["by_status"]["pending"], 5)
+        self.assertEqual(summary["total_spent"], 2 * 3 * 1000)
+
+    def test_order_history_pages_in_constant_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/profile/orders/?page_size=3&lang=en")
+        self.assertEqual(response.status_code, 200)
+        # Orders, items with products, thumbnails
+        self.assertEqual(len(queries), 3)
+
+        orders = response.data["results"]
+        self.assertEqual(len(orders), 3)
+        self.assertEqual(orders[0]["city"], "Prague")
+        self.assertEqual(
+            set(orders[0]["items"][0]["product"]),
+            {"id", "name", "slug", "discounted_price", "thumbnail"},
+        )
+        self.assertTrue(orders[0]["items"][0]["product"]["thumbnail"])
+
+        response = self.client.get(response.data["next"])
+        self.assertEqual(len(response.data["results"]), 2)
+        self.assertIsNone(response.data["next"])
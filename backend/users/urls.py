@@ -5,6 +5,7 @@ from .views import (
     UserUpdateView,
     VerifyTempPasswordView,
     ProfileView,
+    ProfileOrdersView,
 )
 from rest_framework_simplejwt.views import (
     TokenRefreshView,
@@ -22,6 +23,7 @@ urlpatterns = [
         name="verify_temp_password",
     ),
     path("profile/", ProfileView.as_view(), name="profile"),
+    path("profile/orders/", ProfileOrdersView.as_view(), name="profile_orders"),
     path("users/update/", UserUpdateView.as_view(), name="user_update"),
     path("token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
     path("help-request/", HelpRequestView.as_view(), name="help-request"),
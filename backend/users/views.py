@@ -1,20 +1,19 @@
 from orders.models import Order
-from orders.serializers import OrderSerializer
+from orders.pagination import OrderHistoryPagination
+from orders.serializers import OrderHistorySerializer
+from products.query_planner import plan_queryset
+from rest_framework.generics import ListAPIView
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from django.core.mail import send_mail
 from django.utils.crypto import get_random_string
-from django.conf import settings
 from .models import User
 from .serializers import TempPasswordSerializer, UserSerializer, UserUpdateSerializer
+from .tasks import send_help_request_email, send_temp_password_email
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework.permissions import AllowAny
 from django.utils.translation import activate
 
-from django.core.mail import EmailMessage
-from django.template.loader import render_to_string
-
 
 class GenerateTempPasswordView(APIView):
     """
@@ -29,22 +28,7 @@ class GenerateTempPasswordView(APIView):
         if serializer.is_valid():
             user = serializer.validated_data["user"]
 
-            html_content = render_to_string(
-                "email/tempPassword.html",
-                {
-                    "user": user,
-                    "logo_url": f"{settings.SITE_URL}/static/logo.png",
-                    "help_url": f"{settings.FRONTEND_SITE_URL}/help",
-                },
-            )
-            email = EmailMessage(
-                subject="Your Temporary Password",
-                body=html_content,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                to=[user.email],
-            )
-            email.content_subtype = "html"
-            email.send()
+            send_temp_password_email.enqueue(user.pk)
 
             return Response(
                 {"message": "Temporary password sent to your email."},
@@ -90,22 +74,37 @@ class ProfileView(APIView):
         if lang:
             activate(lang)
 
-        # Fetch user orders
-        orders = Order.objects.filter(user=user).order_by("-created_at")
         serializer_context = {"request": request}  # Add the request to context
-        orders_data = OrderSerializer(
-            orders, many=True, context=serializer_context
-        ).data
 
+        # Only counts here, the orders themselves are paged by ProfileOrdersView
         return Response(
             {
                 "user": UserSerializer(user, context=serializer_context).data,
-                "orders": orders_data,
+                "order_summary": Order.summary_for(user),
             },
             status=status.HTTP_200_OK,
         )
 
 
+class ProfileOrdersView(ListAPIView):
+    """
+    The user's order history, newest first, in cursor pages.
+    """
+
+    permission_classes = [IsAuthenticated]
+    serializer_class = OrderHistorySerializer
+    pagination_class = OrderHistoryPagination
+
+    def get_queryset(self):
+        lang = self.request.query_params.get("lang")
+        if lang:
+            activate(lang)
+
+        return plan_queryset(
+            Order.objects.filter(user=self.request.user), self.get_serializer()
+        )
+
+
 class UserUpdateView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -134,8 +133,6 @@ class HelpRequestView(APIView):
     permission_classes = [AllowAny]
 
     def post(self, request):
-        from django.utils.html import strip_tags
-
         email = request.data.get("email")
         subject = request.data.get("subject")
         message = request.data.get("message")
@@ -145,37 +142,13 @@ class HelpRequestView(APIView):
                 {"error": "All fields are required"}, status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Get all superusers' emails
-        superuser_emails = list(
-            User.objects.filter(is_superuser=True).values_list("email", flat=True)
-        )
-
-        if not superuser_emails:
+        if not User.objects.filter(is_superuser=True).exists():
             return Response(
                 {"error": "No admin users found to receive the message"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
 
-        # Prepare email context
-        context = {
-            "email": email,
-            "subject": subject,
-            "message": message,
-            "logo_url": f"{settings.SITE_URL}/static/logo.png",
-        }
-
-        # Load HTML template
-        html_message = render_to_string("email/helpRequest.html", context)
-        plain_message = strip_tags(html_message)
-
-        # Send email to all superusers
-        send_mail(
-            subject=f"New Help Request: {subject}",
-            message=plain_message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=superuser_emails,
-            html_message=html_message,
-        )
+        send_help_request_email.enqueue(email, subject, message)
 
         return Response(
             {"message": "Your message has been sent successfully"},
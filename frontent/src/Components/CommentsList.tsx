@@ -1,18 +1,29 @@
 import React, { useState } from "react";
 import { useSelector, useDispatch } from "react-redux";
 import { ProductComment } from "../interfaces/product";
-import { deleteComment, refreshAccessToken, saveComment } from "../utils/api";
+import { deleteComment, getProductComments, refreshAccessToken, saveComment } from "../utils/api";
 import { RootState } from "../redux/store";
 import { useNavigate } from "react-router-dom";
 import { updateTokens } from "../redux/slices/authSlice";
 import { useTranslation } from "react-i18next";
 
-const CommentsList: React.FC<{ product_comments: ProductComment[], productId: number }> = ({ product_comments, productId }) => {
+interface CommentsListProps {
+    product_comments: ProductComment[];
+    productId: number;
+    productSlug: string;
+    commentCount: number;
+}
+
+const CommentsList: React.FC<CommentsListProps> = ({ product_comments, productId, productSlug, commentCount }) => {
     const [newComment, setNewComment] = useState<string>("");
     const [rating, setRating] = useState<number>(0); // Selected rating
     const [hoverRating, setHoverRating] = useState<number>(0); // Hovered rating
     const [error, setError] = useState<string | null>(null);
     const [comments, setComments] = useState<ProductComment[]>(product_comments);
+    // The product embeds only the newest comments, older ones come from the comments endpoint
+    const [nextCommentsUrl, setNextCommentsUrl] = useState<string | null>(null);
+    const [hasMoreComments, setHasMoreComments] = useState<boolean>(commentCount > product_comments.length);
+    const [loadingComments, setLoadingComments] = useState<boolean>(false);
 
     const navigate = useNavigate();
     const user = useSelector((state: RootState) => state.auth.user);
@@ -122,6 +133,22 @@ const CommentsList: React.FC<{ product_comments: ProductComment[], productId: nu
         }
     };
 
+    const handleLoadMoreComments = async () => {
+        setLoadingComments(true);
+        try {
+            const page = await getProductComments(productSlug, nextCommentsUrl);
+            // The first page repeats the embedded comments
+            setComments((comments) => [
+                ...comments,
+                ...page.results.filter((comment) => !comments.some((c) => c.id === comment.id)),
+            ]);
+            setNextCommentsUrl(page.next);
+            setHasMoreComments(page.next !== null);
+        } finally {
+            setLoadingComments(false);
+        }
+    };
+
     const renderStars = (currentRating: number) => {
         return Array.from({ length: 5 }, (_, index) => {
             const starValue = index + 1;
@@ -220,6 +247,15 @@ const CommentsList: React.FC<{ product_comments: ProductComment[], productId: nu
                         <p className="text-gray-700">{comment.comment}</p>
                     </div>
                 ))}
+                {hasMoreComments && (
+                    <button
+                        onClick={handleLoadMoreComments}
+                        disabled={loadingComments}
+                        className="bg-orange-500 text-white py-2 px-6 rounded-lg hover:bg-orange-600 transition disabled:opacity-50"
+                    >
+                        {t("show_more")}
+                    </button>
+                )}
             </div>
         </div>
     );
@@ -1,5 +1,5 @@
 import React, { useState, useEffect, useRef } from "react";
-import { Category, CategoryCharacteristic } from "../interfaces/category";
+import { Category, CategoryCharacteristic, ProductFacets } from "../interfaces/category";
 import { useDispatch, useSelector } from "react-redux";
 import { RootState } from "../redux/store";
 import { setFilters } from "../redux/slices/filterSlice";
@@ -7,10 +7,11 @@ import { useTranslation } from "react-i18next";
 
 interface FiltersProps {
   categories: Category[];
+  facets: ProductFacets | null;
   maxProductPrice: number;
 }
 
-const Filters: React.FC<FiltersProps> = ({ categories, maxProductPrice }) => {
+const Filters: React.FC<FiltersProps> = ({ categories, facets, maxProductPrice }) => {
   const dispatch = useDispatch();
   const savedFilters = useSelector((state: RootState) => state.filters);
 
@@ -31,6 +32,12 @@ const Filters: React.FC<FiltersProps> = ({ categories, maxProductPrice }) => {
     (category) => category.name === selectedCategory
   );
 
+  // Values offered for a characteristic, as summarized by /products/facets/
+  const facetFor = (name: string) =>
+    facets?.characteristics.find((facet) => facet.name === name);
+  const stringValues = (name: string) =>
+    (facetFor(name)?.values ?? []).map((facet) => String(facet.value));
+
   // Ref to track whether the initial mount has completed
   const isInitialized = useRef(false);
 
@@ -57,14 +64,7 @@ const Filters: React.FC<FiltersProps> = ({ categories, maxProductPrice }) => {
         if (!(characteristic.name in newCharacteristicFilters)) {
           if (characteristic.data_type === "integer" || characteristic.data_type === "float") {
 
-            const maxCharacteristicValue = categories
-              .flatMap((category) => category.products)
-              .flatMap((product) => product.characteristics)
-              .filter((char) => char.name === characteristic.name)
-              .reduce((max, char) => {
-                const numericValue = Number(char.value);
-                return isNaN(numericValue) ? max : Math.max(max, numericValue);
-              }, 0);
+            const maxCharacteristicValue = Number(facetFor(characteristic.name)?.max ?? 0);
 
             newCharacteristicFilters[characteristic.name] = {
               min: 0,
@@ -73,23 +73,14 @@ const Filters: React.FC<FiltersProps> = ({ categories, maxProductPrice }) => {
           } else if (characteristic.data_type === "boolean") {
             newCharacteristicFilters[characteristic.name] = false;
           } else if (characteristic.data_type === "string") {
-            const allValues = [
-              ...new Set(
-                categories
-                  .flatMap((cat) => cat.products)
-                  .flatMap((prod) => prod.characteristics)
-                  .filter((char) => char.name === characteristic.name)
-                  .map((char) => char.value)
-              ),
-            ];
-            newCharacteristicFilters[characteristic.name] = allValues.join(",");
+            newCharacteristicFilters[characteristic.name] = stringValues(characteristic.name).join(",");
           }
         }
       });
 
       setCharacteristicFilters(newCharacteristicFilters);
     }
-  }, [currentCategory, categories, savedFilters.characteristics]);
+  }, [currentCategory, facets, savedFilters.characteristics]);
   useEffect(() => {
     if (!selectedCategory) {
       setCharacteristicFilters({});
@@ -320,13 +311,7 @@ const Filters: React.FC<FiltersProps> = ({ categories, maxProductPrice }) => {
                 </div>
               ) : characteristic.data_type === "string" ? (
                 <div className="flex flex-col">
-                  {[...new Set(
-                    categories
-                      .flatMap((cat) => cat.products)
-                      .flatMap((prod) => prod.characteristics)
-                      .filter((char) => char.name === characteristic.name)
-                      .map((char) => char.value)
-                  )].map((value) => (
+                  {stringValues(characteristic.name).map((value) => (
                     <label key={value} className="flex items-center gap-2">
                       <input
                         type="checkbox"
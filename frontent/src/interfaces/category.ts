@@ -16,4 +16,17 @@ export interface Category {
     products: Product[];
     created_at: string;
     updated_at: string
-}
\ No newline at end of file
+}
+
+export interface CharacteristicFacet extends CategoryCharacteristic {
+    count?: number;
+    min?: number;
+    max?: number;
+    values?: { value: string | boolean; count: number }[];
+}
+
+export interface ProductFacets {
+    count: number;
+    categories: { category: string; count: number }[];
+    characteristics: CharacteristicFacet[];
+}
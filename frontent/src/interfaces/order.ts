@@ -18,4 +18,28 @@ export interface Order {
     created_at: string;
     updated_at: string;
     items: OrderItem[];
-}
\ No newline at end of file
+}
+
+// Slim order returned by /profile/orders/
+export interface OrderHistoryItem {
+    product: Pick<Product, "id" | "name" | "slug" | "discounted_price"> & {
+        thumbnail: string | null;
+    };
+    quantity: number;
+    long_term_guarantee_selected: boolean;
+}
+
+export interface OrderHistory {
+    id: number;
+    status: string;
+    address: string;
+    city: string;
+    postal_code: string;
+    country: string;
+    phone: string;
+    order_notes: string | null;
+    total_price: number;
+    created_at: string;
+    paid_at: string | null;
+    items: OrderHistoryItem[];
+}
@@ -46,5 +46,6 @@ export interface Product {
   description: string;
   created_at: string;
   updated_at: string;
-  comments: ProductComment[]; // List of comments for the product
+  comment_count: number;
+  comments: ProductComment[]; // Newest comments, older ones are paged by getProductComments
 }
\ No newline at end of file
@@ -252,7 +252,12 @@ const ProductDetailsPage: React.FC = () => {
         </div>
       </div>
       <div>
-        <CommentsList product_comments={product.comments} productId={product.id} />
+        <CommentsList
+          product_comments={product.comments}
+          productId={product.id}
+          productSlug={product.slug}
+          commentCount={product.comment_count}
+        />
       </div>
       <div className="mt-16 max-w-7xl mx-auto">
         {
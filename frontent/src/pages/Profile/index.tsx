@@ -1,8 +1,8 @@
 import React, { useEffect, useState } from "react";
-import { fetchProfile, refreshAccessToken, updateUserInfo } from "../../utils/api";
+import { fetchProfile, fetchProfileOrders, refreshAccessToken, updateUserInfo } from "../../utils/api";
 import { Link, useNavigate } from "react-router-dom";
 import { User } from "../../interfaces/user";
-import { Order } from "../../interfaces/order";
+import { OrderHistory } from "../../interfaces/order";
 import { useDispatch, useSelector } from "react-redux";
 import { RootState } from "../../redux/store";
 import { clearAuthData, setAuthData, updateTokens } from "../../redux/slices/authSlice";
@@ -11,7 +11,9 @@ import i18n from "../../i18n/config";
 import Loader from "../../Components/Loader";
 
 const ProfilePage: React.FC = () => {
-    const [orders, setOrders] = useState<Order[]>([]);
+    const [orders, setOrders] = useState<OrderHistory[]>([]);
+    const [nextOrdersUrl, setNextOrdersUrl] = useState<string | null>(null);
+    const [loadingOrders, setLoadingOrders] = useState(false);
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState<string | null>(null);
     const [isEditing, setIsEditing] = useState(false);
@@ -37,9 +39,11 @@ const ProfilePage: React.FC = () => {
 
                 // Attempt to fetch the profile
                 const data = await fetchProfile(accessToken, language);
+                const ordersPage = await fetchProfileOrders(accessToken, language);
 
                 setEditedUser(data.user); // Set editable copy of user data
-                setOrders(data.orders);
+                setOrders(ordersPage.results);
+                setNextOrdersUrl(ordersPage.next);
             } catch (err: any) {
                 if (err.response?.status === 401 && refreshToken) {
                     console.log("Access token expired. Attempting to refresh...");
@@ -58,9 +62,11 @@ const ProfilePage: React.FC = () => {
 
                         // Retry fetching the profile with the new token
                         const retryData = await fetchProfile(refreshData.access_token, language);
+                        const retryOrdersPage = await fetchProfileOrders(refreshData.access_token, language);
 
                         setEditedUser(retryData.user);
-                        setOrders(retryData.orders);
+                        setOrders(retryOrdersPage.results);
+                        setNextOrdersUrl(retryOrdersPage.next);
                     } catch (refreshError) {
                         console.error("Failed to refresh tokens:", refreshError);
                         // Redirect to login if refresh also fails
@@ -159,6 +165,21 @@ const ProfilePage: React.FC = () => {
             setLoading(false);
         }
     };
+    const handleLoadMoreOrders = async () => {
+        if (!nextOrdersUrl) return;
+        setLoadingOrders(true);
+
+        try {
+            const page = await fetchProfileOrders(accessToken, i18n.language, nextOrdersUrl);
+            setOrders((prev) => [...prev, ...page.results]);
+            setNextOrdersUrl(page.next);
+        } catch (err: any) {
+            console.error("Error fetching orders:", err);
+        } finally {
+            setLoadingOrders(false);
+        }
+    };
+
     const handleLogOut = () => {
         dispatch(
             clearAuthData()
@@ -276,7 +297,7 @@ const ProfilePage: React.FC = () => {
                                         {order.items.map((item, index) => (
                                             <li key={index} className="flex items-center gap-4">
                                                 <img
-                                                    src={item.product.gallery[0]?.image}
+                                                    src={item.product.thumbnail ?? undefined}
                                                     alt={item.product.name}
                                                     className="w-16 h-16 object-cover rounded-md shadow"
                                                 />
@@ -306,6 +327,15 @@ const ProfilePage: React.FC = () => {
                                     </div>
                                 </div>
                             ))}
+                            {nextOrdersUrl && (
+                                <button
+                                    onClick={handleLoadMoreOrders}
+                                    disabled={loadingOrders}
+                                    className="bg-orange-500 text-white py-2 px-4 rounded hover:bg-orange-600 transition disabled:opacity-50"
+                                >
+                                    {t("show_more")}
+                                </button>
+                            )}
                         </div>
                     )}
                 </div>
@@ -2,10 +2,10 @@ import React, { useEffect, useState } from "react";
 
 import { useSelector } from "react-redux";
 import { Product } from "../../interfaces/product";
-import { getAllProducts, getCategories } from "../../utils/api";
+import { getAllProducts, getCategories, getFacets } from "../../utils/api";
 import Filters from "../../Components/Filters";
 import ProductCard from "../../Components/ProductCart";
-import { Category } from "../../interfaces/category";
+import { Category, ProductFacets } from "../../interfaces/category";
 import { RootState } from "../../redux/store";
 import i18n from "../../i18n/config";
 import Loader from "../../Components/Loader";
@@ -14,6 +14,7 @@ const ShopPage: React.FC = () => {
   const [products, setProducts] = useState<Product[]>([]);
   const [filteredProducts, setFilteredProducts] = useState<Product[]>([]);
   const [categories, setCategories] = useState<Category[]>([]);
+  const [facets, setFacets] = useState<ProductFacets | null>(null);
   const [maxProductPrice, setMaxProductPrice] = useState<number | null>(null);
   const [loading, setLoading] = useState(true);
 
@@ -26,12 +27,14 @@ const ShopPage: React.FC = () => {
       setLoading(true);
       try {
 
-        const [categoriesData, productsData] = await Promise.all([
+        const [categoriesData, productsData, facetsData] = await Promise.all([
           getCategories(language),
           getAllProducts(language),
+          getFacets(language),
         ]);
 
         setCategories(categoriesData);
+        setFacets(facetsData);
         setProducts(productsData.results);
         setFilteredProducts(productsData.results);
 
@@ -134,6 +137,7 @@ const ShopPage: React.FC = () => {
           {maxProductPrice !== null && (
             <Filters
               categories={categories}
+              facets={facets}
               maxProductPrice={maxProductPrice}
             />
           )}
@@ -1,5 +1,7 @@
 import axios from "axios";
-import { Category } from "../interfaces/category";
+import { Category, ProductFacets } from "../interfaces/category";
+import { OrderHistory } from "../interfaces/order";
+import { CursorPage } from "../interfaces/pagination";
 import { Product, ProductComment } from "../interfaces/product";
 import { UpdateUserInfoPayload } from "../interfaces/user";
 
@@ -8,7 +10,7 @@ const API_BASE_URL = 'https://ride-future-api.onrender.com/api';
 // Fetch Featured Products
 export const getFeaturedProducts = async (language: string): Promise<Product[]> => {
     try {
-        const response = await fetch(`${API_BASE_URL}/products?is_featured=true&lang=${language}`, {
+        const response = await fetch(`${API_BASE_URL}/products?is_featured=true&lang=${language}&expand=description,gallery`, {
             method: 'GET',
             headers: {
                 'Content-Type': 'application/json',
@@ -51,6 +53,28 @@ export const getCategories = async (language: string): Promise<Category[]> => {
     }
 };
 
+// Summarize the characteristic values of every product, for the shop filters
+export const getFacets = async (language: string): Promise<ProductFacets | null> => {
+    try {
+        const response = await fetch(`${API_BASE_URL}/products/facets/?lang=${language}`, {
+            method: 'GET',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+        });
+
+        if (!response.ok) {
+            console.error(`HTTP error! status: ${response.status}`);
+            return null;
+        }
+
+        return (await response.json()) as ProductFacets;
+    } catch (error) {
+        console.error('Failed to fetch facets:', error);
+        return null;
+    }
+};
+
 // Fetch Popular Products
 export const getPopularProducts = async (
     minRating: number = 4.0,
@@ -58,7 +82,7 @@ export const getPopularProducts = async (
     language: string
 ): Promise<Product[]> => {
     try {
-        const response = await fetch(`${API_BASE_URL}/products?lang=${language}`, {
+        const response = await fetch(`${API_BASE_URL}/products?lang=${language}&expand=description,gallery`, {
             method: 'GET',
             headers: {
                 'Content-Type': 'application/json',
@@ -117,7 +141,7 @@ export const getProductDetails = async (slug: string, language: string): Promise
 
 export const getSimilarProducts = async (slug: string): Promise<Product[]> => {
     try {
-        const response = await fetch(`${API_BASE_URL}/products/${slug}/similar`, {
+        const response = await fetch(`${API_BASE_URL}/products/${slug}/similar?expand=description,gallery`, {
             method: 'GET',
             headers: {
                 'Content-Type': 'application/json',
@@ -138,6 +162,28 @@ export const getSimilarProducts = async (slug: string): Promise<Product[]> => {
 };
 
 
+// Fetch a page of a product's comments, newest first. `pageUrl` is the `next` link of the previous page
+export const getProductComments = async (slug: string, pageUrl?: string | null): Promise<CursorPage<ProductComment>> => {
+    try {
+        const response = await fetch(pageUrl || `${API_BASE_URL}/products/${slug}/comments/`, {
+            method: 'GET',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+        });
+
+        if (!response.ok) {
+            console.error(`HTTP error! status: ${response.status}`);
+            return { next: null, previous: null, results: [] };
+        }
+
+        return await response.json() as CursorPage<ProductComment>;
+    } catch (error) {
+        console.error('Failed to fetch product comments:', error);
+        return { next: null, previous: null, results: [] };
+    }
+};
+
 
 // Generate a temporary password
 export const generateTempPassword = async (email: string, captchaToken: string): Promise<any> => {
@@ -207,6 +253,33 @@ export const fetchProfile = async (accessToken: string | null, language: string)
 };
 
 
+// Fetch a page of the order history, `pageUrl` is the `next` link of the previous page
+export const fetchProfileOrders = async (
+    accessToken: string | null,
+    language: string,
+    pageUrl?: string | null
+): Promise<CursorPage<OrderHistory>> => {
+    try {
+
+        const response = await axios.get(pageUrl || `${API_BASE_URL}/profile/orders/?lang=${language}`, {
+            headers: {
+                Authorization: `Bearer ${accessToken}`,
+            },
+        });
+
+        return response.data;
+    } catch (error: any) {
+        if (error.response?.status === 401) {
+            throw { response: error.response, message: "Unauthorized" };
+        }
+
+        throw {
+            response: error.response || null,
+            message: error.response?.data?.message || "Failed to fetch orders.",
+        };
+    }
+};
+
 // Fetch profile data
 export const deleteComment = async (accessToken: string | null, commentId: number): Promise<number> => {
     try {
@@ -343,7 +416,7 @@ export const createOrder = async (orderData: any) => {
 }
 export const getAllProducts = async (language: string) => {
     try {
-        const response = await fetch(`${API_BASE_URL}/products?lang=${language}`);
+        const response = await fetch(`${API_BASE_URL}/products?lang=${language}&expand=description,gallery,characteristics`);
         if (response.ok) {
             const data = await response.json();
             return data